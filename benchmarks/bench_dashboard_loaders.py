@@ -0,0 +1,71 @@
+"""
+Benchmark: dashboard data-loading time per rerender as quarantine reports accumulate.
+
+Compares the original top-to-bottom loading (glob + getctime on every report + read_csv)
+with the cached dashboard_data layer. Run from the project root:
+
+    python benchmarks/bench_dashboard_loaders.py --reports 10 100 1000
+"""
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import dashboard_data
+
+def make_folder(n_reports, rows):
+    folder = tempfile.mkdtemp(prefix=f"bench_dash_{n_reports}_")
+    day = pd.Timestamp("2020-01-01")
+    report = pd.DataFrame({
+        'Date': pd.date_range("2024-01-01", periods=rows, freq="h"),
+        'Ticker': "EURUSD=X", 'Close': np.random.rand(rows), 'qa_reason': "Logic Error: High < Low",
+    })
+    for i in range(n_reports):
+        report.to_csv(f"{folder}/QUARANTINE_REPORT_{(day + pd.Timedelta(days=i)).strftime('%Y_%m_%d')}.csv", index=False)
+    pd.DataFrame({
+        'ds': pd.date_range("2024-01-01", periods=7500, freq="h"),
+        'yhat': 1.0, 'yhat_lower': 0.9, 'yhat_upper': 1.1,
+    }).to_csv(f"{folder}/EURUSD=X_forecast.csv", index=False)
+    return folder
+
+def old_page(folder):
+    files = glob.glob(f'{folder}/QUARANTINE_REPORT_*.csv')
+    latest = max(files, key=os.path.getctime)
+    pd.read_csv(latest)
+    pd.read_csv(f"{folder}/EURUSD=X_forecast.csv")
+
+def new_page(folder):
+    dashboard_data.check_published(folder)
+    dashboard_data.latest_report(folder)
+    dashboard_data.load_forecast(folder, "EURUSD=X")
+
+def time_page(page, folder, rerenders):
+    samples = []
+    for _ in range(rerenders):
+        t0 = time.perf_counter()
+        page(folder)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per quarantine report")
+    parser.add_argument("--rerenders", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'reports':>8} {'old median ms':>14} {'new cold ms':>12} {'new warm median ms':>19}")
+    for n in args.reports:
+        folder = make_folder(n, args.rows)
+        old = time_page(old_page, folder, args.rerenders)
+        dashboard_data.invalidate()
+        new = time_page(new_page, folder, args.rerenders)
+        print(f"{n:>8} {statistics.median(old):>14.2f} {new[0]:>12.2f} {statistics.median(new[1:]):>19.3f}")
+        shutil.rmtree(folder, ignore_errors=True)
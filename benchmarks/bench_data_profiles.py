@@ -0,0 +1,68 @@
+"""
+Benchmark: incremental profiling cost.
+
+Synthetic daily bars (N tickers x Y years, monthly partitions). Measures:
+  1. the one-off backfill (every partition profiled),
+  2. the daily update after one new bar (only the latest partition is recomputed),
+  3. a period profile (one year, whole history) merged from stored partitions,
+  4. drift detection of the latest partition against the 12 before it.
+Per-ticker timings are extrapolated to --target tickers. Run from the project root:
+
+    python benchmarks/bench_data_profiles.py --tickers 50 --years 10 --target 1000
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from data_profiles import update_profiles, merge_profiles, detect_drift, summarize
+
+def make_bars(n_bars, seed):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2015-01-01", periods=n_bars, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(10_000, 1_000_000, n_bars).astype(float)}, index=idx)
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(i) for i in items]
+    return (time.perf_counter() - t0) / len(items), out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--target", type=int, default=1000, help="Universe size to extrapolate to")
+    args = parser.parse_args()
+
+    n_bars = args.years * 252
+    frames = [make_bars(n_bars + 1, seed) for seed in range(args.tickers)]
+
+    with tempfile.TemporaryDirectory() as root:
+        backfill, _ = timed(lambda i: update_profiles(root, f"T{i}", frames[i].iloc[:-1], "M"), range(args.tickers))
+        daily, results = timed(lambda i: update_profiles(root, f"T{i}", frames[i], "M"), range(args.tickers))
+        recomputed = {len(todo) for _, todo in results}
+        profiles = [p for p, _ in results]
+        year = profiles[0]['partition'].max()[:4]
+
+        merge_year, _ = timed(lambda p: merge_profiles(p[p['partition'].str.startswith(year)]), profiles)
+        merge_all, merged = timed(merge_profiles, profiles)
+        drift, _ = timed(detect_drift, profiles)
+        size = sum(os.path.getsize(os.path.join(root, f)) for f in os.listdir(root)) / args.tickers
+
+    close = frames[0]['Close']
+    stats = summarize(merged[0]['Close'])
+    print(f"{args.tickers} tickers x {args.years} years ({n_bars} bars, {profiles[0]['partition'].nunique()} partitions each)")
+    print(f"  backfill          {backfill * 1000:8.1f} ms/ticker  -> {backfill * args.target:7.1f} s for {args.target}")
+    print(f"  daily update      {daily * 1000:8.1f} ms/ticker  -> {daily * args.target:7.1f} s for {args.target}"
+          f"  (partitions recomputed: {sorted(recomputed)})")
+    print(f"  merge one year    {merge_year * 1000:8.1f} ms/ticker")
+    print(f"  merge history     {merge_all * 1000:8.1f} ms/ticker")
+    print(f"  drift             {drift * 1000:8.1f} ms/ticker")
+    print(f"  stored            {size / 1024:8.1f} KiB/ticker")
+    print(f"  merged vs exact   median {stats['p50']:.3f} vs {close.median():.3f}, p99 {stats['p99']:.3f} vs {close.quantile(0.99):.3f}")
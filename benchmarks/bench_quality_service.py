@@ -0,0 +1,123 @@
+"""
+Benchmark: query latency of the data-quality service.
+
+Builds a synthetic published run (N tickers x B daily bars in the clean store, ~2% of bars
+quarantined under random rules), then measures:
+  1. index build time (what a hot reload costs),
+  2. in-process lookups per query type (the bitmap / binary search cost alone),
+  3. HTTP p50 / p99 latency and throughput against a local instance, with several
+     keep-alive clients hammering a random query mix.
+Run from the project root:
+
+    python benchmarks/bench_quality_service.py --tickers 500 --bars 2500 --clients 8 --requests 2000
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import threading
+import http.client
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from quality_service import QualityService, make_server, parse_window, RULE_BITS
+from quarantine_store import build_quarantine_batch, append_quarantine_batch, REASON_TO_RULE
+from analyst_views import write_clean
+from dashboard_data import publish_run
+
+def make_run(folder, n, bars, flag_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2015-01-01", periods=bars, name="Date")
+    clean_root, store = os.path.join(folder, "clean"), os.path.join(folder, "quarantine")
+    reasons = list(REASON_TO_RULE)
+    for i in range(n):
+        ticker = f"T{i}"
+        flagged = rng.random(bars) < flag_rate
+        write_clean(clean_root, ticker, pd.DataFrame({'Close': 100.0}, index=idx[~flagged]))
+        q = pd.DataFrame({'Close': 100.0, 'qa_reason': rng.choice(reasons, flagged.sum())}, index=idx[flagged])
+        append_quarantine_batch(build_quarantine_batch(q, "bench", ticker), store, "2025-01-01", part_key=ticker)
+    publish_run(folder, "bench")
+    return store, clean_root, idx
+
+def random_paths(rng, n, idx, count):
+    paths = []
+    for _ in range(count):
+        kind = rng.integers(3)
+        ticker = f"T{rng.integers(n)}"
+        day = idx[rng.integers(len(idx))].date()
+        if kind == 0:
+            paths.append(f"/bar?ticker={ticker}&date={day}")
+        elif kind == 1:
+            end = (pd.Timestamp(day) + pd.Timedelta(days=30)).date()
+            paths.append(f"/failing?rule={int(rng.choice(RULE_BITS))}&start={day}&end={end}")
+        else:
+            end = (pd.Timestamp(day) + pd.Timedelta(days=90)).date()
+            paths.append(f"/clean_ranges?ticker={ticker}&start={day}&end={end}")
+    return paths
+
+def client(port, paths, latencies):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for path in paths:
+        t0 = time.perf_counter()
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=2500)
+    parser.add_argument("--flag-rate", type=float, default=0.02)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per client")
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"Building {args.tickers} tickers x {args.bars} bars...")
+        store, clean_root, idx = make_run(folder, args.tickers, args.bars, args.flag_rate)
+
+        service = QualityService(folder, store, clean_root)
+        t0 = time.perf_counter()
+        service.reload(force=True)
+        print(f"Index build (hot reload cost): {time.perf_counter() - t0:.2f}s")
+
+        # In-process: the index alone, no HTTP
+        index = service.index
+        days = idx[rng.integers(len(idx), size=20000)]
+        tickers = [f"T{i}" for i in rng.integers(args.tickers, size=len(days))]
+        for name, query in [
+            ("bar", lambda t, d: index.bar_status(t, *parse_window(date=str(d.date())))),
+            ("failing", lambda t, d: index.failing(16, d.value, d.value + 30 * 86_400 * 10**9)),
+            ("clean_ranges", lambda t, d: index.clean_ranges(t, d.value, d.value + 90 * 86_400 * 10**9)),
+        ]:
+            t0 = time.perf_counter()
+            for t, d in zip(tickers, days):
+                query(t, d)
+            print(f"  in-process {name:<13} {(time.perf_counter() - t0) / len(days) * 1e6:8.1f} us/query")
+
+        # HTTP: keep-alive clients against a local instance
+        server = make_server(service, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        latencies = []
+        threads = [
+            threading.Thread(target=client, args=(port, random_paths(rng, args.tickers, idx, args.requests), latencies))
+            for _ in range(args.clients)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        server.shutdown()
+        server.server_close()
+
+        ms = np.array(latencies) * 1000
+        print(f"HTTP {len(ms)} requests, {args.clients} clients: "
+              f"p50 {np.percentile(ms, 50):.2f} ms  p99 {np.percentile(ms, 99):.2f} ms  {len(ms) / elapsed:,.0f} req/s")
@@ -0,0 +1,79 @@
+"""
+Benchmark: per-bar revision detection on long intraday histories.
+
+Synthetic hourly OHLCV bars (24/7, like crypto: ~87,600 bars for 10 years). The second download
+restates a share of random bars, drops a few and slides the window forward. Times the hashing of
+the download, the sorted-array diff against the stored hashes and the whole track_revisions call
+(load + diff + save), and checks that every injected revision is found. Run from the project root:
+
+    python benchmarks/bench_revision_tracker.py --years 10 --tickers 20
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from revision_tracker import bar_hashes, diff_hashes, track_revisions
+
+def make_download(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2016-01-01", periods=bars, freq="h", name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.003, bars)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.002, 'Low': close * 0.998, 'Close': close,
+                         'Volume': rng.integers(1, 10**9, bars).astype(float)}, index=idx)
+
+def revise(df, revised_pct, deleted, slide, seed=1):
+    rng = np.random.default_rng(seed)
+    new = pd.concat([df.iloc[slide:], make_download(len(df) + slide, seed + 1).iloc[len(df):]])
+    rows = rng.choice(len(new) - slide, int(len(new) * revised_pct / 100) + deleted, replace=False)
+    restated, dropped = rows[:-deleted or None], rows[len(rows) - deleted:]
+    new.iloc[restated, new.columns.get_loc('Close')] *= 1.001
+    return new.drop(new.index[dropped]), len(restated), len(dropped)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--revised-pct", type=float, default=0.5)
+    parser.add_argument("--deleted", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("RevisionTracker").setLevel(logging.ERROR)
+
+    bars = int(args.years * 365 * 24)
+    root = tempfile.mkdtemp(prefix="bench_revisions_")
+    hash_s = diff_s = track_s = 0.0
+    found = expected = 0
+    try:
+        for i in range(args.tickers):
+            old = make_download(bars, seed=i)
+            new, n_restated, n_dropped = revise(old, args.revised_pct, args.deleted, slide=24, seed=i)
+            track_revisions(root, f"T{i}", old, "r1", "2026-01-01")
+
+            t0 = time.perf_counter()
+            ts, h, _, _ = bar_hashes(new)
+            hash_s += time.perf_counter() - t0
+            old_ts, old_h, _, _ = bar_hashes(old)
+            t0 = time.perf_counter()
+            diff_hashes(old_ts, old_h, ts, h)
+            diff_s += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            events = track_revisions(root, f"T{i}", new, "r2", "2026-01-02")
+            track_s += time.perf_counter() - t0
+            found += len(events)
+            expected += n_restated + n_dropped
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    n = args.tickers
+    print(f"tickers={n} bars per ticker={bars:,} ({args.years:g} years hourly)")
+    print(f"  hash the download      : {hash_s / n * 1000:7.2f} ms per ticker")
+    print(f"  diff sorted arrays     : {diff_s / n * 1000:7.2f} ms per ticker")
+    print(f"  track_revisions (total): {track_s / n * 1000:7.2f} ms per ticker (load + hash + diff + save)")
+    print(f"  revisions found        : {found}/{expected}")
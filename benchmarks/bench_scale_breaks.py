@@ -0,0 +1,66 @@
+"""
+Benchmark: universe-wide x10^k scale-break detection.
+
+Synthetic daily closes (fx, equity and crypto random walks). A share of the tickers gets a
+unit switch (x/÷ 10, 100, 1000) from a random bar on, or a short glitched segment.
+Times one stacked pass over every series against one call per ticker, and reports how many
+injected breaks are found and how many clean tickers are touched. Run from the project root:
+
+    python benchmarks/bench_scale_breaks.py --tickers 1000 --bars 2500
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from scale_breaks import detect_scale_breaks, expected_band
+
+CLASSES = {'fx': (1.2, 0.006), 'equity': (80.0, 0.02), 'crypto': (500.0, 0.05)}
+
+def make_universe(n, bars, broken_pct, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-01-15", periods=bars, name="Date")
+    series, bands, truth = {}, {}, {}
+    for i in range(n):
+        asset_class = list(CLASSES)[i % len(CLASSES)]
+        start, vol = CLASSES[asset_class]
+        close = start * np.exp(np.cumsum(rng.normal(0, vol, bars)))
+        t = f"{asset_class.upper()}{i:05d}"
+        if rng.random() * 100 < broken_pct:
+            at = int(rng.integers(1, bars - 1))
+            end = bars if rng.random() < 0.5 else min(bars, at + int(rng.integers(1, 20)))
+            close[at:end] *= 10.0 ** (int(rng.integers(1, 4)) * rng.choice([-1, 1]))
+            truth[t] = at
+        series[t] = pd.Series(close, index=idx)
+        bands[t] = expected_band(t, asset_class)
+    return series, bands, truth
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=2500)
+    parser.add_argument("--broken-pct", type=float, default=5.0)
+    args = parser.parse_args()
+
+    series, bands, truth = make_universe(args.tickers, args.bars, args.broken_pct)
+
+    t0 = time.perf_counter()
+    shifts, segments, unfixable = detect_scale_breaks(series, bands)
+    stacked_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for t in series:
+        detect_scale_breaks({t: series[t]}, {t: bands[t]})
+    per_ticker_s = time.perf_counter() - t0
+
+    found = [t for t in truth if t in shifts and series[t].index[truth[t]] in set(segments.loc[segments['ticker'] == t, 'start'])
+             | set(segments.loc[segments['ticker'] == t, 'end'] + pd.offsets.BDay())]
+    false_pos = sorted(set(shifts) - set(truth))
+    print(f"tickers={args.tickers} bars={args.bars} injected breaks={len(truth)}")
+    print(f"  stacked pass        : {stacked_s * 1000:8.1f} ms ({stacked_s / args.tickers * 1e6:.0f} µs per ticker)")
+    print(f"  one call per ticker : {per_ticker_s * 1000:8.1f} ms ({per_ticker_s / args.tickers * 1e6:.0f} µs per ticker)")
+    print(f"  breaks located      : {len(found)}/{len(truth)}")
+    print(f"  clean tickers hit   : {len(false_pos)}   unfixable: {len(unfixable)}")
@@ -0,0 +1,89 @@
+"""
+Benchmark: sharded pipeline throughput as the number of workers grows.
+
+Enqueues a synthetic universe in the lease-based queue and times worker processes (forked on
+this host, like the coordinator's local workers) draining it. Downloads are replaced by a
+synthetic OHLCV generator plus an optional per-ticker latency standing in for the network;
+everything after the download (validation, stores, journal, leases) is the real pipeline code.
+Run from the project root:
+
+    python benchmarks/bench_sharded_throughput.py --tickers 200 --workers 1 2 4 8 --latency 0.5
+
+Queue and journal are SQLite files in WAL mode, so workers scale on one host only (see README 6).
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing as mp
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import run_pipeline3
+import distributed_pipeline
+from run_journal import open_journal, run_progress
+from scheduler import ensure_schema
+from work_queue import open_queue, enqueue_run
+from bench_universe_memory import synthetic_download
+
+def _worker(run_id, worker_id, rows, latency):
+    def download(t, s, e, f, i="1d"):
+        time.sleep(latency)
+        return synthetic_download(t, s, e, f, i, rows)
+    run_pipeline3.process_yahoo_download = download
+    distributed_pipeline.run_worker(run_id, worker_id)
+
+def run_workers(n_workers, n_tickers, shard_size, rows, latency):
+    workdir = tempfile.mkdtemp(prefix=f"bench_sharded_{n_workers}_")
+    settings = run_pipeline3.config['pipeline']['settings']
+    settings.update({key: f"{workdir}/{os.path.basename(str(path))}" for key, path in settings.items()
+                     if key.endswith(('_store', '_db'))})
+    settings['data_folder'] = workdir
+
+    manifest = f"{workdir}/universe.csv"
+    tickers = [f"SYN{i:05d}" for i in range(n_tickers)]
+    pd.DataFrame({'ticker': tickers, 'ml': False}).to_csv(manifest, index=False)
+    run_pipeline3.config['pipeline']['universe_file'] = manifest
+    run_pipeline3.config['pipeline']['ecb_tickers'] = []
+
+    journal = open_journal(settings['journal_db'])
+    ensure_schema(journal)
+    run_id, params = run_pipeline3.open_run(journal)
+    enqueue_run(open_queue(settings['queue_db']), run_id, tickers, shard_size, {**params, 'ecb_files': {}})
+
+    ctx = mp.get_context("fork")
+    t0 = time.perf_counter()
+    workers = [ctx.Process(target=_worker, args=(run_id, f"w{i}", rows, latency)) for i in range(n_workers)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+
+    processed, _ = run_progress(journal, run_id)
+    journal.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return processed, elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shard-size", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=252, help="Bars per synthetic ticker")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per simulated download")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    print(f"{os.cpu_count()} CPUs, {args.tickers} tickers, shards of {args.shard_size}, {args.latency:g}s download latency")
+    print(f"{'workers':>8} {'processed':>10} {'seconds':>9} {'tickers/s':>10} {'speedup':>8} {'efficiency':>11}")
+    base = None
+    for n in args.workers:
+        processed, elapsed = run_workers(n, args.tickers, args.shard_size, args.rows, args.latency)
+        rate = processed / elapsed
+        base = base or rate / n
+        print(f"{n:>8} {processed:>10} {elapsed:>9.1f} {rate:>10.1f} {rate / base:>8.2f} {rate / base / n:>10.0%}")
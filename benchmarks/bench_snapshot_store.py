@@ -0,0 +1,86 @@
+"""
+Benchmark: content-addressed snapshots versus a full copy per run.
+
+Synthetic daily histories (--years of business days per ticker). Each simulated run appends
+one bar and, for --revise-pct of tickers, revises a random older bar (a vendor back-fill).
+Reports the store size against keeping a full raw + clean copy per run, the snapshot time
+per ticker, and the time to read one ticker as of the first run. Run from the project root:
+
+    python benchmarks/bench_snapshot_store.py --tickers 50 --years 10 --runs 30
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from snapshot_store import snapshot_ticker, load_snapshot, collect_garbage
+
+def make_history(years, seed):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-01-15", periods=years * 252, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(idx))))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(1_000, 1_000_000, len(idx)).astype(float)}, index=idx)
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--revise-pct", type=float, default=5.0)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_snapshots_")
+    rng = np.random.default_rng(42)
+    histories = {f"T{i:04d}": make_history(args.years, i) for i in range(args.tickers)}
+    full_copy_bytes, snap_s, written_total = 0, [], 0
+    try:
+        for run in range(args.runs):
+            created_at = pd.Timestamp("2026-01-15 18:00").timestamp() + run * 86400
+            for ticker, df in histories.items():
+                if run:
+                    nxt = df.index[-1] + pd.offsets.BDay()
+                    df.loc[nxt] = df.iloc[-1] * (1 + rng.normal(0, 0.01))
+                    if rng.random() * 100 < args.revise_pct:
+                        df.iloc[rng.integers(len(df) - 1), 3] *= 1.001
+                clean = df[df['Volume'] > 0]
+                # Baseline: what a full Parquet copy of raw + clean per run would cost
+                if run < 2:
+                    for name, frame in (("raw", df), ("clean", clean)):
+                        path = os.path.join(root, f"copy_{name}.parquet")
+                        frame.to_parquet(path)
+                        full_copy_bytes += os.path.getsize(path) * args.runs / 2
+                t0 = time.perf_counter()
+                written, _ = snapshot_ticker(root, f"run{run:03d}", ticker, {'raw': df, 'clean': clean}, created_at=created_at)
+                snap_s.append(time.perf_counter() - t0)
+                written_total += written
+
+        store_bytes = dir_bytes(os.path.join(root, "chunks")) + dir_bytes(os.path.join(root, "manifests"))
+        t0 = time.perf_counter()
+        first = load_snapshot(root, "T0000", run_id="run000")
+        read_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        window = load_snapshot(root, "T0000", as_of="2026-01-16", start="2025-01-01")
+        window_ms = (time.perf_counter() - t0) * 1000
+
+        print(f"tickers={args.tickers} years={args.years} runs={args.runs} revise={args.revise_pct}%")
+        print(f"  full copies per run : {full_copy_bytes / 1024 / 1024:8.1f} MB")
+        print(f"  snapshot store      : {store_bytes / 1024 / 1024:8.1f} MB ({full_copy_bytes / max(store_bytes, 1):.1f}x smaller)")
+        print(f"  chunks written      : {written_total} ({written_total / args.runs / args.tickers:.2f} per ticker per run after dedup)")
+        print(f"  snapshot per ticker : {np.median(snap_s) * 1000:8.1f} ms median")
+        print(f"  read full history   : {read_ms:8.1f} ms ({len(first)} rows)")
+        print(f"  read one year as-of : {window_ms:8.1f} ms ({len(window)} rows)")
+        t0 = time.perf_counter()
+        stats = collect_garbage(root, keep_last=7, keep_daily=0, keep_monthly=0, grace_seconds=0)
+        print(f"  gc keep_last=7      : {stats['runs_deleted']} runs, {stats['chunks_deleted']} chunks, "
+              f"{stats['bytes_freed'] / 1024 / 1024:.1f} MB in {time.perf_counter() - t0:.2f} s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
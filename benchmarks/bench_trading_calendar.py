@@ -0,0 +1,52 @@
+"""
+Benchmark: expected-bar grids from calendars.yaml.
+
+Cold = first generation of every calendar year in a fresh cache, warm = the same lookups
+served from the per-year cache. Then a missing/extra-bar check of one 10-year hourly
+history against its calendar. Run from the project root:
+
+    python benchmarks/bench_trading_calendar.py --years 10 --intervals 1d 1h 5m
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import trading_calendar
+from trading_calendar import expected_bars, calendar_gaps, calendar_names
+
+def lookup_all(names, intervals, start, end):
+    return sum(len(expected_bars(name, interval, start, end)) for name in names for interval in intervals)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--intervals", nargs="+", default=["1d", "1h", "5m"])
+    args = parser.parse_args()
+
+    end = pd.Timestamp("2026-01-01")
+    start = end - pd.DateOffset(years=args.years)
+    names = calendar_names()
+
+    trading_calendar._year_grid.cache_clear()
+    trading_calendar.session_days.cache_clear()
+    t0 = time.perf_counter()
+    bars = lookup_all(names, args.intervals, start, end)
+    cold = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lookup_all(names, args.intervals, start, end)
+    warm = time.perf_counter() - t0
+    print(f"{len(names)} calendars x {args.intervals} over {args.years} years: {bars:,} bars")
+    print(f"cold {cold * 1000:.1f} ms, warm {warm * 1000:.2f} ms")
+
+    # One hourly NYSE history with 1% of its bars dropped
+    grid = expected_bars("XNYS", "1h", start, end)
+    rng = np.random.default_rng(0)
+    observed = pd.DatetimeIndex(np.sort(rng.choice(grid, int(len(grid) * 0.99), replace=False)).astype('datetime64[ns]'), tz="UTC")
+    t0 = time.perf_counter()
+    missing, extra = calendar_gaps(observed, "XNYS", "1h")
+    print(f"gap check {len(observed):,} hourly bars: {len(missing)} missing, {len(extra)} extra in {(time.perf_counter() - t0) * 1000:.2f} ms")
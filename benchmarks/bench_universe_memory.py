@@ -0,0 +1,86 @@
+"""
+Benchmark: RSS of the streaming pipeline as the universe grows (100 -> 10,000 tickers).
+
+Downloads are replaced by a synthetic OHLCV generator so the run is offline and repeatable;
+everything after the download (validation, Parquet/CSV writes, quarantine store, journal)
+is the real pipeline code. Run from the project root:
+
+    python benchmarks/bench_universe_memory.py --sizes 100 1000 10000
+"""
+import os
+import sys
+import time
+import zlib
+import shutil
+import argparse
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import run_pipeline3
+from universe import current_rss_mb
+
+def synthetic_download(ticker, start, end, folder, interval="1d", rows=252):
+    """Random-walk OHLCV in the same CSV layout download_ohlcv_to_csv produces"""
+    # crc32, not hash(): str hashes change with PYTHONHASHSEED, so runs would not be repeatable
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    df = pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, rows)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, rows),
+    }, index=pd.bdate_range(end=end, periods=rows, name='Date'))
+    path = f"{folder}/{ticker}_{interval}.csv"
+    df.to_csv(path)
+    return ticker, path
+
+def run_size(n_tickers, rows):
+    workdir = tempfile.mkdtemp(prefix=f"bench_universe_{n_tickers}_")
+    settings = run_pipeline3.config['pipeline']['settings']
+    # Every store and database goes to the temp dir, so the run never touches data/
+    settings.update({key: f"{workdir}/{os.path.basename(str(path))}" for key, path in settings.items()
+                     if key.endswith(('_store', '_db'))})
+    settings['data_folder'] = workdir
+
+    manifest = f"{workdir}/universe.csv"
+    pd.DataFrame({'ticker': [f"SYN{i:05d}" for i in range(n_tickers)], 'ml': False}).to_csv(manifest, index=False)
+    run_pipeline3.config['pipeline']['universe_file'] = manifest
+    run_pipeline3.config['pipeline']['ecb_tickers'] = []
+    run_pipeline3.process_yahoo_download = lambda t, s, e, f, i="1d": synthetic_download(t, s, e, f, i, rows)
+
+    # Sample RSS in the background while the run streams through the universe
+    samples = []
+    done = threading.Event()
+    def sampler():
+        while not done.wait(0.05):
+            samples.append(current_rss_mb())
+    thread = threading.Thread(target=sampler, daemon=True)
+    thread.start()
+
+    start_rss = current_rss_mb()
+    t0 = time.perf_counter()
+    run_pipeline3.run_automation()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    thread.join()
+
+    shutil.rmtree(workdir, ignore_errors=True)
+    return start_rss, max(samples or [start_rss]), current_rss_mb(), elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rows", type=int, default=252, help="Bars per synthetic ticker")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'tickers':>8} {'start MB':>9} {'peak MB':>9} {'end MB':>9} {'seconds':>9} {'ms/ticker':>10}")
+    for n in args.sizes:
+        start_rss, peak_rss, end_rss, elapsed = run_size(n, args.rows)
+        print(f"{n:>8} {start_rss:>9.0f} {peak_rss:>9.0f} {end_rss:>9.0f} {elapsed:>9.1f} {1000 * elapsed / n:>10.1f}")
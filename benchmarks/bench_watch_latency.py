@@ -0,0 +1,62 @@
+"""
+Benchmark: arrival-to-verdict latency of the resident watch service.
+
+Synthetic hourly bars for N tickers, each with a published forecast band, replayed through
+SimulatedFeed one bar per ticker per poll (the shape of a live poll). Reports the verdict
+latency and the full poll time including the quarantine/status publish. Run from the
+project root:
+
+    python benchmarks/bench_watch_latency.py --tickers 100 300 1000 --polls 50
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from watch_service import WatchService, SimulatedFeed, to_bars
+
+def make_case(folder, n, bars, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-02 14:30", periods=bars, freq="h", tz="UTC")
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, (n, bars)), axis=1))
+    histories = {}
+    for i in range(n):
+        ticker = f"T{i}"
+        close = prices[i]
+        histories[ticker] = pd.DataFrame({
+            'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close, 'Volume': 1000.0,
+        }, index=idx)
+        band = pd.DataFrame({'ds': idx.tz_localize(None), 'yhat': close, 'yhat_lower': close * 0.995, 'yhat_upper': close * 1.005})
+        band.to_csv(os.path.join(folder, f"{ticker}_forecast.csv"), index=False)
+    return histories
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 300, 1000])
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'verdict p50 ms':>15} {'verdict p99 ms':>15} {'poll p99 ms':>12}")
+    for n in args.tickers:
+        with tempfile.TemporaryDirectory() as folder:
+            histories = make_case(folder, n, args.warmup + args.polls)
+            service = WatchService(list(histories), folder, quarantine_root=os.path.join(folder, "quarantine"))
+            service.seed(to_bars({t: h.iloc[:args.warmup] for t, h in histories.items()}))
+            service.refresh_models()
+            feed = SimulatedFeed({t: h.iloc[args.warmup:] for t, h in histories.items()})
+
+            verdict_ms, poll_ms = [], []
+            while True:
+                bars = feed.poll()
+                if bars is None:
+                    break
+                t0 = time.perf_counter()
+                verdicts = service.step(bars, t0)
+                poll_ms.append((time.perf_counter() - t0) * 1000)
+                verdict_ms.append(verdicts['latency_ms'].iloc[0])
+        print(f"{n:>8} {np.percentile(verdict_ms, 50):>15.1f} {np.percentile(verdict_ms, 99):>15.1f} {np.percentile(poll_ms, 99):>12.1f}")
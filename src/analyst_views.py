@@ -0,0 +1,167 @@
+import os
+import hashlib
+import logging
+from datetime import date
+import duckdb
+import pandas as pd
+
+from dashboard_data import cached, file_identity, PUBLISH_MARKER
+
+logger = logging.getLogger("AnalystViews")
+
+# Used when config.yaml has no analyst_views section. Views are plain SQL over the base views:
+#   clean      every ticker's canonical clean history (ticker, Date, OHLCV)
+#   universe   ticker, asset_class, exchange, interval
+#   quarantine every quarantined bar across runs
+DEFAULT_VIEWS = {
+    'last_7_days': "SELECT * FROM clean WHERE Date >= current_date - INTERVAL 7 DAY",
+    'last_month': "SELECT * FROM clean WHERE Date >= current_date - INTERVAL 1 MONTH",
+    'flagged': "SELECT q.*, u.asset_class FROM quarantine q LEFT JOIN universe u USING (ticker)",
+    'by_asset_class': "SELECT u.asset_class, c.* FROM clean c JOIN universe u USING (ticker)",
+}
+
+def clean_path(clean_root, ticker):
+    """The one file a run writes per ticker: its validated history"""
+    return os.path.join(clean_root, f"{str(ticker).replace(os.sep, '_')}.parquet")
+
+def write_clean(clean_root, ticker, df):
+    """Atomically replace a ticker's clean history (tmp + rename, readers never see a partial file)"""
+    os.makedirs(clean_root, exist_ok=True)
+    path = clean_path(clean_root, ticker)
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+    return path
+
+def analyst_connection(clean_root, quarantine_root=None, universe=None, views=None):
+    """
+    In-memory DuckDB connection with the base views plus every analyst view.
+    Nothing is materialized, each query reads the Parquet files it needs.
+    """
+    con = duckdb.connect(database=':memory:')
+    pattern = os.path.join(clean_root, "*.parquet")
+    con.execute(f"""
+        CREATE VIEW clean AS
+        SELECT regexp_extract(filename, '([^/\\\\]+)\\.parquet$', 1) AS ticker, Date, * EXCLUDE (filename, Date)
+        FROM read_parquet('{pattern}', filename = true, union_by_name = true)
+    """)
+
+    if universe is None:
+        universe = pd.DataFrame(columns=['ticker', 'asset_class', 'exchange', 'interval'])
+    con.register('universe_df', universe[['ticker', 'asset_class', 'exchange', 'interval']].astype(str))
+    con.execute("CREATE VIEW universe AS SELECT * FROM universe_df")
+
+    quarantine_files = quarantine_root and os.path.isdir(quarantine_root) and any(
+        f.endswith(".parquet") for _, _, files in os.walk(quarantine_root) for f in files
+    )
+    if quarantine_files:
+        con.execute(f"""
+            CREATE VIEW quarantine AS
+            SELECT * FROM read_parquet('{os.path.join(quarantine_root, "run_date=*", "*.parquet")}', hive_partitioning = true, union_by_name = true)
+        """)
+    else:
+        con.execute("CREATE VIEW quarantine AS SELECT NULL::VARCHAR AS ticker, NULL::TIMESTAMP AS ts WHERE false")
+
+    for name, sql in (views or DEFAULT_VIEWS).items():
+        con.execute(f'CREATE VIEW "{name}" AS {sql}')
+    return con
+
+def _filtered_sql(con, view, ticker=None, asset_class=None):
+    columns = {row[0] for row in con.execute(f'DESCRIBE "{view}"').fetchall()}
+    clauses, params = [], []
+    for column, value in (('ticker', ticker), ('asset_class', asset_class)):
+        if value is None:
+            continue
+        if column not in columns:
+            raise ValueError(f"View '{view}' has no {column} column to filter on")
+        clauses.append(f"{column} = ?")
+        params.append(value)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f'SELECT * FROM "{view}"{where}', params
+
+def _digest(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def quarantine_identity(quarantine_root):
+    """Digest of every quarantine part file's identity: appends land in existing partitions, so the root's mtime misses them"""
+    if not quarantine_root or not os.path.isdir(quarantine_root):
+        return None
+    parts = sorted(
+        file_identity(os.path.join(folder, f))
+        for folder, _, files in os.walk(quarantine_root) for f in files if f.endswith(".parquet")
+    )
+    return _digest(*parts)
+
+def materialize(view, clean_root, quarantine_root=None, universe=None, views=None, ticker=None, asset_class=None):
+    """
+    Run one analyst view (optionally filtered by ticker / asset class) and return a DataFrame.
+
+    Results go through the shared dashboard cache, keyed by every input the view can read:
+    the clean store's directory identity (every atomic replace changes it), the quarantine
+    part files, the universe, the SQL of the views, the latest publish marker and today's date
+    (views are relative to current_date), so repeated requests between runs cost nothing.
+    """
+    views = views or DEFAULT_VIEWS
+    if view not in views:
+        raise ValueError(f"Unknown analyst view '{view}', expected one of {sorted(views)}")
+
+    marker = file_identity(os.path.join(os.path.dirname(os.path.abspath(clean_root)), PUBLISH_MARKER))
+    # A view can select from the others, so all of their SQL is part of the key
+    sql = _digest(sorted(views.items()))
+    members = None if universe is None else _digest(universe[['ticker', 'asset_class', 'exchange', 'interval']].astype(str).to_numpy().tolist())
+    key = ("view", view, ticker, asset_class, file_identity(clean_root), quarantine_identity(quarantine_root),
+           members, sql, marker, date.today().isoformat())
+
+    def run():
+        con = analyst_connection(clean_root, quarantine_root, universe, views)
+        try:
+            sql, params = _filtered_sql(con, view, ticker, asset_class)
+            return con.execute(sql, params).fetchdf()
+        finally:
+            con.close()
+
+    return cached(key, run)
+
+if __name__ == "__main__":
+    # python src/analyst_views.py                          -> list views
+    # python src/analyst_views.py last_7_days --ticker AAPL --out aapl_week.csv
+    import yaml
+    import argparse
+    from universe import load_universe
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Query analyst views over the clean store")
+    parser.add_argument("view", nargs="?")
+    parser.add_argument("--ticker")
+    parser.add_argument("--asset-class")
+    parser.add_argument("--out", help="Write the result to .csv or .parquet instead of printing it")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    data_folder = settings['data_folder']
+    views = pipeline.get('analyst_views') or DEFAULT_VIEWS
+
+    if not args.view:
+        for name, sql in views.items():
+            print(f"{name:<16} {sql}")
+        raise SystemExit(0)
+
+    df = materialize(
+        args.view,
+        settings.get('clean_store', f"{data_folder}/clean"),
+        settings.get('quarantine_store', f"{data_folder}/quarantine"),
+        load_universe(pipeline),
+        views,
+        ticker=args.ticker,
+        asset_class=args.asset_class,
+    )
+    if args.out:
+        if args.out.endswith(".parquet"):
+            df.to_parquet(args.out, index=False)
+        else:
+            df.to_csv(args.out, index=False)
+        logger.info(f"Wrote {len(df)} rows of {args.view} to {args.out}")
+    else:
+        print(df.to_string(max_rows=50))
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+from batch_forecast import forecast_batch, BATCH_ENGINES
+
+logger = logging.getLogger("Backtester")
+
+# Rolling-origin defaults: 20 cutoffs, each scored on the next 30 bars
+DEFAULT_CUTOFFS = 20
+DEFAULT_HORIZON = 30
+# The first cutoff keeps at least this share of the history for training
+INITIAL_FRACTION = 0.5
+# Adjacent cutoffs handled by one Prophet task, each fit warm-starts from the previous one
+PROPHET_BLOCK = 5
+
+CV_COLUMNS = ['ticker', 'ds', 'cutoff', 'y', 'yhat', 'yhat_lower', 'yhat_upper']
+
+def cutoff_positions(n_bars, n_cutoffs, horizon):
+    """
+    Integer cutoff positions (last training bar), oldest first and evenly spaced so the
+    last window ends on the final bar. Positions count from the start of each series.
+    """
+    last = n_bars - horizon - 1
+    first = max(int(n_bars * INITIAL_FRACTION), 2)
+    if last < first:
+        return []
+    return sorted(set(np.linspace(first, last, num=n_cutoffs).round().astype(int).tolist()))
+
+def series_fingerprint(series):
+    """sha256 of a series' timestamps and values: the cache is invalidated by any revision"""
+    h = hashlib.sha256()
+    h.update(pd.DatetimeIndex(series.index).as_unit('ns').asi8.tobytes())
+    h.update(series.to_numpy(dtype=float).tobytes())
+    return h.hexdigest()
+
+def cache_key(fingerprint, engine, params, n_cutoffs, horizon):
+    payload = json.dumps({'data': fingerprint, 'engine': engine, 'params': params,
+                          'cutoffs': n_cutoffs, 'horizon': horizon}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _stan_init(m):
+    """Fitted parameters of a Prophet model, used as the starting point of the next fit"""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = m.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        res[pname] = m.params[pname][0]
+    return res
+
+def _prophet_block(ticker, series, positions, horizon, params):
+    """
+    Fit Prophet at each cutoff of one block (oldest first) and forecast the next `horizon`
+    actual bars. Each fit starts from the previous cutoff's parameters, adjacent cutoffs
+    share most of their history so the optimizer converges in far fewer iterations.
+    """
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    df = pd.DataFrame({'ds': series.index, 'y': series.to_numpy(dtype=float)})
+    frames = []
+    previous = None
+    for pos in positions:
+        m = Prophet(**params)
+        if previous is None:
+            m.fit(df.iloc[:pos + 1])
+        else:
+            m.fit(df.iloc[:pos + 1], init=_stan_init(previous))
+        previous = m
+
+        future = df.iloc[pos + 1:pos + 1 + horizon]
+        pred = m.predict(future[['ds']])
+        frames.append(pd.DataFrame({
+            'ticker': ticker,
+            'ds': future['ds'].to_numpy(),
+            'cutoff': df['ds'].iloc[pos],
+            'y': future['y'].to_numpy(),
+            'yhat': pred['yhat'].to_numpy(),
+            'yhat_lower': pred['yhat_lower'].to_numpy(),
+            'yhat_upper': pred['yhat_upper'].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+def _batch_cutoff(engine, series, steps_back, horizon, batch_params):
+    """
+    One cutoff shared by tickers of a batch engine: truncate each series `steps_back` bars
+    before its end, fit them all in one stacked call and score the next `horizon` bars.
+    """
+    truncated = {t: s.iloc[:len(s) - steps_back] for t, s in series.items()}
+    forecasts, _ = forecast_batch(truncated, engine, horizon=horizon, **batch_params)
+
+    frames = []
+    for ticker, fc in forecasts.groupby('ticker', sort=False):
+        s = series[ticker]
+        cut = len(s) - steps_back - 1
+        future = s.iloc[cut + 1:cut + 1 + horizon]
+        fc = fc.iloc[-horizon:].iloc[:len(future)]
+        frames.append(pd.DataFrame({
+            'ticker': ticker,
+            # Scored against the real next bars, not the engine's projected calendar
+            'ds': future.index.to_numpy(),
+            'cutoff': s.index[cut],
+            'y': future.to_numpy(dtype=float),
+            'yhat': fc['yhat'].to_numpy(),
+            'yhat_lower': fc['yhat_lower'].to_numpy(),
+            'yhat_upper': fc['yhat_upper'].to_numpy(),
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=CV_COLUMNS)
+
+def summarize(cv):
+    """
+    Per ticker out-of-sample quality from the rolling-origin predictions:
+    prophet.diagnostics.performance_metrics over all horizons (mae, mape, coverage...) plus
+    the alert rates the pipeline would see: share of actuals outside the band overall and
+    on the first bar after each cutoff (the latest-bar check run in production).
+    """
+    from prophet.diagnostics import performance_metrics
+
+    rows = []
+    for ticker, group in cv.groupby('ticker', sort=False):
+        group = group.sort_values(['cutoff', 'ds'])
+        outside = (group['y'] < group['yhat_lower']) | (group['y'] > group['yhat_upper'])
+        first_step = group.groupby('cutoff').head(1)
+        first_outside = (first_step['y'] < first_step['yhat_lower']) | (first_step['y'] > first_step['yhat_upper'])
+
+        metrics = performance_metrics(group.drop(columns='ticker'), rolling_window=1).iloc[-1]
+        rows.append({
+            'ticker': ticker,
+            'cutoffs': group['cutoff'].nunique(),
+            'mae': metrics['mae'],
+            'mape': metrics.get('mape', np.nan),
+            'coverage': metrics['coverage'],
+            'alert_rate': outside.mean(),
+            'alert_rate_first_bar': first_outside.mean(),
+        })
+    return pd.DataFrame(rows).set_index('ticker') if rows else pd.DataFrame()
+
+def run_backtest(series, engines, cache_dir, n_cutoffs=DEFAULT_CUTOFFS, horizon=DEFAULT_HORIZON,
+                 workers=None, prophet_params=None, batch_params=None, sink=None):
+    """
+    Rolling-origin backtest.
+
+    series:  {ticker: Close series with a DatetimeIndex}
+    engines: {ticker: 'prophet' | 'ets' | 'ar' | 'seasonal_naive'}
+    Work is spread over a process pool: Prophet tickers as blocks of adjacent cutoffs
+    (warm-started fits), batch engines as one task per cutoff shared by the tickers it applies to.
+    Results are cached per ticker in cache_dir under a hash of the data and parameters,
+    so re-running on unchanged data is a file read.
+    Returns (cv rows, per ticker summary).
+    """
+    prophet_params = prophet_params or {}
+    batch_params = batch_params or {}
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # 1 Cache lookup
+    keys, cached, todo = {}, [], {}
+    for ticker, s in series.items():
+        engine = engines.get(ticker, 'prophet')
+        params = prophet_params if engine == 'prophet' else batch_params
+        keys[ticker] = cache_key(series_fingerprint(s), engine, params, n_cutoffs, horizon)
+        path = os.path.join(cache_dir, f"{keys[ticker]}.parquet")
+        if os.path.exists(path):
+            cached.append(pd.read_parquet(path))
+        else:
+            todo[ticker] = s
+    logger.info(f"Backtest: {len(series)} tickers, {len(series) - len(todo)} from cache")
+
+    # 2 Fan out the missing ones
+    results = []
+    if todo:
+        # spawn: the parent may hold threads (MLflow sink) that must not be forked
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = []
+            by_engine = {}
+            for ticker, s in todo.items():
+                engine = engines.get(ticker, 'prophet')
+                if engine in BATCH_ENGINES:
+                    by_engine.setdefault(engine, {})[ticker] = s
+                    continue
+                positions = cutoff_positions(len(s), n_cutoffs, horizon)
+                for i in range(0, len(positions), PROPHET_BLOCK):
+                    futures.append(pool.submit(_prophet_block, ticker, s, positions[i:i + PROPHET_BLOCK], horizon, prophet_params))
+
+            # Each ticker's cutoffs come from its own length, like the Prophet path, so a cached result
+            # does not depend on which tickers were recomputed with it. Tickers whose cutoffs line up
+            # (same number of bars back from the end) share one stacked fit.
+            for engine, group in by_engine.items():
+                aligned = {}
+                for ticker, s in group.items():
+                    for pos in cutoff_positions(len(s), n_cutoffs, horizon):
+                        aligned.setdefault(len(s) - pos - 1, {})[ticker] = s
+                for steps_back, members in sorted(aligned.items()):
+                    futures.append(pool.submit(_batch_cutoff, engine, members, steps_back, horizon, batch_params))
+
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    fresh = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=CV_COLUMNS)
+
+    # 3 Cache each ticker's rows
+    for ticker, rows in fresh.groupby('ticker', sort=False):
+        path = os.path.join(cache_dir, f"{keys[ticker]}.parquet")
+        tmp = path + ".tmp"
+        rows.sort_values(['cutoff', 'ds']).to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    cv = pd.concat(cached + [fresh], ignore_index=True)
+    summary = summarize(cv)
+
+    # 4 MLflow (background sink), one run per ticker
+    if sink is not None:
+        for ticker, row in summary.iterrows():
+            sink.log_run(
+                f"Backtest_{ticker}_{keys[ticker]}",
+                params={'ticker': ticker, 'engine': engines.get(ticker, 'prophet'), 'cutoffs': n_cutoffs,
+                        'horizon': horizon, 'cache_key': keys[ticker]},
+                metrics={k: float(v) for k, v in row.items() if pd.notna(v)},
+                tags={'from_cache': str(ticker not in todo).lower()},
+                run_name=f"Backtest_{ticker}",
+            )
+            sink.end_run(f"Backtest_{ticker}_{keys[ticker]}")
+    return cv, summary
+
+if __name__ == "__main__":
+    # Standalone service: backtests the latest validated history of the ML universe
+    # python src/backtest.py [--tickers AAPL EURUSD=X] [--cutoffs 20] [--horizon 30] [--workers 8]
+    from forecast_analysis import config, sink, PROPHET_PARAMS
+    from run_journal import open_journal, latest_artifacts
+    from universe import load_universe
+
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast anomaly bands")
+    parser.add_argument("--tickers", nargs="+", help="Default: every ML ticker of the universe")
+    parser.add_argument("--cutoffs", type=int, default=DEFAULT_CUTOFFS)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    settings = config['pipeline']['settings']
+    data_folder = settings['data_folder']
+    universe = load_universe(config['pipeline']).set_index('ticker')
+    tickers = args.tickers or universe.index[universe['ml']].tolist()
+    engines = {t: (universe.loc[t, 'engine'] if t in universe.index else None) or 'prophet' for t in tickers}
+
+    # Clean Parquet written by the last run that validated each ticker
+    journal = open_journal(settings.get('journal_db', f"{data_folder}/run_journal.db"))
+    files = latest_artifacts(journal, "validate", set(tickers))
+    missing = sorted(set(tickers) - set(files))
+    if missing:
+        logger.warning(f"No validated history for {missing}, run the pipeline first")
+
+    series = {}
+    for t, path in files.items():
+        close = pd.read_parquet(path)['Close'].dropna()
+        close.index = pd.DatetimeIndex(close.index).tz_localize(None) if close.index.tz is not None else close.index
+        series[t] = close
+
+    batch_cfg = config['pipeline'].get('batch_forecast', {}) or {}
+    t0 = time.perf_counter()
+    cv, summary = run_backtest(
+        series, engines, os.path.join(data_folder, "backtests"),
+        n_cutoffs=args.cutoffs, horizon=args.horizon, workers=args.workers,
+        prophet_params=PROPHET_PARAMS,
+        batch_params={'interval_width': batch_cfg.get('interval_width', 0.95),
+                      'season_length': batch_cfg.get('season_length', 5)},
+        sink=sink,
+    )
+    out = os.path.join(data_folder, f"BACKTEST_SUMMARY_{datetime.now():%Y_%m_%d}.csv")
+    summary.to_csv(out)
+    logger.info(f"Backtest finished in {time.perf_counter() - t0:.1f}s. Summary: {out}")
+    print(summary.to_string())
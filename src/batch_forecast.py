@@ -0,0 +1,221 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("BatchForecaster")
+
+# Engines selectable per ticker (universe 'engine' column / ml_engines in config.yaml)
+BATCH_ENGINES = ('ets', 'ar', 'seasonal_naive')
+ENGINES = ('prophet',) + BATCH_ENGINES
+
+# ETS smoothing grid, every (alpha, beta) pair is fitted for every series in one pass
+ETS_ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9, 1.0)
+ETS_BETAS = (0.0, 0.05, 0.2)
+ETS_DAMPING = 0.98
+AR_ORDER = 5
+AR_RIDGE = 1e-8
+
+FORECAST_COLUMNS = ['ticker', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+def stack_series(series):
+    """
+    {ticker: Close series} -> (tickers, (n, T) log-price matrix, [int64 ns timestamps per ticker]).
+    Series are right-aligned on their last bar and left-padded with NaN, so every
+    model step is one array operation across all tickers.
+    """
+    tickers, values, stamps = [], [], []
+    for t, s in series.items():
+        v = s.to_numpy(dtype=float)
+        ok = ~np.isnan(v)
+        if ok.sum() < 3:
+            continue
+        tickers.append(t)
+        values.append(v[ok])
+        stamps.append(pd.DatetimeIndex(s.index).as_unit('ns').asi8[ok])
+
+    T = max((len(v) for v in values), default=0)
+    Y = np.full((len(tickers), T), np.nan)
+    for i, v in enumerate(values):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Y[i, T - len(v):] = np.where(v > 0, np.log(v), np.nan)
+    return tickers, Y, stamps
+
+def _holt(Y, alpha, beta, fitted=None):
+    """
+    One damped Holt pass over the columns of Y for len(alpha) / n parameter sets per series
+    (row r runs series r % n). Returns (level, trend, in-sample SSE) per row; the one-step
+    predictions are written into fitted (same shape as Y, one set per series) when given.
+    """
+    n, T = Y.shape
+    reps = len(alpha) // max(n, 1)
+    level = np.full(len(alpha), np.nan)
+    trend = np.zeros(len(alpha))
+    sse = np.zeros(len(alpha))
+    for t in range(T):
+        y = np.tile(Y[:, t], reps)
+        pred = level + ETS_DAMPING * trend
+        if fitted is not None:
+            fitted[:, t] = pred
+
+        err = y - pred
+        update = ~np.isnan(err)
+        sse += np.where(update, err, 0.0) ** 2
+        level = np.where(update, pred + alpha * err, level)
+        trend = np.where(update, ETS_DAMPING * trend + alpha * beta * err, trend)
+
+        # First observation of a series initialises its state
+        start = np.isnan(pred) & ~np.isnan(y)
+        level = np.where(start, y, level)
+    return level, trend, sse
+
+def _ets(Y, horizon):
+    """
+    Damped Holt (local level + trend) on log prices, error-correction form.
+    Returns (one-step fitted values (n, T), h-step forecasts (n, horizon)).
+    The grid pass only keeps the per-row state and SSE, the fitted values come from a second
+    pass with each series' best (alpha, beta): memory stays O(n x T) whatever the grid size.
+    """
+    n, T = Y.shape
+    grid = [(a, b) for a in ETS_ALPHAS for b in ETS_BETAS]
+    alpha = np.repeat([a for a, _ in grid], n)
+    beta = np.repeat([b for _, b in grid], n)
+
+    # Pick the (alpha, beta) with the lowest in-sample squared error per series
+    _, _, sse = _holt(Y, alpha, beta)
+    best = np.argmin(sse.reshape(len(grid), n), axis=0)
+    rows = best * n + np.arange(n)
+
+    fitted = np.full(Y.shape, np.nan)
+    level, trend, _ = _holt(Y, alpha[rows], beta[rows], fitted)
+    steps = np.cumsum(ETS_DAMPING ** np.arange(1, horizon + 1))
+    future = level[:, None] + trend[:, None] * steps[None, :]
+    return fitted, future
+
+def _ar(Y, horizon, order=AR_ORDER):
+    """
+    AR(order) with intercept on log returns, fitted for every series at once by batched
+    least squares (normal equations built lag pair by lag pair, so memory stays O(n*T)).
+    """
+    n, T = Y.shape
+    r = np.diff(Y, axis=1)
+    p = min(order, max(T - 2, 0))
+
+    # Design columns: intercept + p lagged returns, rows with any NaN get zero weight
+    target = r[:, p:]
+    cols = [np.ones_like(target)] + [r[:, p - k:r.shape[1] - k] for k in range(1, p + 1)]
+    valid = ~np.isnan(target)
+    for c in cols[1:]:
+        valid &= ~np.isnan(c)
+    w = valid.astype(float)
+    cols = [np.where(valid, c, 0.0) for c in cols]
+    target0 = np.where(valid, target, 0.0)
+
+    k = p + 1
+    XtX = np.empty((n, k, k))
+    Xty = np.empty((n, k))
+    for a in range(k):
+        Xty[:, a] = np.sum(cols[a] * target0 * w, axis=1)
+        for b in range(a, k):
+            XtX[:, a, b] = XtX[:, b, a] = np.sum(cols[a] * cols[b] * w, axis=1)
+    XtX += AR_RIDGE * np.eye(k)[None, :, :]
+    coef = np.linalg.solve(XtX, Xty[:, :, None])[:, :, 0]
+
+    # One-step fitted log price: previous log price + predicted return
+    pred_r = sum(coef[:, [a]] * cols[a] for a in range(k))
+    fitted = np.full((n, T), np.nan)
+    fitted[:, p + 1:] = np.where(valid, Y[:, p:-1] + pred_r, np.nan)
+
+    # Iterate the recursion forward from the last p returns
+    lags = [r[:, -j] if r.shape[1] >= j else np.zeros(n) for j in range(1, p + 1)]
+    lags = [np.nan_to_num(l) for l in lags]
+    future = np.empty((n, horizon))
+    level = Y[:, -1]
+    for h in range(horizon):
+        step = coef[:, 0] + sum(coef[:, j] * lags[j - 1] for j in range(1, k))
+        level = level + step
+        future[:, h] = level
+        lags = [step] + lags[:-1]
+    return fitted, future
+
+def _seasonal_naive(Y, horizon, season_length):
+    """y_hat(t) = y(t - season_length); the forecast repeats the last observed season"""
+    n, T = Y.shape
+    s = max(1, min(season_length, T))
+    fitted = np.full((n, T), np.nan)
+    fitted[:, s:] = Y[:, :T - s]
+    last_season = Y[:, T - s:]
+    future = last_season[:, np.arange(horizon) % s]
+    return fitted, future
+
+def _horizon_scale(engine, horizon, season_length):
+    """How the one-step residual spread widens with the forecast step"""
+    h = np.arange(1, horizon + 1)
+    if engine == 'seasonal_naive':
+        return np.sqrt(np.ceil(h / max(1, season_length)))
+    return np.sqrt(h)
+
+def forecast_batch(series, engine, horizon=30, interval_width=0.95, season_length=5):
+    """
+    Fit one engine to many series at once.
+
+    series: {ticker: Close series with a DatetimeIndex}, tickers with < 3 values are skipped
+    Returns (forecasts, summary):
+      forecasts: long DataFrame[ticker, ds, yhat, yhat_lower, yhat_upper], in-sample + horizon
+                 future bars per ticker, the same columns as the Prophet path
+      summary:   DataFrame indexed by ticker with mape_percent and is_anomaly (latest close
+                 outside its one-step-ahead band)
+    Intervals are empirical quantiles of each series' one-step residuals (no normality assumption).
+    """
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Unknown batch engine '{engine}', expected one of {BATCH_ENGINES}")
+
+    tickers, Y, stamps = stack_series(series)
+    if not tickers:
+        return pd.DataFrame(columns=FORECAST_COLUMNS), pd.DataFrame(columns=['mape_percent', 'is_anomaly'])
+
+    if engine == 'ets':
+        fitted, future = _ets(Y, horizon)
+    elif engine == 'ar':
+        fitted, future = _ar(Y, horizon)
+    else:
+        fitted, future = _seasonal_naive(Y, horizon, season_length)
+
+    # Empirical residual band (log space), widened with the forecast step
+    resid = Y - fitted
+    q = (1 - interval_width) / 2
+    resid[np.isnan(resid).all(axis=1)] = 0.0
+    # Sorting pushes NaN to the end, so per-row quantiles are plain index lookups
+    resid.sort(axis=1)
+    counts = (~np.isnan(resid)).sum(axis=1)
+    rows = np.arange(len(tickers))
+    lo = resid[rows, np.floor(q * (counts - 1)).astype(int)]
+    hi = resid[rows, np.ceil((1 - q) * (counts - 1)).astype(int)]
+    scale = _horizon_scale(engine, horizon, season_length)
+
+    yhat = np.exp(np.concatenate([fitted, future], axis=1))
+    lower = np.exp(np.concatenate([fitted + lo[:, None], future + lo[:, None] * scale], axis=1))
+    upper = np.exp(np.concatenate([fitted + hi[:, None], future + hi[:, None] * scale], axis=1))
+
+    # Vectorized fit metrics + latest-bar check
+    T = Y.shape[1]
+    actual = np.exp(Y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ape = np.abs((actual - yhat[:, :T]) / actual)
+        mape = np.nanmean(np.where(np.isnan(fitted), np.nan, ape), axis=1) * 100
+    is_anomaly = (actual[:, -1] < lower[:, -1 - horizon]) | (actual[:, -1] > upper[:, -1 - horizon])
+
+    # Long output: each ticker's own bars + horizon future bars at its typical spacing
+    lengths = np.array([len(ts) for ts in stamps])
+    future_ds = [ts[-1] + np.median(np.diff(ts[-21:])).astype(np.int64) * np.arange(1, horizon + 1) for ts in stamps]
+    keep = (np.arange(T + horizon)[None, :] >= (T - lengths)[:, None])
+    ds = np.concatenate([np.concatenate([ts, f]) for ts, f in zip(stamps, future_ds)])
+
+    forecasts = pd.DataFrame({
+        'ticker': np.repeat(np.array(tickers, dtype=object), lengths + horizon),
+        'ds': ds.astype('datetime64[ns]'),
+        'yhat': yhat[keep],
+        'yhat_lower': lower[keep],
+        'yhat_upper': upper[keep],
+    })
+    summary = pd.DataFrame({'mape_percent': mape, 'is_anomaly': is_anomaly}, index=pd.Index(tickers, name='ticker'))
+    return forecasts, summary
@@ -1,9 +1,30 @@
 import streamlit as st
 import pandas as pd
-import glob
+import os
+import time
+import yaml
+import logging
 import plotly.graph_objects as go
 from datetime import datetime
 
+# Cached data-access layer (shared across sessions, invalidated when the pipeline publishes a run)
+from dashboard_data import check_published, latest_report, load_forecast, load_parquet, load_json, cache_stats
+from series_pyramid import load_window
+
+DATA_FOLDER = "data"
+logger = logging.getLogger("Dashboard")
+render_start = time.perf_counter()
+
+@st.cache_resource
+def load_settings():
+    """Pipeline settings, read once per server process instead of on every rerender"""
+    if not os.path.exists("config.yaml"):
+        return {}
+    with open("config.yaml", "r") as f:
+        return yaml.safe_load(f)['pipeline']['settings']
+
+POINT_BUDGET = load_settings().get('chart_point_budget', 2000)
+
 # PAGE CONFIG
 st.set_page_config(page_title="Financial Data Quality Monitor", layout="wide")
 
@@ -11,15 +32,17 @@ st.title("🛡️ Financial Data Quality Control Center")
 st.markdown("Monitoring pipeline status, data quality anomalies, and ML forecasts.")
 
 # 1. LOAD DATA
+# Drop cached frames if a new run was published since the last rerender
+published = check_published(DATA_FOLDER)
+
 # Find the latest Quarantine Report
-list_of_files = glob.glob('data/QUARANTINE_REPORT_*.csv')
-if list_of_files:
-    latest_file = max(list_of_files, key=os.path.getctime)
-    df_quarantine = pd.read_csv(latest_file)
+latest_file, df_quarantine = latest_report(DATA_FOLDER)
+if not df_quarantine.empty:
     st.sidebar.error(f"🚨 {len(df_quarantine)} Issues Detected Today")
 else:
-    df_quarantine = pd.DataFrame()
     st.sidebar.success("✅ System Healthy: No Issues")
+if published:
+    st.sidebar.caption(f"Latest run: {published['run_id']}")
 
 # 2. KEY METRICS (Business Value View)
 col1, col2, col3 = st.columns(3)
@@ -32,7 +55,7 @@ st.divider()
 # 3. QUARANTINE MANAGER
 st.subheader("⚠️ Data Quarantine (Action Required)")
 if not df_quarantine.empty:
-    st.dataframe(df_quarantine[['Ticker', 'qa_reason', 'Close']].style.applymap(lambda x: 'color: red'))
+    st.dataframe(df_quarantine[['Ticker', 'qa_reason', 'Close']].style.map(lambda x: 'color: red'))
 else:
     st.info("No data quality issues found in the latest run.")
 
@@ -40,11 +63,42 @@ else:
 st.subheader("📈 Forecast & Anomaly Inspection")
 ticker = st.selectbox("Select Asset for Analysis", ["EURUSD=X", "AAPL", "BTC-USD"])
 
+# Prefer the pre-aggregated pyramid: the payload stays under POINT_BUDGET whatever the history length
+pyramid_dir = os.path.join(DATA_FOLDER, "pyramid", ticker, "forecast")
+manifest = load_json(os.path.join(pyramid_dir, "manifest.json"))
+
 # Try to load the forecast file
-try:
-    forecast_file = f"data/{ticker}_forecast.csv"
-    df_forecast = pd.read_csv(forecast_file)
-    
+df_forecast = load_forecast(DATA_FOLDER, ticker) if manifest is None else None
+if manifest is not None:
+    full = manifest['levels'][0]
+    full_start = pd.Timestamp(full['start']).to_pydatetime()
+    full_end = pd.Timestamp(full['end']).to_pydatetime()
+    start, end = st.slider("Zoom window", min_value=full_start, max_value=full_end, value=(full_start, full_end))
+
+    level, df_chart = load_window(pyramid_dir, start, end, POINT_BUDGET, reader=load_parquet, manifest=manifest)
+    x = df_chart.index
+
+    fig = go.Figure()
+    # Band envelope (min of lower / max of upper per bucket)
+    fig.add_trace(go.Scatter(x=x, y=df_chart['yhat_upper'], mode='lines', name='Upper Bound',
+                             line=dict(width=0), showlegend=False))
+    fig.add_trace(go.Scatter(x=x, y=df_chart['yhat_lower'], mode='lines', name='Lower Bound', fill='tonexty',
+                             line=dict(width=0), fillcolor='rgba(0,0,255,0.1)'))
+    fig.add_trace(go.Scatter(x=x, y=df_chart['yhat'], mode='lines', name='Forecast', line=dict(color='blue')))
+    # Actual range per bucket (M4 min / max): 'y' is the bucket's last value, so a spike inside a
+    # coarse bucket only shows in the envelope
+    if {'y_min', 'y_max'} <= set(df_chart.columns) and level > 0:
+        fig.add_trace(go.Scatter(x=x, y=df_chart['y_max'], mode='lines', name='Actual High',
+                                 line=dict(width=0), showlegend=False))
+        fig.add_trace(go.Scatter(x=x, y=df_chart['y_min'], mode='lines', name='Actual Range', fill='tonexty',
+                                 line=dict(width=0), fillcolor='rgba(0,0,0,0.2)'))
+    if 'y' in df_chart.columns:
+        fig.add_trace(go.Scatter(x=x, y=df_chart['y'], mode='lines', name='Actual', line=dict(color='black', width=1)))
+
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Resolution level {level}: {len(df_chart)} points (budget {POINT_BUDGET})")
+
+elif df_forecast is not None:
     # Plot with Plotly (Interactive)
     fig = go.Figure()
     
@@ -61,5 +115,11 @@ try:
     
     st.plotly_chart(fig, use_container_width=True)
     
-except FileNotFoundError:
-    st.warning(f"No forecast data found for {ticker}. Run the pipeline first.")
\ No newline at end of file
+else:
+    st.warning(f"No forecast data found for {ticker}. Run the pipeline first.")
+
+# 5. RENDER TIME (should stay flat as reports accumulate)
+render_ms = (time.perf_counter() - render_start) * 1000
+stats = cache_stats()
+st.sidebar.caption(f"Rendered in {render_ms:.0f} ms · cache {stats['hits']} hits / {stats['misses']} misses · {stats['entries']}/{stats['max_entries']} entries")
+logger.info(f"Dashboard render {render_ms:.1f} ms ({stats})")
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+logger = logging.getLogger("DashboardData")
+
+# Written by the pipeline after each run, the dashboard drops its cache when it changes
+PUBLISH_MARKER = "_LATEST_RUN.json"
+
+# Process-wide cache: Streamlit imports this module once per server, so every
+# analyst session shares it. Keys include (path, mtime, size, inode) so an overwritten
+# file is never served stale.
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {'hits': 0, 'misses': 0}
+_MAX_ENTRIES = 32
+_SEEN_MARKER = None
+
+def set_max_entries(n):
+    global _MAX_ENTRIES
+    _MAX_ENTRIES = max(1, int(n))
+
+def file_identity(path):
+    """
+    (path, mtime_ns, size, inode) or None if the file does not exist.
+    The inode catches atomic replaces (tmp + rename) that land within the mtime resolution.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size, st.st_ino)
+
+def cached(key, loader):
+    """Return loader() memoized under key, evicting the least recently used entry when full"""
+    with _LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            _STATS['hits'] += 1
+            return _CACHE[key]
+
+    value = loader()
+
+    with _LOCK:
+        _STATS['misses'] += 1
+        _CACHE[key] = value
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _MAX_ENTRIES:
+            _CACHE.popitem(last=False)
+    return value
+
+def invalidate():
+    """Drop every cached entry (explicit invalidation on a new pipeline run)"""
+    with _LOCK:
+        _CACHE.clear()
+
+def cache_stats():
+    with _LOCK:
+        return {**_STATS, 'entries': len(_CACHE), 'max_entries': _MAX_ENTRIES}
+
+def publish_run(data_folder, run_id, report_path=None):
+    """Pipeline side: atomically announce a finished run to the dashboard"""
+    marker = os.path.join(data_folder, PUBLISH_MARKER)
+    tmp = marker + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({'run_id': run_id, 'report': report_path, 'published_at': time.time()}, f)
+    os.replace(tmp, marker)
+    return marker
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def check_published(data_folder):
+    """Dashboard side: invalidate the cache once per newly published run. Returns the marker payload."""
+    global _SEEN_MARKER
+    marker = os.path.join(data_folder, PUBLISH_MARKER)
+    identity = file_identity(marker)
+
+    if identity != _SEEN_MARKER:
+        if _SEEN_MARKER is not None:
+            logger.info("New pipeline run published, invalidating dashboard cache")
+            invalidate()
+        _SEEN_MARKER = identity
+
+    if identity is None:
+        return None
+    return cached(("marker",) + identity, lambda: _read_json(marker))
+
+def list_reports(data_folder):
+    """
+    QUARANTINE_REPORT_YYYY_MM_DD.csv paths, newest first.
+    Keyed by the folder's own mtime (it changes when a report is added/removed), so the
+    directory is scanned once per change instead of stat-ing every report on each rerender.
+    """
+    dir_identity = file_identity(data_folder)
+    if dir_identity is None:
+        return []
+
+    def scan():
+        with os.scandir(data_folder) as it:
+            names = [e.name for e in it if e.name.startswith("QUARANTINE_REPORT_") and e.name.endswith(".csv")]
+        # Dates are in the file name, so the lexical max is the latest report
+        return [os.path.join(data_folder, n) for n in sorted(names, reverse=True)]
+
+    return cached(("reports",) + dir_identity, scan)
+
+def load_csv(path, **read_kwargs):
+    """Memoized pd.read_csv keyed by file identity. Returns None if the file does not exist."""
+    identity = file_identity(path)
+    if identity is None:
+        return None
+    key = ("csv",) + identity + (tuple(sorted(read_kwargs.items())),)
+    return cached(key, lambda: pd.read_csv(path, **read_kwargs))
+
+def load_parquet(path):
+    """Memoized pd.read_parquet keyed by file identity. Returns None if the file does not exist."""
+    identity = file_identity(path)
+    if identity is None:
+        return None
+    return cached(("parquet",) + identity, lambda: pd.read_parquet(path))
+
+def load_json(path):
+    """Memoized JSON file (pyramid manifests), or None"""
+    identity = file_identity(path)
+    if identity is None:
+        return None
+    return cached(("json",) + identity, lambda: _read_json(path))
+
+def latest_report(data_folder):
+    """(path, DataFrame) of the newest quarantine report, or (None, empty DataFrame)"""
+    reports = list_reports(data_folder)
+    if not reports:
+        return None, pd.DataFrame()
+    df = load_csv(reports[0])
+    return reports[0], (df if df is not None else pd.DataFrame())
+
+def load_forecast(data_folder, ticker):
+    """The published forecast for a ticker, or None"""
+    return load_csv(os.path.join(data_folder, f"{ticker}_forecast.csv"))
@@ -0,0 +1,347 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("DataProfiles")
+
+# Profiled per partition; Return and VolumeChange are the log changes of Close and Volume
+# (level free, comparable across years)
+PROFILE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Return', 'VolumeChange']
+# Compared by distribution shape (KS / PSI). Raw Volume trends and clusters for months, so its
+# shape always differs from last year's: it is only compared by level, like the prices.
+SHAPE_COLUMNS = ('Return', 'VolumeChange')
+LEVEL_FREE_COLUMNS = ('Return', 'VolumeChange')
+DISTINCT_COLUMNS = ('Volume',)
+
+DIGEST_DELTA = 200   # t-digest compression, at most ~delta/2 centroids per sketch
+HLL_P = 11           # 2048 HyperLogLog registers, ~2.3% distinct-count error
+PSI_BINS = 10        # reference deciles
+
+# Used when config.yaml has no profiles section
+DRIFT_THRESHOLDS = {
+    'level_log10': 0.5,   # median moved by more than ~3x (a unit switch is 3.0)
+    'ks': 0.3,            # max CDF distance
+    'psi': 0.25,          # population stability index over the reference deciles
+    'null_rate': 0.1,     # increase in the share of missing values
+}
+
+def partition_grain(interval):
+    """Monthly partitions for daily bars, daily partitions for intraday bars"""
+    return 'M' if interval in (None, '1d') else 'D'
+
+def partition_keys(index, grain):
+    """'YYYY-MM' / 'YYYY-MM-DD' per bar (local wall time), formatting only the distinct periods"""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    periods, inverse = np.unique(idx.values.astype(f"datetime64[{grain}]"), return_inverse=True)
+    return np.datetime_as_string(periods)[inverse]
+
+def profile_path(profile_root, ticker):
+    return os.path.join(profile_root, f"{str(ticker).replace(os.sep, '_')}.parquet")
+
+# t-digest (merging variant, k1 scale): centroids are sorted (mean, weight) pairs
+
+def _k1(q, delta):
+    return delta / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+def digest_compress(means, weights, delta=DIGEST_DELTA):
+    """
+    Merge centroids into at most ~delta/2 clusters, small at the tails and large in the middle.
+    Raw values are centroids of weight 1, so the same function builds and merges digests.
+    """
+    means, weights = np.asarray(means, dtype=float), np.asarray(weights, dtype=float)
+    if len(means) == 0:
+        return means, weights
+    order = np.argsort(means, kind='stable')
+    means, weights = means[order], weights[order]
+    q_mid = (np.cumsum(weights) - weights / 2) / weights.sum()
+    cluster = np.floor(_k1(q_mid, delta))
+    starts = np.flatnonzero(np.r_[True, cluster[1:] != cluster[:-1]])
+    w = np.add.reduceat(weights, starts)
+    return np.add.reduceat(means * weights, starts) / w, w
+
+def _digest_curve(sketch):
+    """(values, cumulative probabilities) through min, the centroid midpoints and max"""
+    means, weights = sketch['digest_means'], sketch['digest_weights']
+    mid = (np.cumsum(weights) - weights / 2) / weights.sum()
+    return np.r_[sketch['min'], means, sketch['max']], np.r_[0.0, mid, 1.0]
+
+def digest_quantile(sketch, q):
+    values, probs = _digest_curve(sketch)
+    return np.interp(q, probs, values)
+
+def digest_cdf(sketch, x):
+    values, probs = _digest_curve(sketch)
+    return np.interp(x, values, probs)
+
+# HyperLogLog, stored sparse (register index, rank) since most partitions hold few values
+
+def hll_registers(values, p=HLL_P):
+    """Sparse HLL registers of the distinct values"""
+    h = pd.util.hash_array(np.asarray(values, dtype=np.float64))
+    idx = (h >> np.uint64(64 - p)).astype(np.int64)
+    rest = (h & np.uint64((1 << (64 - p)) - 1)).astype(np.float64)   # exact, below 2**53
+    rank = (64 - p) - np.frexp(rest)[1] + 1                           # leading zeros + 1
+    return _sparse(idx, rank, p)
+
+def _sparse(idx, rank, p=HLL_P):
+    regs = np.zeros(1 << p, dtype=np.int8)
+    np.maximum.at(regs, np.asarray(idx, dtype=np.int64), np.asarray(rank, dtype=np.int8))
+    nz = np.flatnonzero(regs)
+    return nz.astype(np.int32), regs[nz]
+
+def hll_estimate(idx, rank, p=HLL_P):
+    m = 1 << p
+    regs = np.zeros(m)
+    regs[np.asarray(idx, dtype=np.int64)] = rank
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -regs)
+    zeros = m - len(idx)
+    if estimate <= 2.5 * m and zeros:
+        # Small-range correction (linear counting)
+        estimate = m * np.log(m / zeros)
+    return float(estimate)
+
+# Profiles
+
+def _values(df):
+    cols = {c: pd.to_numeric(df[c], errors='coerce') for c in PROFILE_COLUMNS if c in df.columns}
+    if 'Close' in cols:
+        cols['Return'] = np.log(cols['Close'].where(cols['Close'] > 0)).diff()
+    if 'Volume' in cols:
+        cols['VolumeChange'] = np.log(cols['Volume'].where(cols['Volume'] > 0)).diff()
+    return pd.DataFrame(cols, index=df.index)
+
+def _sketch(x, column):
+    """Profile of one column in one partition"""
+    rows = len(x)
+    x = x[np.isfinite(x)]
+    n = len(x)
+    sketch = {'rows': rows, 'nulls': rows - n, 'count': n}
+    if n == 0:
+        sketch.update({'min': np.nan, 'max': np.nan, 'mean': np.nan, 'm2': 0.0, 'm3': 0.0, 'm4': 0.0,
+                       'digest_means': np.array([]), 'digest_weights': np.array([])})
+    else:
+        d = x - x.mean()
+        means, weights = digest_compress(x, np.ones(n))
+        sketch.update({'min': x.min(), 'max': x.max(), 'mean': x.mean(),
+                       'm2': (d ** 2).sum(), 'm3': (d ** 3).sum(), 'm4': (d ** 4).sum(),
+                       'digest_means': means, 'digest_weights': weights})
+    if column in DISTINCT_COLUMNS:
+        sketch['hll_idx'], sketch['hll_rank'] = hll_registers(x)
+    return sketch
+
+def build_profiles(df, grain, partitions=None):
+    """
+    One row per (partition, column) with the mergeable sketches: counts, min/max, central
+    moments, t-digest centroids and (for Volume) HLL registers. partitions limits the work to
+    the listed partition keys.
+    """
+    values = _values(df)
+    keys = partition_keys(values.index, grain)
+    rows = []
+    for key in (pd.unique(keys) if partitions is None else partitions):
+        part = values[keys == key]
+        if part.empty:
+            continue
+        for column in part.columns:
+            rows.append({'partition': key, 'column': column, 'grain': grain,
+                         'first_ts': part.index[0], 'last_ts': part.index[-1],
+                         **_sketch(part[column].to_numpy(dtype=float), column)})
+    return pd.DataFrame(rows)
+
+def update_profiles(profile_root, ticker, df, grain, stale=()):
+    """
+    Incremental profiling: only partitions not stored yet and the latest stored one (which was
+    probably still filling up) are computed, the rest are kept as they are.
+    stale: partition keys to compute again anyway (e.g. the ones holding vendor-revised bars).
+    Returns (all profiles, recomputed partition keys).
+    """
+    path = profile_path(profile_root, ticker)
+    stored = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    keys = pd.unique(partition_keys(df.index, grain))
+    if not stored.empty and (stored['grain'] == grain).all():
+        done, last, stale = set(stored['partition']), stored['partition'].max(), set(stale)
+        todo = [k for k in keys if k not in done or k >= last or k in stale]
+        stored = stored[~stored['partition'].isin(todo)]
+    else:
+        todo, stored = list(keys), pd.DataFrame()
+
+    fresh = build_profiles(df, grain, todo)
+    profiles = pd.concat([stored, fresh], ignore_index=True) if not stored.empty else fresh
+    if profiles.empty:
+        return profiles, todo
+    profiles = profiles.sort_values(['partition', 'column'], ignore_index=True)
+
+    os.makedirs(profile_root, exist_ok=True)
+    tmp = f"{path}.tmp"
+    profiles.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return profiles, todo
+
+def _merge_pair(a, b):
+    """Combine two sketches of the same column (Pebay's pairwise update for the moments)"""
+    if a['count'] == 0 or b['count'] == 0:
+        out = dict(b if a['count'] == 0 else a)
+        out['rows'], out['nulls'] = a['rows'] + b['rows'], a['nulls'] + b['nulls']
+    else:
+        na, nb = a['count'], b['count']
+        n = na + nb
+        d = b['mean'] - a['mean']
+        m2 = a['m2'] + b['m2'] + d ** 2 * na * nb / n
+        m3 = (a['m3'] + b['m3'] + d ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * d * (na * b['m2'] - nb * a['m2']) / n)
+        m4 = (a['m4'] + b['m4'] + d ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3
+              + 6 * d ** 2 * (na ** 2 * b['m2'] + nb ** 2 * a['m2']) / n ** 2
+              + 4 * d * (na * b['m3'] - nb * a['m3']) / n)
+        out = {'rows': a['rows'] + b['rows'], 'nulls': a['nulls'] + b['nulls'], 'count': n,
+               'min': min(a['min'], b['min']), 'max': max(a['max'], b['max']),
+               'mean': a['mean'] + d * nb / n, 'm2': m2, 'm3': m3, 'm4': m4,
+               'digest_means': np.r_[a['digest_means'], b['digest_means']],
+               'digest_weights': np.r_[a['digest_weights'], b['digest_weights']]}
+    if 'hll_idx' in a and 'hll_idx' in b:
+        out['hll_idx'] = np.r_[a['hll_idx'], b['hll_idx']]
+        out['hll_rank'] = np.r_[a['hll_rank'], b['hll_rank']]
+    return out
+
+def merge_profiles(profiles):
+    """
+    Merge partition rows into one sketch per column (a month, a year, a whole history)
+    without touching the raw bars. Returns {column: sketch}.
+    """
+    merged = {}
+    for column, rows in profiles.groupby('column', sort=False):
+        records = rows.to_dict('records')
+        for r in records:
+            for key in ('digest_means', 'digest_weights', 'hll_idx', 'hll_rank'):
+                if key in r and r[key] is not None and not (np.isscalar(r[key]) and pd.isna(r[key])):
+                    r[key] = np.asarray(r[key])
+                else:
+                    r.pop(key, None)
+        sketch = records[0]
+        for r in records[1:]:
+            sketch = _merge_pair(sketch, r)
+        sketch['digest_means'], sketch['digest_weights'] = digest_compress(sketch['digest_means'], sketch['digest_weights'])
+        if 'hll_idx' in sketch:
+            sketch['hll_idx'], sketch['hll_rank'] = _sparse(sketch['hll_idx'], sketch['hll_rank'])
+        sketch['first_ts'], sketch['last_ts'] = rows['first_ts'].min(), rows['last_ts'].max()
+        merged[column] = sketch
+    return merged
+
+def summarize(sketch):
+    """Readable statistics of one (merged) sketch"""
+    n = sketch['count']
+    out = {'rows': sketch['rows'], 'nulls': sketch['nulls'], 'null_rate': sketch['nulls'] / max(sketch['rows'], 1),
+           'min': sketch['min'], 'max': sketch['max'], 'mean': sketch['mean'],
+           'std': np.sqrt(sketch['m2'] / (n - 1)) if n > 1 else np.nan,
+           'skew': np.sqrt(n) * sketch['m3'] / sketch['m2'] ** 1.5 if n > 2 and sketch['m2'] > 0 else np.nan,
+           'kurtosis': n * sketch['m4'] / sketch['m2'] ** 2 - 3 if n > 3 and sketch['m2'] > 0 else np.nan}
+    for q in (0.01, 0.05, 0.5, 0.95, 0.99):
+        out[f"p{int(q * 100):02d}"] = float(digest_quantile(sketch, q)) if n else np.nan
+    if 'hll_idx' in sketch:
+        out['distinct'] = round(hll_estimate(sketch['hll_idx'], sketch['hll_rank'])) if n else 0
+    return out
+
+def drift_metrics(reference, current, column, min_count=10):
+    """Distances between two sketches of one column (NaN where a metric does not apply)"""
+    out = {'level_log10': np.nan, 'ks': np.nan, 'psi': np.nan,
+           'null_rate': current['nulls'] / max(current['rows'], 1) - reference['nulls'] / max(reference['rows'], 1)}
+    if reference['count'] == 0 or current['count'] == 0:
+        return out
+
+    # Level: the medians, robust even on the first bars of a partition (a unit switch shows at once)
+    if column not in LEVEL_FREE_COLUMNS:
+        ref_med, cur_med = abs(digest_quantile(reference, 0.5)), abs(digest_quantile(current, 0.5))
+        if ref_med > 0 and cur_med > 0:
+            out['level_log10'] = float(np.log10(cur_med / ref_med))
+
+    # Shape: KS on the union of centroids, PSI over the reference deciles
+    if column in SHAPE_COLUMNS and current['count'] >= min_count and reference['count'] >= min_count:
+        grid = np.union1d(reference['digest_means'], current['digest_means'])
+        out['ks'] = float(np.max(np.abs(digest_cdf(reference, grid) - digest_cdf(current, grid))))
+        edges = np.unique(digest_quantile(reference, np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+        ref_p = np.diff(np.r_[0.0, digest_cdf(reference, edges), 1.0])
+        cur_p = np.diff(np.r_[0.0, digest_cdf(current, edges), 1.0])
+        # Additive smoothing so an empty bin of a short partition does not dominate
+        ref_p = (ref_p * reference['count'] + 0.5) / (reference['count'] + 0.5 * len(ref_p))
+        cur_p = (cur_p * current['count'] + 0.5) / (current['count'] + 0.5 * len(cur_p))
+        out['psi'] = float(np.sum((cur_p - ref_p) * np.log(cur_p / ref_p)))
+    return out
+
+def detect_drift(profiles, reference_partitions=12, thresholds=None, current=None, min_count=10):
+    """
+    Compare the current partition (default: the latest) with the merged sketches of the
+    reference_partitions partitions before it. One row per column with its distances and
+    whether any crossed its threshold.
+    """
+    thresholds = {**DRIFT_THRESHOLDS, **(thresholds or {})}
+    if profiles is None or profiles.empty:
+        return pd.DataFrame()
+    keys = sorted(profiles['partition'].unique())
+    current = current or keys[-1]
+    reference_keys = [k for k in keys if k < current][-reference_partitions:]
+    if not reference_keys:
+        return pd.DataFrame()
+
+    ref = merge_profiles(profiles[profiles['partition'].isin(reference_keys)])
+    cur = merge_profiles(profiles[profiles['partition'] == current])
+    rows = []
+    for column, sketch in cur.items():
+        if column not in ref:
+            continue
+        metrics = drift_metrics(ref[column], sketch, column, min_count)
+        # Small partitions are noisy: KS must also beat its 1% critical value, PSI its expected
+        # value under no drift (bins - 1) * (1/n + 1/m)
+        noise = 1 / max(sketch['count'], 1) + 1 / max(ref[column]['count'], 1)
+        limits = {**thresholds, 'ks': max(thresholds['ks'], 1.63 * np.sqrt(noise)),
+                  'psi': thresholds['psi'] + (PSI_BINS - 1) * noise}
+        exceeded = [m for m, limit in limits.items()
+                    if pd.notna(metrics.get(m)) and (abs(metrics[m]) if m == 'level_log10' else metrics[m]) > limit]
+        rows.append({'column': column, 'current': current, 'reference': f"{reference_keys[0]}..{reference_keys[-1]}",
+                     'last_ts': sketch['last_ts'], **metrics, 'drifted': bool(exceeded), 'exceeded': ",".join(exceeded)})
+    return pd.DataFrame(rows)
+
+def drift_report(drift):
+    """Drifted columns in the validator format, stamped on the last bar of the current partition"""
+    flagged = drift[drift['drifted']] if not drift.empty else drift
+    if flagged.empty:
+        return pd.DataFrame(columns=['Close', 'qa_reason'], index=pd.DatetimeIndex([], name='Date'))
+    reasons = []
+    for _, r in flagged.iterrows():
+        parts = []
+        if 'level_log10' in r['exceeded']:
+            parts.append(f"level x{10 ** r['level_log10']:.3g}")
+        parts += [f"{m}={r[m]:.2f}" for m in ('ks', 'psi', 'null_rate') if m in r['exceeded']]
+        reasons.append(f"Distribution Drift: {r['column']} {' '.join(parts)} ({r['current']} vs {r['reference']})")
+    return pd.DataFrame({'Close': np.nan, 'qa_reason': reasons},
+                        index=pd.DatetimeIndex(flagged['last_ts'].to_numpy(), name='Date'))
+
+if __name__ == "__main__":
+    # python src/data_profiles.py AAPL                       -> whole history, per column
+    # python src/data_profiles.py AAPL --start 2024-01 --end 2024-12
+    # python src/data_profiles.py AAPL --drift
+    import yaml
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge stored partition profiles for a period")
+    parser.add_argument("ticker")
+    parser.add_argument("--start", help="First partition key (YYYY-MM or YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last partition key")
+    parser.add_argument("--drift", action="store_true", help="Compare the latest partition with the ones before it")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    params = pipeline.get('profiles') or {}
+    profiles = pd.read_parquet(profile_path(settings.get('profile_store', f"{settings['data_folder']}/profiles"), args.ticker))
+
+    if args.drift:
+        drift = detect_drift(profiles, params.get('reference_partitions', 12), params.get('thresholds'))
+        print(drift.drop(columns=['last_ts']).to_string(index=False))
+    else:
+        keys = profiles['partition']
+        selected = profiles[(keys >= (args.start or keys.min())) & (keys <= (args.end or keys.max()))]
+        summary = pd.DataFrame({c: summarize(s) for c, s in merge_profiles(selected).items()})
+        print(summary.to_string(float_format=lambda v: f"{v:.6g}"))
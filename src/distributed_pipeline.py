@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import logging
+import threading
+import subprocess
+import pandas as pd
+
+# Custom modules I created
+from run_pipeline3 import config, open_run, ingest_yahoo, ingest_ecb, ingest_intraday, run_batch_forecasts, process_ticker, run_peer_check, report_path
+from run_journal import open_journal, finish_run, completed_stage, record_stage, run_progress
+from quarantine_store import export_run_report
+from dashboard_data import publish_run
+from universe import load_universe, benchmark_keys
+from scheduler import ensure_schema, update_estimates, estimate_costs, simulate_makespan, report_accuracy
+from work_queue import (
+    open_queue, enqueue_run, run_payload, claim_shard, heartbeat, complete_shard,
+    cancel_pending, reset_unfinished, queue_status, shard_costs, claimable_shards
+)
+
+logger = logging.getLogger("ShardCoordinator")
+
+def _settings():
+    return config['pipeline']['settings']
+
+def _queue_db():
+    return _settings().get('queue_db', f"{_settings()['data_folder']}/work_queue.db")
+
+def _journal_db():
+    return _settings().get('journal_db', f"{_settings()['data_folder']}/run_journal.db")
+
+def _keep_alive(run_id, shard_id, worker_id, lease_seconds, stop):
+    """Background heartbeat: renew the lease every third of its length until the shard is finished"""
+    queue = open_queue(_queue_db())
+    while not stop.wait(lease_seconds / 3):
+        if not heartbeat(queue, run_id, shard_id, worker_id, lease_seconds):
+            logger.warning(f"[{worker_id}] Lost lease on shard {shard_id}")
+            break
+    queue.close()
+
+def process_shard(tickers, universe, journal, run_id, payload):
+    """Ingest + process one shard of tickers. Returns (processed, failures) for the circuit breaker."""
+    processed = 0
+    failures = 0
+
+    metas = universe.set_index('ticker', drop=False).loc[tickers]
+    yahoo_files = ingest_yahoo(tickers, journal, run_id, payload, intervals=dict(zip(metas['ticker'], metas['interval'])))
+    intraday_files = ingest_intraday(list(yahoo_files), journal, run_id, payload)
+    run_batch_forecasts(metas.to_dict('records'), yahoo_files, journal, run_id)
+
+    for ticker, file_path in yahoo_files.items():
+        processed += 1
+        checkpoint = completed_stage(journal, run_id, ticker, "done")
+        if checkpoint:
+            failures += checkpoint['has_issue']
+            continue
+
+        try:
+            meta = metas.loc[ticker].to_dict()
+            ticker_has_issue = process_ticker(meta, file_path, payload['ecb_files'], run_id, payload['run_date'], journal,
+                                              intraday_path=intraday_files.get(ticker))
+        except Exception as e:
+            # One bad ticker must not take the whole shard (and its lease) down with it. The crash is
+            # recorded as a failed 'done' stage, the global breaker counts from the journal
+            logger.error(f"Processing failed for {ticker}: {e}")
+            ticker_has_issue = True
+            record_stage(journal, run_id, ticker, "done", has_issue=True)
+
+        if ticker_has_issue:
+            failures += 1
+
+    return processed, failures
+
+def run_worker(run_id, worker_id=None):
+    """Claim shards from the shared queue until none are left"""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    lease_seconds = _settings().get('lease_seconds', 300)
+
+    queue = open_queue(_queue_db())
+    journal = open_journal(_journal_db())
+    ensure_schema(journal)
+    payload = run_payload(queue, run_id)
+    if payload is None:
+        logger.error(f"[{worker_id}] Run {run_id} is not in the queue")
+        return
+    universe = load_universe(config['pipeline'])
+
+    while True:
+        claim = claim_shard(queue, run_id, worker_id, lease_seconds)
+        if claim is None:
+            break
+
+        shard_id, tickers = claim
+        logger.info(f"[{worker_id}] Claimed shard {shard_id}: {len(tickers)} tickers")
+
+        stop = threading.Event()
+        beat = threading.Thread(target=_keep_alive, args=(run_id, shard_id, worker_id, lease_seconds, stop), daemon=True)
+        beat.start()
+        try:
+            processed, failures = process_shard(tickers, universe, journal, run_id, payload)
+        finally:
+            stop.set()
+            beat.join()
+
+        if not complete_shard(queue, run_id, shard_id, worker_id, processed, failures):
+            logger.warning(f"[{worker_id}] Shard {shard_id} was reclaimed by another worker, result discarded")
+
+    logger.info(f"[{worker_id}] No more shards for run {run_id}. Exiting.")
+
+def _spawn_worker(run_id, worker_id):
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--run-id", run_id, "--worker-id", worker_id])
+
+def run_coordinator(n_workers, resume_run_id=None, shard_size=None):
+    """
+    Local coordinator:
+    1. Opens the run and downloads the shared ECB benchmarks once
+    2. Publishes ticker shards to the lease-based queue and starts N worker processes
+    3. Reduce step: evaluates the circuit breaker globally and exports the merged quarantine report
+    More local workers can join with 'worker --run-id <id>' against the same queue_db.
+    """
+    logger.info(f"--- Starting Sharded Data Pipeline ({n_workers} local workers) ---\n")
+
+    settings = _settings()
+    data_folder = settings['data_folder']
+    quarantine_root = settings.get('quarantine_store', f"{data_folder}/quarantine")
+    FAILURE_THRESHOLD = settings.get('failure_threshold', 0.50)
+    shard_size = shard_size or settings.get('shard_size', 10)
+    poll_seconds = settings.get('coordinator_poll_seconds', 2)
+
+    journal = open_journal(_journal_db())
+    ensure_schema(journal)
+    queue = open_queue(_queue_db())
+
+    run_id, params = open_run(journal, resume_run_id)
+    universe = load_universe(config['pipeline'])
+    ecb_files = ingest_ecb(benchmark_keys(universe, config['pipeline']), journal, run_id, params)
+
+    # Cost-aware: tickers are packed into balanced shards, the heaviest shard is claimed first
+    costs = estimate_costs(journal, universe, settings['history_days'])
+    enqueue_run(queue, run_id, universe['ticker'].tolist(), shard_size, {**params, 'ecb_files': ecb_files},
+                costs=costs.to_dict())
+    if resume_run_id:
+        reset_unfinished(queue, run_id)
+    predicted_makespan = simulate_makespan(pd.Series(shard_costs(queue, run_id), dtype=float), n_workers)
+    logger.info(f"Scheduler: predicted completion {predicted_makespan:.1f}s on {n_workers} workers")
+    loop_start = time.perf_counter()
+
+    host = socket.gethostname()
+    workers = [_spawn_worker(run_id, f"{host}-w{i}") for i in range(n_workers)]
+    respawns_left = n_workers * 3
+    tripped = stalled = False
+
+    # Tickers finished before a resume don't count towards the breaker, else the ratio that tripped
+    # the run is rebuilt at once and the resume stops before processing anything
+    done_before, failed_before = run_progress(journal, run_id)
+
+    # Reduce loop
+    while True:
+        processed, failures = run_progress(journal, run_id)
+        processed, failures = processed - done_before, failures - failed_before
+        if not tripped and processed >= 2 and failures / processed >= FAILURE_THRESHOLD:
+            tripped = True
+            logger.critical(f"CIRCUIT BREAKER TRIPPED! Global failure rate {failures / processed:.0%} exceeds {FAILURE_THRESHOLD:.0%}.")
+            logger.critical("Cancelling remaining shards to prevent data corruption.")
+            cancel_pending(queue, run_id)
+
+        status = queue_status(queue, run_id)
+        active = status.get('pending', 0) + status.get('leased', 0)
+        if active == 0:
+            break
+
+        # All local workers exited while shards are left: a worker died holding a lease.
+        # A replacement is started only once a shard is claimable (its lease expired), until then
+        # the loop sleeps up to the earliest expiry. The budget only bounds workers that keep crashing.
+        sleep_seconds = poll_seconds
+        if all(w.poll() is not None for w in workers):
+            claimable, next_expiry = claimable_shards(queue, run_id)
+            if claimable and respawns_left == 0:
+                stalled = True
+                logger.critical(f"Workers keep dying, {claimable} shard(s) left unprocessed.")
+                break
+            if claimable:
+                respawns_left -= 1
+                workers.append(_spawn_worker(run_id, f"{host}-w{len(workers)}"))
+            elif next_expiry is not None:
+                sleep_seconds = max(poll_seconds, next_expiry - time.time())
+                logger.info(f"Waiting {sleep_seconds:.0f}s for an expired lease to reclaim")
+
+        time.sleep(sleep_seconds)
+
+    for w in workers:
+        w.wait()
+
+    status = queue_status(queue, run_id)
+    processed, failures = run_progress(journal, run_id)
+    logger.info(f"Shards: {status}. Tickers processed: {processed}, with issues: {failures}")
+
+    # Cross-sectional peer check over every worker's clean histories
+    if not tripped:
+        run_peer_check(universe, run_id, params['run_date'])
+
+    # Final Reports (the store already merges every worker's records)
+    report_name = report_path(params['run_date'])
+    total_issues = export_run_report(quarantine_root, run_id, report_name)
+
+    if tripped or stalled or status.get('failed', 0):
+        finish_run(journal, run_id, "tripped" if tripped else "failed")
+        logger.critical(f"Run {run_id} incomplete. Fix the root cause, then resume with: coordinator --resume {run_id}")
+        sys.exit(1)
+
+    finish_run(journal, run_id, "completed")
+    publish_run(data_folder, run_id, report_name if total_issues else None)
+    report_accuracy(journal, run_id, costs, predicted_makespan, time.perf_counter() - loop_start)
+    update_estimates(journal, run_id)
+
+    if total_issues:
+        logger.error(f"Pipeline finished with {total_issues} TOTAL issues. Report: {report_name}")
+    else:
+        logger.info("Pipeline finished SUCCESSFULLY. No data issues found.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded financial data quality pipeline")
+    sub = parser.add_subparsers(dest="role", required=True)
+
+    coord = sub.add_parser("coordinator", help="Publish shards, run local workers and reduce the results")
+    coord.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of local worker processes")
+    coord.add_argument("--shard-size", type=int, help="Tickers per shard (default: settings.shard_size)")
+    coord.add_argument("--resume", metavar="RUN_ID", help="Resume a tripped or crashed sharded run")
+
+    work = sub.add_parser("worker", help="Claim and process shards of an existing run")
+    work.add_argument("--run-id", required=True)
+    work.add_argument("--worker-id", help="Defaults to <hostname>-<pid>")
+
+    args = parser.parse_args()
+    if args.role == "coordinator":
+        run_coordinator(args.workers, resume_run_id=args.resume, shard_size=args.shard_size)
+    else:
+        run_worker(args.run_id, worker_id=args.worker_id)
@@ -7,6 +7,10 @@ from ecbdata import ecbdata
 # Initialize Logger
 logger = logging.getLogger(__name__)
 
+# Batched ECB downloads keep only what the reconciliation reads, one typed Parquet file per series
+ECB_COLUMNS = ['KEY', 'TIME_PERIOD', 'OBS_VALUE']
+ECB_MAX_KEYS = 50   # Series per request, keeps the URL well inside server limits
+
 def download_ohlcv_to_csv(ticker, start_date, end_date, dinterval, output_folder='data'):
     # Download OHLCV data from Yahoo Finance
 
@@ -56,7 +60,7 @@ def download_ecb_data(etick, start_date, end_date, output_folder="data"):
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
 
-        filename = f"{output_folder}/{etick}_{start_date}_{end_date}.csv)"
+        filename = f"{output_folder}/{etick}_{start_date}_{end_date}.csv"
         dft.to_csv(filename)
 
         logger.info(f"Successfully saved ECB data {etick} to {filename}")
@@ -64,4 +68,94 @@ def download_ecb_data(etick, start_date, end_date, output_folder="data"):
     
     except Exception as e:
         logger.error(f"Failed to download ECB {etick}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def group_ecb_keys(keys, max_keys=ECB_MAX_KEYS):
+    """
+    Merge series keys that differ in one dimension into SDMX multi-value keys:
+    EXR.D.USD.EUR.SP00.A + EXR.D.GBP.EUR.SP00.A -> EXR.D.USD+GBP.EUR.SP00.A
+    Per dataflow the varying dimension is the one leaving the fewest requests (the currency for EXR).
+    Returns [(request key, [series keys it covers])]
+    """
+    flows = {}
+    for key in dict.fromkeys(keys):
+        flow, *dims = key.split('.')
+        flows.setdefault((flow, len(dims)), []).append(dims)
+
+    requests = []
+    for (flow, n_dims), members in flows.items():
+        best = None
+        for p in range(n_dims):
+            groups = {}
+            for dims in members:
+                groups.setdefault(tuple(dims[:p] + dims[p + 1:]), []).append(dims)
+            if best is None or len(groups) < len(best[1]):
+                best = (p, groups)
+        if best is None:   # a bare dataflow id, nothing to merge
+            requests.append((flow, [flow]))
+            continue
+
+        p, groups = best
+        for rest, group in groups.items():
+            for i in range(0, len(group), max_keys):
+                part = group[i:i + max_keys]
+                values = "+".join(dims[p] for dims in part)
+                requests.append((".".join([flow, *rest[:p], values, *rest[p:]]), [".".join([flow, *dims]) for dims in part]))
+    return requests
+
+def split_ecb_frame(dft, members, start_date, end_date, output_folder="data"):
+    """Project an SDMX csvdata response to KEY / TIME_PERIOD / OBS_VALUE and write one Parquet file per series"""
+    if 'KEY' not in dft.columns and len(members) == 1:
+        dft = dft.assign(KEY=members[0])
+    missing = [c for c in ECB_COLUMNS if c not in dft.columns]
+    if missing:
+        raise ValueError(f"ECB response has no {missing} column(s): {list(dft.columns)[:10]}")
+    df = pd.DataFrame({
+        'KEY': dft['KEY'].astype(str),
+        'TIME_PERIOD': pd.to_datetime(dft['TIME_PERIOD']),
+        'OBS_VALUE': pd.to_numeric(dft['OBS_VALUE'], errors='coerce'),
+    })
+
+    paths = {}
+    for key, series in df.groupby('KEY', sort=False):
+        if key not in members:
+            continue
+        filename = f"{output_folder}/{key}_{start_date}_{end_date}.parquet"
+        series.sort_values('TIME_PERIOD').to_parquet(filename, index=False)
+        paths[key] = filename
+    return paths
+
+def download_ecb_batch(keys, start_date, end_date, output_folder="data", max_keys=ECB_MAX_KEYS):
+    """
+    Download many ECB series in as few requests as possible (see group_ecb_keys), without the
+    SDMX attribute columns. A failed multi-series request is retried one series at a time.
+    Returns {series key: Parquet path} for every series with data.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    paths = {}
+    for request, members in group_ecb_keys(keys, max_keys):
+        logger.info(f"Starting ECB Download for {len(members)} series ({request})")
+        try:
+            dft = ecbdata.get_series(request, start=start_date, end=end_date, detail="dataonly")
+            paths.update(split_ecb_frame(dft, members, start_date, end_date, output_folder))
+        except Exception as e:
+            if len(members) == 1:
+                logger.error(f"Failed to download ECB {request}: {e}")
+                continue
+            logger.warning(f"Batched ECB request failed ({e}), retrying its {len(members)} series one by one")
+            for key in members:
+                paths.update(download_ecb_batch([key], start_date, end_date, output_folder, max_keys))
+
+    missing = [k for k in dict.fromkeys(keys) if k not in paths]
+    if missing:
+        logger.warning(f"No ECB data found for {missing}")
+    logger.info(f"Saved {len(paths)} ECB series to {output_folder}")
+    return paths
+
+def load_ecb_series(path):
+    """One ECB download with its TIME_PERIOD / OBS_VALUE columns (batched Parquet or a full single-series CSV)"""
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
@@ -1,14 +1,15 @@
 import pandas as pd
 import numpy as np
 from prophet import Prophet
-from prophet.diagnostics import performance_metrics
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import yaml
-import mlflow
 from datetime import datetime
 import os
 import logging
 from sklearn.metrics import mean_absolute_error
+from telemetry_sink import get_sink
 
 # Load Config
 with open("config.yaml", "r") as f:
@@ -23,22 +24,77 @@ mlflow_config = config['pipeline'].get('mlflow', {})
 MLFLOW_tracking_URI = mlflow_config.get('tracking_uri', 'mlruns')
 EXP_NAME = mlflow_config.get('experiment_name', 'Default_Experiment')
 
-mlflow.set_tracking_uri(MLFLOW_tracking_URI)
-mlflow.set_experiment(EXP_NAME)
+# Params/metrics/artifacts are written by a background thread, off the forecasting hot path
+sink = get_sink(MLFLOW_tracking_URI, EXP_NAME)
+
+# "flagged": plot only anomalous tickers, "all": every ticker, "none": only on demand (see __main__)
+PLOT_MODE = config['pipeline']['settings'].get('forecast_plots', 'flagged')
+
+# Production Prophet settings (the backtest scores exactly these)
+PROPHET_PARAMS = {
+    "interval_width": 0.95,
+    "daily_seasonality": True,
+    "changepoint_prior_scale": 0.05,
+    "seasonality_mode": 'multiplicative'
+}
+
+def load_history(path):
+    """Price history with a 'Date' column, from the clean Parquet store, a CSV download or a Date-indexed frame"""
+    if isinstance(path, pd.DataFrame):
+        return path.reset_index()
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path).reset_index()
+    return pd.read_csv(path)
+
+def render_forecast_plot(ticker, history_path=None, title=None):
+    """
+    Render the published forecast band (and the actual closes, if history_path is given) to
+    data/<ticker>_forecast_plot.png. Separate from training so it only runs when needed.
+    """
+    data_folder = config['pipeline']['settings']['data_folder']
+    forecast = pd.read_csv(os.path.join(data_folder, f"{ticker}_forecast.csv"), parse_dates=['ds'])
+
+    # Same look as Prophet's m.plot(): black observations, blue forecast, light blue band
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        if history_path is not None:
+            history = load_history(history_path)[['Date', 'Close']]
+            history['Date'] = pd.to_datetime(history['Date'], utc=True).dt.tz_localize(None)
+            ax.plot(history['Date'], history['Close'], 'k.', markersize=2)
+        ax.plot(forecast['ds'], forecast['yhat'], ls='-', c='#0072B2')
+        ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0072B2', alpha=0.2)
+        ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
+        ax.set_xlabel('ds')
+        ax.set_ylabel('y')
+        ax.set_title(title or f"Forecast for {ticker}")
+        fig.tight_layout()
+
+        plot_path = os.path.join(data_folder, f"{ticker}_forecast_plot.png")
+        fig.savefig(plot_path)
+    finally:
+        # Figures are never reused, closing them stops them piling up in long runs
+        plt.close(fig)
+
+    logger.info(f"Forecast plot saved to {plot_path}")
+    return plot_path
 
 def generate_forecast(file_path, ticker):
     """
     Docstring for generate_forecast
+    file_path: the clean history (Parquet or CSV path, or a Date-indexed frame)
     
     1. Train Prophet model on data
     2. Forecast 30 days ahead
     3. Check: Does the latest actual data point fall inside the predicted range?
-    4. Log everything to MLflow
+    4. Queue params/metrics for MLflow (written in the background)
+    5. Plot only if PLOT_MODE asks for it
+
+    Returns (path of the published forecast CSV, is_anomaly)
     """
 
     # 1. Load data
     try:
-        df = pd.read_csv(file_path)
+        df = load_history(file_path)
         if 'Date' not in df.columns:
             logger.error(f"Missing 'Date' column in {file_path}")
             return None, False
@@ -51,86 +107,93 @@ def generate_forecast(file_path, ticker):
         if df['ds'].dt.tz is not None:
             df['ds'] = df['ds'].dt.tz_localize(None)
 
-        # Start MLFLOW RUN
-        with mlflow.start_run(run_name=f"Forecast_{ticker}"):
-            
-            # A. Define Hyperperameters
-            params = {
-                "interval_width": 0.95,
-                "daily_seasonality": True,
-                "changepoint_prior_scale": 0.05,
-                "seasonality_mode": 'multiplicative'
-            }
-            
-
-            # B. Log Params
-            mlflow.log_param("ticker", ticker)
-            mlflow.log_param("model_type", "Prophet")
-            mlflow.log_params(params)
-            mlflow.log_param("history_len", len(df))
-
-            # C. Train model
-            m = Prophet(**params)
-            m.fit(df)
-
-            # D. Make Future Dataframe (30 Days)
-            future = m.make_future_dataframe(periods=30)
-            forecast = m.predict(future)
-
-            # Calculate In Sample Metric (MAE)
-            # Compre actual 'y' vs predcited 'yhat' for the historical dates
-            metric_df = forecast.set_index('ds')[['yhat']].join(df.set_index('ds')[['y']], how='inner')
-            mae = mean_absolute_error(metric_df['y'], metric_df['yhat'])
-
-            # MAPE (% Error) - Handle division by zero
-            y_true = metric_df['y']
-            y_pred = metric_df['yhat']
-            mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
-
-            # Log Metric How good is the fit?
-            mlflow.log_metric("mae", mae)
-            mlflow.log_metric("mape_percent", mape)
-            logger.info(f"Model trained for {ticker}. MAE: {mae:.2f} | MAPE: {mape:.2f}%")
-
-            # F. Anomaly Detection Logic
-            # Check if latest actual price is inside the confidence interval
-            latest_actual = df.iloc[-1]
-            latest_date = latest_actual['ds']
-            latest_price = latest_actual['y']
-
-            # Find prediction for that specific date
-            pred_row = forecast[forecast['ds'] == latest_date]
-
-            is_anomaly = False
-            if not pred_row.empty:
-                pred = pred_row.iloc[0]
-                lower = pred['yhat_lower']
-                upper = pred['yhat_upper']
-
-                if latest_price < lower or latest_price > upper:
-                    is_anomaly = True
-                    mlflow.set_tag("anomaly_detected", "true")
-                    anomaly_msg = f"ANOMALY DETECTED! {latest_date}: Price {latest_price} outside range [{lower:.2f}, {upper:.2f}]"
-                    logger.warning(f"[{ticker}] {anomaly_msg}")
-            
-            # G. Generate & Save Plot
-            fig1 = m.plot(forecast)
-            plt.title(f"Forecast for {ticker} (MAPE: {mape:.2f}%)")
-
-            # Save locally first
-            plot_filename = f"{ticker}_forecast_plot.png"
-            plot_path = os.path.join(config['pipeline']['settings']['data_folder'], plot_filename)
-            fig1.savefig(plot_path)
-            logger.info(f"Forecast plot saved to {plot_path}")
-
-            # H. Log Artifact (Upload plot to MLflow)
-            mlflow.log_artifact(plot_path)
-
-            # Optional, save full model (heavy but can be useful)
-            # mlflow.prophet.log_model(m, artifact_path="model")
-
-            return plot_path, is_anomaly
+        # One MLflow run per call (the key keeps a later plot upload in the same run)
+        run_key = f"Forecast_{ticker}_{datetime.now():%Y%m%dT%H%M%S%f}"
+
+        # A. Define Hyperperameters
+        params = PROPHET_PARAMS
+
+        # C. Train model
+        m = Prophet(**params)
+        m.fit(df)
+
+        # D. Make Future Dataframe (30 Days)
+        future = m.make_future_dataframe(periods=30)
+        forecast = m.predict(future)
+
+        # Publish the forecast band for the dashboard / chart pyramid
+        forecast_path = os.path.join(config['pipeline']['settings']['data_folder'], f"{ticker}_forecast.csv")
+        forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_csv(forecast_path, index=False)
+
+        # Calculate In Sample Metric (MAE)
+        # Compre actual 'y' vs predcited 'yhat' for the historical dates
+        metric_df = forecast.set_index('ds')[['yhat']].join(df.set_index('ds')[['y']], how='inner')
+        mae = mean_absolute_error(metric_df['y'], metric_df['yhat'])
+
+        # MAPE (% Error) - Handle division by zero
+        y_true = metric_df['y']
+        y_pred = metric_df['yhat']
+        mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+        logger.info(f"Model trained for {ticker}. MAE: {mae:.2f} | MAPE: {mape:.2f}%")
+
+        # F. Anomaly Detection Logic
+        # Check if latest actual price is inside the confidence interval
+        latest_actual = df.iloc[-1]
+        latest_date = latest_actual['ds']
+        latest_price = latest_actual['y']
+
+        # Find prediction for that specific date
+        pred_row = forecast[forecast['ds'] == latest_date]
+
+        is_anomaly = False
+        tags = {}
+        if not pred_row.empty:
+            pred = pred_row.iloc[0]
+            lower = pred['yhat_lower']
+            upper = pred['yhat_upper']
+
+            if latest_price < lower or latest_price > upper:
+                is_anomaly = True
+                tags["anomaly_detected"] = "true"
+                anomaly_msg = f"ANOMALY DETECTED! {latest_date}: Price {latest_price} outside range [{lower:.2f}, {upper:.2f}]"
+                logger.warning(f"[{ticker}] {anomaly_msg}")
+
+        # B/E. Params + fit metrics in a single batched write
+        sink.log_run(
+            run_key,
+            params={"ticker": ticker, "model_type": "Prophet", **params, "history_len": len(df)},
+            metrics={"mae": mae, "mape_percent": mape},
+            tags=tags,
+            run_name=f"Forecast_{ticker}",
+        )
+
+        # G. Plot (deferred: PNG encoding is the slowest part of the old hot path)
+        if PLOT_MODE == 'all' or (PLOT_MODE == 'flagged' and is_anomaly):
+            plot_path = render_forecast_plot(ticker, file_path, title=f"Forecast for {ticker} (MAPE: {mape:.2f}%)")
+            # H. Log Artifact (uploaded by the sink)
+            sink.log_artifact(run_key, plot_path)
+
+        # Optional, save full model (heavy but can be useful)
+        # mlflow.prophet.log_model(m, artifact_path="model")
+
+        sink.end_run(run_key)
+        return forecast_path, is_anomaly
     
     except Exception as e:
         logger.error(f"ML Forecasting failed for {ticker}: {e}")
-        return None, False
\ No newline at end of file
+        return None, False
+
+if __name__ == "__main__":
+    # On-demand rendering from the last published forecasts:
+    # python src/forecast_analysis.py EURUSD=X --history data/clean/EURUSD=X.parquet
+    import argparse
+    parser = argparse.ArgumentParser(description="Render forecast plots from published forecasts")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--history", help="Clean history (Parquet or CSV) to overlay (single ticker)")
+    args = parser.parse_args()
+
+    for t in args.tickers:
+        path = render_forecast_plot(t, args.history if len(args.tickers) == 1 else None)
+        sink.log_run(f"Plot_{t}", params={"ticker": t})
+        sink.log_artifact(f"Plot_{t}", path)
+        sink.end_run(f"Plot_{t}")
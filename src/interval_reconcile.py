@@ -0,0 +1,123 @@
+import logging
+import numpy as np
+import pandas as pd
+
+from series_pyramid import reduce_segments
+from trading_calendar import session_hours, calendar_names, NS_PER_DAY, NS_PER_MINUTE
+
+logger = logging.getLogger("IntervalReconciler")
+
+SESSION_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close']
+
+def _session(exchange):
+    """Session hours from calendars.yaml, unknown exchanges are treated as NYSE like infer_exchange does"""
+    return session_hours(exchange if exchange in calendar_names() else 'XNYS')
+
+def load_intraday(path):
+    """
+    Intraday OHLCV CSV -> float frame with a UTC DatetimeIndex.
+    Handles both the flat layout written by fetch_data and the raw yfinance layout
+    with its three header lines (Price / Ticker / Datetime).
+    """
+    with open(path) as f:
+        head = [f.readline() for _ in range(3)]
+    skip = [1, 2] if head[1].startswith("Ticker") else None
+
+    df = pd.read_csv(path, skiprows=skip, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True)
+    df.index.name = 'Datetime'
+    df = df.apply(pd.to_numeric, errors='coerce')
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+def session_keys(index, exchange):
+    """
+    Integer session key (days since epoch of the local trading date) per bar, plus a mask of
+    bars inside the regular session. Pure integer arithmetic on the int64 timestamps.
+    """
+    tz, open_min, close_min = _session(exchange)
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is None:
+        idx = idx.tz_localize('UTC')
+    wall = idx.tz_convert(tz).tz_localize(None).as_unit('ns').asi8
+
+    keys = wall // NS_PER_DAY
+    minute = (wall % NS_PER_DAY) // NS_PER_MINUTE
+    return keys, (minute >= open_min) & (minute < close_min)
+
+def aggregate_sessions(intraday, exchange):
+    """
+    Intraday bars -> one row per session: first open, max high, min low, last close, summed volume.
+    Bars are sorted by time so each session is a contiguous run and is reduced with reduceat.
+    Returns a frame indexed by session key with a 'bars' count column.
+    """
+    keys, in_session = session_keys(intraday.index, exchange)
+    df = intraday[in_session]
+    keys = keys[in_session]
+    if df.empty:
+        return pd.DataFrame(columns=list(SESSION_AGG) + ['bars'])
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+
+    out = {col: reduce_segments(df[col].to_numpy(dtype=float), starts, ends, how)
+           for col, how in SESSION_AGG.items() if col in df.columns}
+    out['bars'] = ends - starts
+    return pd.DataFrame(out, index=pd.Index(keys[starts], name='session'))
+
+def daily_session_keys(index, exchange):
+    """Session keys of daily bars (naive dates are already local trading dates)"""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_convert(_session(exchange)[0]).tz_localize(None)
+    return idx.as_unit('ns').asi8 // NS_PER_DAY
+
+def reconcile_intervals(intraday, daily, exchange, price_tol=0.005, volume_tol=0.25):
+    """
+    Aggregate intraday bars to sessions and compare them with the daily bars in one join.
+
+    Returns the disagreeing days in the validator format (Date index, Close, qa_reason)
+    plus the joined comparison frame. The first and last intraday sessions are skipped
+    since a download window can cut them short. Volume is only compared when both sides
+    report volume (FX has none).
+    """
+    sessions = aggregate_sessions(intraday, exchange)
+    if len(sessions) > 2:
+        sessions = sessions.iloc[1:-1]
+
+    keys = daily_session_keys(daily.index, exchange)
+    keep = ~pd.Index(keys).duplicated(keep='last')
+    d = daily.loc[keep, [c for c in SESSION_AGG if c in daily.columns]].apply(pd.to_numeric, errors='coerce')
+    d = d.set_axis(pd.Index(keys[keep], name='session'))
+    d['Date'] = pd.to_datetime(keys[keep] * NS_PER_DAY)
+
+    both = sessions.join(d, how='inner', lsuffix='_intraday', rsuffix='_daily')
+    if both.empty:
+        empty = pd.DataFrame(columns=['Close', 'qa_reason'], index=pd.DatetimeIndex([], name='Date'))
+        return empty, both
+
+    bad = {}
+    for col in PRICE_FIELDS:
+        a, b = both[f"{col}_intraday"].to_numpy(), both[f"{col}_daily"].to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bad[col] = np.abs(a - b) / np.abs(b) > price_tol
+    a, b = both['Volume_intraday'].to_numpy(), both['Volume_daily'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bad['Volume'] = (a > 0) & (b > 0) & (np.abs(a - b) / b > volume_tol)
+
+    mask = np.logical_or.reduce(list(bad.values()))
+    both['mismatch'] = mask
+    hits = both[mask]
+
+    # Only the (few) disagreeing days get a readable reason string
+    parts = [[] for _ in range(len(hits))]
+    for col in SESSION_AGG:
+        intraday_v, daily_v = hits[f"{col}_intraday"].to_numpy(), hits[f"{col}_daily"].to_numpy()
+        for i in np.flatnonzero(bad[col][mask]):
+            parts[i].append(f"{col} intraday={intraday_v[i]:.6g} vs daily={daily_v[i]:.6g}")
+    reasons = ["Interval Mismatch: " + "; ".join(p) for p in parts]
+
+    out = pd.DataFrame({'Close': hits['Close_daily'].to_numpy(), 'qa_reason': reasons},
+                       index=pd.DatetimeIndex(hits['Date'].to_numpy(), name='Date'))
+    logger.info(f"Interval reconciliation: {len(both)} sessions compared, {len(out)} disagree")
+    return out, both
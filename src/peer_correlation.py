@@ -0,0 +1,224 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+from analyst_views import clean_path
+from universe import MemoryCeilingExceeded
+
+logger = logging.getLogger("PeerCorrelation")
+
+NO_GROUP = -1
+
+class RollingCorrelation:
+    """
+    Pairwise-complete correlation of log returns over the last `window` bars, kept as running
+    sums over every pair of the universe:
+        n[i, j]    bars where both i and j have a return
+        sx[i, j]   sum of x_i over those bars (sx[j, i] is the sum of x_j)
+        sxx[i, j]  sum of x_i^2 over those bars
+        sxy[i, j]  sum of x_i * x_j
+    A new bar adds its products and the bar it pushes out of the ring buffer subtracts its own,
+    both in one signed matrix product per column block, so a push never rescans the window and
+    temporaries stay at n x block_size. The sums are rebuilt exactly from the buffer once per
+    window to stop floating-point drift.
+    """
+
+    def __init__(self, tickers, window=30, block_size=256):
+        n = len(tickers)
+        self.tickers = list(tickers)
+        self.window = window
+        self.block_size = block_size
+        self.buffer = np.full((window, n), np.nan)
+        self.times = np.full(window, np.iinfo(np.int64).min)
+        self.pos = 0
+        self.pushes = 0
+        self.n, self.sx, self.sxx, self.sxy = (np.zeros((n, n)) for _ in range(4))
+
+    @staticmethod
+    def required_mb(n_tickers, window=30):
+        return (4 * n_tickers * n_tickers + window * n_tickers) * 8 / (1024 * 1024)
+
+    @property
+    def last_ts(self):
+        return int(self.times.max())
+
+    def _accumulate(self, rows, signs):
+        """Add (sign +1) or remove (sign -1) whole bars from the running sums, column block by block"""
+        mask = ~np.isnan(rows)
+        x = np.where(mask, rows, 0.0)
+        m = mask.astype(float)
+        sm, sxw, sx2 = m * signs[:, None], x * signs[:, None], x * x * signs[:, None]
+        for j in range(0, len(self.tickers), self.block_size):
+            cols = slice(j, j + self.block_size)
+            self.n[:, cols] += sm.T @ m[:, cols]
+            self.sx[:, cols] += sxw.T @ m[:, cols]
+            self.sxx[:, cols] += sx2.T @ m[:, cols]
+            self.sxy[:, cols] += sxw.T @ x[:, cols]
+
+    def push(self, ts, returns):
+        """Slide the window by one bar (returns: one value per ticker, NaN where it has no bar)"""
+        old = self.buffer[self.pos].copy()
+        self.buffer[self.pos] = returns
+        self.times[self.pos] = ts
+        self.pos = (self.pos + 1) % self.window
+        self.pushes += 1
+
+        if self.pushes % self.window == 0:
+            self.rebuild()
+        elif np.isnan(old).all():
+            self._accumulate(np.asarray(returns, dtype=float)[None, :], np.array([1.0]))
+        else:
+            self._accumulate(np.vstack([returns, old]), np.array([1.0, -1.0]))
+
+    def rebuild(self):
+        for a in (self.n, self.sx, self.sxx, self.sxy):
+            a[:] = 0.0
+        self._accumulate(self.buffer, np.ones(self.window))
+
+    def correlation(self, idx=None, min_obs=20):
+        """
+        Correlation matrix of the tickers at positions idx (default: all) from the running sums.
+        NaN where a pair overlaps on fewer than min_obs bars; a flat (stale) series correlates 0.
+        """
+        sel = np.ix_(idx, idx) if idx is not None else (slice(None), slice(None))
+        n, sx, sxx, sxy = self.n[sel], self.sx[sel], self.sxx[sel], self.sxy[sel]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * sxy - sx * sx.T
+            var_i = np.maximum(n * sxx - sx * sx, 0.0)
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        flat = (var_i <= 1e-18 * np.maximum(n * sxx, 1e-300)) | (var_j <= 1e-18 * np.maximum(n * sxx.T, 1e-300))
+        corr = np.where(flat, 0.0, np.clip(corr, -1.0, 1.0))
+        corr[n < min_obs] = np.nan
+        return corr
+
+    def peer_scores(self, groups, min_obs=20):
+        """Mean correlation of every ticker with the other members of its group (NaN without peers)"""
+        scores = np.full(len(self.tickers), np.nan)
+        for g in np.unique(groups[groups != NO_GROUP]):
+            idx = np.flatnonzero(groups == g)
+            if len(idx) < 2:
+                continue
+            corr = self.correlation(idx, min_obs)
+            np.fill_diagonal(corr, np.nan)
+            valid = ~np.isnan(corr)
+            counts = valid.sum(axis=1)
+            scores[idx] = np.where(counts > 0, np.where(valid, corr, 0.0).sum(axis=1) / np.maximum(counts, 1), np.nan)
+        return scores
+
+def peer_groups(universe, configured=None):
+    """
+    Group name per ticker: the configured peer_groups first, then the universe asset_class.
+    Returns (group names, integer group per ticker).
+    """
+    group_of = dict(zip(universe['ticker'], universe['asset_class'].astype(str)))
+    for name, members in (configured or {}).items():
+        for ticker in members or []:
+            if ticker in group_of:
+                group_of[ticker] = name
+    names = sorted(set(group_of.values()))
+    return names, {t: names.index(g) for t, g in group_of.items()}
+
+def load_returns(clean_root, tickers):
+    """Log returns of each ticker's clean Close, aligned on the union of bar dates"""
+    series = {}
+    for ticker in tickers:
+        path = clean_path(clean_root, ticker)
+        if not os.path.exists(path):
+            continue
+        close = pd.to_numeric(pd.read_parquet(path, columns=['Close'])['Close'], errors='coerce')
+        close = close[~close.index.duplicated(keep='last')].sort_index()
+        series[ticker] = np.log(close.where(close > 0)).diff().dropna()
+    frame = pd.DataFrame(series)
+    frame.index = pd.DatetimeIndex(frame.index).as_unit('ns')
+    return frame.sort_index()
+
+def save_state(path, state, baseline, seen, groups):
+    """Running sums, ring buffer and per-ticker baselines, replaced atomically"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, tickers=np.array(state.tickers), window=state.window, buffer=state.buffer, times=state.times,
+             pos=state.pos, pushes=state.pushes, n=state.n, sx=state.sx, sxx=state.sxx, sxy=state.sxy,
+             baseline=baseline, seen=seen, groups=groups)
+    os.replace(tmp, path)
+
+def saved_last_ts(path):
+    """Newest bar pushed into the saved state, whatever universe it was built for"""
+    if not os.path.exists(path):
+        return np.iinfo(np.int64).min
+    with np.load(path, allow_pickle=False) as f:
+        return int(f['times'].max())
+
+def load_state(path, tickers, window, block_size):
+    """The saved state if it covers exactly these tickers and window, else None"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        if list(f['tickers']) != list(tickers) or int(f['window']) != window:
+            return None
+        state = RollingCorrelation(tickers, window, block_size)
+        state.buffer, state.times = f['buffer'], f['times']
+        state.pos, state.pushes = int(f['pos']), int(f['pushes'])
+        state.n, state.sx, state.sxx, state.sxy = f['n'], f['sx'], f['sxx'], f['sxy']
+        return state, f['baseline'], f['seen'], f['groups']
+
+def update_peer_check(state_path, clean_root, universe, configured_groups=None, window=30, min_obs=20,
+                      baseline_halflife=120, min_baseline=0.3, drop=0.4, block_size=256, max_memory_mb=512):
+    """
+    Push every bar newer than the saved state through the rolling correlation and flag tickers
+    whose correlation with their peer group falls at least `drop` below its own EWMA baseline
+    (only for groups that normally co-move: baseline >= min_baseline).
+    A universe or group change rebuilds the state from the full history, but only bars newer
+    than the previous state are flagged: the older ones were checked (and quarantined) before.
+    The clean Close of every ticker is read in full on each run; only the arithmetic is incremental.
+    Returns a DataFrame (Date, ticker, score, baseline, group) of the flagged bars.
+    """
+    daily = universe[universe['interval'].fillna('1d') == '1d']
+    names, group_of = peer_groups(daily, configured_groups)
+    returns = load_returns(clean_root, sorted(daily['ticker']))
+    tickers = list(returns.columns)
+    empty = pd.DataFrame(columns=['Date', 'ticker', 'score', 'baseline', 'group'])
+    if len(tickers) < 2:
+        return empty
+
+    required = RollingCorrelation.required_mb(len(tickers), window)
+    if max_memory_mb and required > max_memory_mb:
+        raise MemoryCeilingExceeded(f"Peer correlation for {len(tickers)} tickers needs {required:.0f} MB, above peer_check.max_memory_mb={max_memory_mb}")
+
+    groups = np.array([group_of.get(t, NO_GROUP) for t in tickers])
+    flag_after = saved_last_ts(state_path)
+    loaded = load_state(state_path, tickers, window, block_size)
+    if loaded is not None and np.array_equal(loaded[3], groups):
+        state, baseline, seen, _ = loaded
+    else:
+        logger.info(f"Building peer correlation state for {len(tickers)} tickers from the full history")
+        state, baseline, seen = RollingCorrelation(tickers, window, block_size), np.full(len(tickers), np.nan), np.zeros(len(tickers), dtype=int)
+
+    alpha = 1 - 0.5 ** (1 / baseline_halflife)
+    values = returns.to_numpy(dtype=float)
+    times = returns.index.asi8
+    flags = []
+    for row in np.flatnonzero(times > state.last_ts):
+        state.push(times[row], values[row])
+        scores = state.peer_scores(groups, min_obs)
+        # Only score tickers that traded on this bar, once their baseline has a window of history
+        live = ~np.isnan(values[row]) & ~np.isnan(scores)
+        broken = live & (seen >= window) & (times[row] > flag_after) & (baseline >= min_baseline) & (baseline - scores >= drop)
+        for i in np.flatnonzero(broken):
+            flags.append({'Date': returns.index[row], 'ticker': tickers[i], 'score': scores[i],
+                          'baseline': baseline[i], 'group': names[groups[i]]})
+        baseline = np.where(live, np.where(np.isnan(baseline), scores, baseline + alpha * (scores - baseline)), baseline)
+        seen = seen + live
+
+    save_state(state_path, state, baseline, seen, groups)
+    return pd.DataFrame(flags) if flags else empty
+
+def decoupling_report(flags, ticker, window):
+    """One ticker's flagged bars in the validator format (Date index, Close, qa_reason)"""
+    rows = flags[flags['ticker'] == ticker]
+    return pd.DataFrame({
+        'Close': np.nan,
+        'qa_reason': [f"Peer Decoupling: corr {s:.2f} vs usual {b:.2f} with {g} over {window} bars"
+                      for s, b, g in zip(rows['score'], rows['baseline'], rows['group'])],
+    }, index=pd.DatetimeIndex(rows['Date'], name='Date'))
@@ -0,0 +1,299 @@
+import os
+import sys
+import argparse
+import fnmatch
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from datetime import datetime, timedelta
+
+# Custom modules I created
+from run_pipeline3 import config, sanitize_index, ingest_yahoo, ingest_intraday, ingest_ecb, publish_batch_forecasts
+from run_pipeline3 import validate_ticker, reconcile_ticker, forecast_ticker
+from validate_quality2 import load_data
+from quarantine_store import append_quarantine_batch, query_quarantine
+from analyst_views import clean_path
+from universe import load_universe, benchmark_keys
+from run_journal import open_journal, start_run, finish_run, record_stage, latest_artifacts
+
+logger = logging.getLogger("PipelineCLI")
+
+# Each stage reads what its upstream stage last stored instead of recomputing it:
+#   ingest     vendor downloads               -> raw CSVs (journal 'ingest' artifacts)
+#   validate   latest raw CSV                 -> clean store, snapshot, profiles + logic/calendar/revision/drift
+#                                                quarantine records (revised bars re-checked like reconcile)
+#   reconcile  clean store + ECB / intraday   -> benchmark and interval quarantine records
+#   forecast   clean store                    -> <ticker>_forecast.csv + residual scores
+#   report     quarantine store               -> CSV of the selected tickers and window
+STAGES = ('ingest', 'validate', 'reconcile', 'forecast', 'report')
+
+def _settings():
+    return config['pipeline']['settings']
+
+def _store(key, default):
+    return _settings().get(key, f"{_settings()['data_folder']}/{default}")
+
+def select_universe(universe, tickers=None, intervals=None):
+    """Universe rows matching any of the ticker patterns (fnmatch: 'EUR*', '*.AS') and intervals"""
+    mask = pd.Series(True, index=universe.index)
+    if tickers:
+        mask &= universe['ticker'].map(lambda t: any(fnmatch.fnmatchcase(t, p) for p in tickers))
+    if intervals:
+        mask &= universe['interval'].isin(intervals)
+    return universe[mask].reset_index(drop=True)
+
+def window_params(start=None, end=None, default_days=None):
+    """Journal params of an ad-hoc run: run_date plus the [start_date, end_date] window"""
+    today = datetime.now()
+    days = default_days if default_days is not None else _settings()['history_days']
+    return {
+        'run_date': today.strftime('%Y-%m-%d'),
+        'start_date': start or (today - timedelta(days=days)).strftime('%Y-%m-%d'),
+        'end_date': end or today.strftime('%Y-%m-%d'),
+    }
+
+def _stamp(path):
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M') if path and os.path.exists(path) else None
+
+def plan_stage(journal, stage, selected, params):
+    """
+    What the stage would do for every selected ticker, without doing it:
+    one row per ticker with the stored input it reuses (and when it was written) or why it is skipped.
+    """
+    clean_root = _store('clean_store', 'clean')
+    raw = latest_artifacts(journal, "ingest", set(selected['ticker'])) if stage == 'validate' else {}
+    checks = config['pipeline'].get('interval_checks') or {}
+    rows = []
+    for meta in selected.to_dict('records'):
+        ticker, source, action = meta['ticker'], None, None
+        if stage == 'ingest':
+            source = "vendor"
+            action = f"download {params['start_date']}..{params['end_date']} ({meta['interval']})"
+            if ticker in checks:
+                action += f" + {checks[ticker]} bars"
+        elif stage == 'validate':
+            source = raw.get(ticker)
+            action = "revision, quality, calendar + profile checks -> clean store" if source else "skip: no download, run ingest first"
+        elif stage in ('reconcile', 'forecast'):
+            path = clean_path(clean_root, ticker)
+            source = path if os.path.exists(path) else None
+            if source is None:
+                action = "skip: no clean history, run validate first"
+            elif stage == 'forecast':
+                action = f"{meta.get('engine') or 'prophet'} forecast + residual scores" if meta.get('ml') else "skip: not an ML ticker"
+            else:
+                wanted = [w for w, on in (("benchmark", meta.get('benchmark_key')), ("intraday", checks.get(ticker))) if on]
+                action = f"{' + '.join(wanted)} check {params['start_date']}..{params['end_date']}" if wanted else "skip: no benchmark or interval check configured"
+        else:
+            source = _store('quarantine_store', 'quarantine')
+            action = f"quarantine records {params['start_date']}..{params['end_date']}"
+        rows.append({'ticker': ticker, 'interval': meta['interval'], 'stage': stage, 'input': source,
+                     'written': _stamp(source), 'action': action})
+    return pd.DataFrame(rows, columns=['ticker', 'interval', 'stage', 'input', 'written', 'action'])
+
+def run_ingest(journal, run_id, params, selected, ecb_keys):
+    """Download the selected tickers, the ECB series in ecb_keys and the intraday checks for the window"""
+    ecb_files = ingest_ecb(ecb_keys, journal, run_id, params)
+    yahoo_files = ingest_yahoo(selected['ticker'].tolist(), journal, run_id, params,
+                               intervals=dict(zip(selected['ticker'], selected['interval'])))
+    intraday_files = ingest_intraday(list(yahoo_files), journal, run_id, params)
+    logger.info(f"Ingested {len(yahoo_files)}/{len(selected)} tickers, {len(ecb_files)} benchmarks, {len(intraday_files)} intraday series")
+    return len(selected) - len(yahoo_files)
+
+def in_window(index, start=None, end=None):
+    """Mask of the bars from start through the whole end day (tz-aware bars compared on local time)"""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    mask = np.ones(len(idx), dtype=bool)
+    if start:
+        mask &= idx >= pd.Timestamp(start)
+    if end:
+        mask &= idx < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return mask
+
+def _reconcile_inputs(journal, selected):
+    """Latest benchmark and intraday downloads of the selection, keyed like the ingest stage"""
+    checks = config['pipeline'].get('interval_checks') or {}
+    keys = list(selected['benchmark_key'].dropna().unique())
+    return checks, latest_artifacts(journal, "ingest", set(keys) | {f"{t}@{iv}" for t, iv in checks.items()})
+
+def run_validate(journal, run_id, params, selected, start=None, end=None):
+    """
+    The pipeline's validation of each ticker's latest download (revisions, quality and unit checks,
+    clean store, snapshot, calendar gaps, profiles), then the benchmark and intraday re-check of the
+    bars the vendor revised. With start/end only the download's bars in that window are validated
+    and the stored clean bars outside it are kept.
+    """
+    clean_root = _store('clean_store', 'clean')
+    raw = latest_artifacts(journal, "ingest", set(selected['ticker']))
+    checks, inputs = _reconcile_inputs(journal, selected)
+    issues = 0
+    for meta in selected.to_dict('records'):
+        ticker = meta['ticker']
+        df = load_data(raw[ticker]) if ticker in raw else None
+        if df is None:
+            logger.warning(f"Skipping {ticker}: no download to validate, run ingest first")
+            continue
+        keep = None
+        if start or end:
+            df = df[in_window(df.index, start, end)]
+            path = clean_path(clean_root, ticker)
+            if os.path.exists(path):
+                stored = pd.read_parquet(path)
+                keep = stored[~in_window(stored.index, start, end)]
+        clean_df, path, revised, batches, has_issue = validate_ticker(meta, df, run_id, params['run_date'], journal, keep=keep)
+
+        # Revised bars are checked again against the benchmark and intraday bars, as in the full pipeline
+        if len(revised) and not clean_df.empty:
+            clean_df = sanitize_index(clean_df, ticker, meta.get('asset_class'))
+            revised_df = clean_df[clean_df.index.isin(revised)]
+            key, interval = meta.get('benchmark_key'), checks.get(ticker)
+            recon_batches, recon_issue = reconcile_ticker(meta, revised_df, revised_df, inputs.get(key) if key else None,
+                                                          inputs.get(f"{ticker}@{interval}") if interval else None, run_id)
+            batches += recon_batches
+            has_issue |= recon_issue
+        append_quarantine_batch(pa.concat_tables(batches), _store('quarantine_store', 'quarantine'), params['run_date'],
+                                part_key=ticker, run_id=run_id)
+        issues += has_issue
+        logger.info(f"Validated {ticker}: {len(clean_df)} clean bars, {len(revised)} revised")
+    return issues
+
+def run_reconcile(journal, run_id, params, selected):
+    """Benchmark and intraday-vs-daily checks of the stored clean history over the window"""
+    clean_root = _store('clean_store', 'clean')
+    checks, inputs = _reconcile_inputs(journal, selected)
+    issues = 0
+    for meta in selected.to_dict('records'):
+        ticker, key, interval = meta['ticker'], meta.get('benchmark_key'), checks.get(meta['ticker'])
+        path = clean_path(clean_root, ticker)
+        if not os.path.exists(path) or not (key or interval):
+            continue
+        if key and key not in inputs:
+            logger.warning(f"No {key} download for {ticker}, run ingest first")
+        if interval and f"{ticker}@{interval}" not in inputs:
+            logger.warning(f"No {interval} download for {ticker}, run ingest first")
+        clean_df = sanitize_index(pd.read_parquet(path), ticker, meta.get('asset_class'))
+        window = clean_df[in_window(clean_df.index, params['start_date'], params['end_date'])]
+        batches, has_issue = reconcile_ticker(meta, window, window, inputs.get(key) if key else None,
+                                              inputs.get(f"{ticker}@{interval}") if interval else None, run_id)
+        if batches:
+            append_quarantine_batch(pa.concat_tables(batches), _store('quarantine_store', 'quarantine'), params['run_date'], part_key=ticker)
+        record_stage(journal, run_id, ticker, "reconcile", has_issue=has_issue)
+        issues += has_issue
+    return issues
+
+def run_forecast(journal, run_id, params, selected, start=None, end=None):
+    """
+    Forecast the stored clean history of the selected ML tickers and rescore their bars,
+    as the pipeline does. With start/end the models train on the bars in that window only.
+    """
+    clean_root = _store('clean_store', 'clean')
+    metas = [m for m in selected.to_dict('records') if m.get('ml') and os.path.exists(clean_path(clean_root, m['ticker']))]
+    histories = {m['ticker']: clean_path(clean_root, m['ticker']) for m in metas}
+    clean = {}
+    for m in metas:
+        df = sanitize_index(pd.read_parquet(histories[m['ticker']]), m['ticker'], m.get('asset_class'))
+        clean[m['ticker']] = df[in_window(df.index, start, end)] if (start or end) and not df.empty else df
+    unusable = [t for t, df in clean.items() if df.empty or 'Close' not in df.columns]
+    for ticker in unusable:
+        logger.warning(f"Skipping {ticker}: no usable prices in the clean store after unit checks")
+    metas = [m for m in metas if m['ticker'] not in unusable]
+
+    # Batch engines in one vectorized call per engine (recorded as each ticker's 'forecast' stage), Prophet per ticker
+    by_engine = {}
+    for m in metas:
+        if m.get('engine') in BATCH_ENGINES:
+            by_engine.setdefault(m['engine'], {})[m['ticker']] = pd.to_numeric(clean[m['ticker']]['Close'], errors='coerce')
+    publish_batch_forecasts(by_engine, journal, run_id, histories)
+
+    anomalies = 0
+    for m in metas:
+        ticker = m['ticker']
+        history = clean[ticker] if start or end else histories[ticker]
+        _, batches, is_anomaly = forecast_ticker(m, clean[ticker], history, run_id, journal)
+        if batches:
+            append_quarantine_batch(pa.concat_tables(batches), _store('quarantine_store', 'quarantine'), params['run_date'], part_key=ticker)
+        anomalies += is_anomaly
+    return anomalies + len(unusable)
+
+def run_report(params, selected, run_id=None, out=None):
+    """Quarantine records of the selected tickers whose bars fall in the window (one run, or every run)"""
+    store = _store('quarantine_store', 'quarantine')
+    sql = """
+        SELECT ts AS Date, ticker AS Ticker, close AS Close, qa_reason, rule_mask, severity, run_id
+        FROM quarantine
+        WHERE list_contains(?, ticker) AND ts >= CAST(? AS TIMESTAMP) AND ts < CAST(? AS TIMESTAMP) + INTERVAL 1 DAY
+    """
+    args = [selected['ticker'].tolist(), params['start_date'], params['end_date']]
+    if run_id:
+        sql += " AND run_id = ?"
+        args.append(run_id)
+    df = query_quarantine(store, sql + " ORDER BY Ticker, Date", args)
+    out = out or os.path.join(_settings()['data_folder'], f"QUARANTINE_REPORT_{params['start_date']}_{params['end_date']}.csv".replace('-', '_'))
+    df.to_csv(out, index=False)
+    if not df.empty:
+        print(df.groupby(['Ticker', 'severity']).size().unstack(fill_value=0).to_string())
+    return len(df), out
+
+if __name__ == "__main__":
+    # Selective execution, one stage at a time over stored outputs:
+    # python src/pipeline_cli.py ingest --tickers EURUSD=X --start 2025-01-01
+    # python src/pipeline_cli.py reconcile --tickers EURUSD=X --start 2026-01-01 --dry-run
+    # python src/pipeline_cli.py validate --tickers AAPL --start 2026-01-01
+    # python src/pipeline_cli.py forecast --tickers "EUR*" "*.AS"
+    # python src/pipeline_cli.py report --tickers AAPL --start 2026-01-01 --end 2026-01-31
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument("--tickers", nargs="+", help="Tickers or fnmatch patterns (default: the whole universe)")
+    filters.add_argument("--intervals", nargs="+", help="Only these bar intervals, e.g. 1d 1h")
+    filters.add_argument("--dry-run", action="store_true", help="Print the plan (inputs reused, actions) and exit")
+    window = argparse.ArgumentParser(add_help=False)
+    window.add_argument("--start", help="YYYY-MM-DD")
+    window.add_argument("--end", help="YYYY-MM-DD (default: today)")
+
+    parser = argparse.ArgumentParser(description="Run single pipeline stages for selected tickers over stored outputs")
+    sub = parser.add_subparsers(dest="stage", required=True)
+    sub.add_parser("ingest", parents=[filters, window], help="Download raw bars, benchmarks and intraday checks (default start: history_days ago)")
+    sub.add_parser("validate", parents=[filters, window], help="Pipeline validation of the latest downloads into the clean store (default: every bar)")
+    sub.add_parser("reconcile", parents=[filters, window], help="Benchmark and intraday checks of the clean store (default start: 7 days ago)")
+    sub.add_parser("forecast", parents=[filters, window], help="Forecasts and residual scores from the clean store (default: whole history)")
+    p_report = sub.add_parser("report", parents=[filters, window], help="Quarantine records for the selection (default start: 7 days ago)")
+    p_report.add_argument("--run-id", help="Only records of this run")
+    p_report.add_argument("--out", help="CSV path (default: data/QUARANTINE_REPORT_<start>_<end>.csv)")
+    args = parser.parse_args()
+
+    universe = load_universe(config['pipeline'])
+    selected = select_universe(universe, args.tickers, args.intervals)
+    if selected.empty:
+        logger.error(f"No universe ticker matches --tickers {args.tickers} --intervals {args.intervals}")
+        sys.exit(2)
+    params = window_params(getattr(args, 'start', None), getattr(args, 'end', None),
+                           default_days=None if args.stage == 'ingest' else 7)
+
+    journal = open_journal(_settings().get('journal_db', f"{_settings()['data_folder']}/run_journal.db"))
+    if args.dry_run:
+        print(plan_stage(journal, args.stage, selected, params).to_string(index=False))
+        sys.exit(0)
+
+    if args.stage == 'report':
+        n, out = run_report(params, selected, args.run_id, args.out)
+        logger.info(f"{n} quarantined bars for {len(selected)} tickers. Report: {out}")
+        sys.exit(0)
+
+    # Every ad-hoc stage is its own journal run, so its outputs become the latest artifacts
+    run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{args.stage}"
+    start_run(journal, run_id, {**params, 'stage': args.stage, 'tickers': selected['ticker'].tolist()})
+    logger.info(f"{args.stage} for {len(selected)} tickers, run id {run_id}")
+    if args.stage == 'ingest':
+        # A filtered ingest only fetches the benchmarks of the selected tickers
+        keys = benchmark_keys(selected, {}) if args.tickers or args.intervals else benchmark_keys(universe, config['pipeline'])
+        issues = run_ingest(journal, run_id, params, selected, keys)
+    elif args.stage == 'validate':
+        issues = run_validate(journal, run_id, params, selected, args.start, args.end)
+    elif args.stage == 'reconcile':
+        issues = run_reconcile(journal, run_id, params, selected)
+    else:
+        issues = run_forecast(journal, run_id, params, selected, args.start, args.end)
+    finish_run(journal, run_id, "completed")
+    logger.info(f"{args.stage} finished: {issues} ticker(s) with issues (report: pipeline_cli.py report --run-id {run_id})")
@@ -0,0 +1,329 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+from dashboard_data import file_identity, PUBLISH_MARKER
+from quarantine_store import query_quarantine, severity_for_mask, REASON_TO_RULE, RULE_SEVERITY
+from quarantine_store import RULE_PEER_DECOUPLING, RULE_VENDOR_REVISION
+from analyst_views import clean_path
+
+logger = logging.getLogger("QualityService")
+
+RULE_BITS = sorted(RULE_SEVERITY)
+RULE_NAMES = {bit: name for name, bit in REASON_TO_RULE.items()}
+NS_PER_DAY = 86_400 * 10**9
+# Rules a bar is flagged for once, by the run that saw the event, and not re-emitted after.
+# Every other rule is re-evaluated (or, for ML, re-emitted while open) by each run.
+EVENT_RULES = RULE_PEER_DECOUPLING | RULE_VENDOR_REVISION
+ISO_NAIVE = re.compile(r"\d{4}-\d{2}-\d{2}(T[\d:.]+)?")
+
+def parse_rule(value):
+    """Rule bit from its number ('16') or its reason prefix ('ML Anomaly', case-insensitive)"""
+    if str(value).isdigit() and int(value) in RULE_NAMES:
+        return int(value)
+    for name, bit in REASON_TO_RULE.items():
+        if name.lower() == str(value).lower():
+            return bit
+    raise ValueError(f"Unknown rule '{value}', expected one of {sorted(REASON_TO_RULE)} or their bits")
+
+def parse_window(start=None, end=None, date=None):
+    """[lo, hi] in ns. A bare date covers the whole day, a timestamp is an exact bar."""
+    if date is not None:
+        lo = _ns(date)
+        return (lo, lo + NS_PER_DAY - 1) if len(str(date)) <= 10 else (lo, lo)
+    lo = _ns(start) if start else np.iinfo(np.int64).min
+    hi = _ns(end) if end else np.iinfo(np.int64).max
+    return lo, hi
+
+def _ns(value):
+    # np.datetime64 parses plain ISO strings several times faster than pd.Timestamp
+    if ISO_NAIVE.fullmatch(str(value)):
+        return int(np.datetime64(value, 'ns').astype(np.int64))
+    return pd.Timestamp(value).as_unit('ns').value
+
+class TickerIndex:
+    """
+    Every known bar of one ticker as a sorted int64 timestamp array, plus one packed bitmap
+    (np.packbits, 1 bit per bar position) per rule that fired on it, and the precomputed
+    runs of consecutive clean positions.
+    """
+    __slots__ = ('ts', 'bitmaps', 'known', 'run_starts', 'run_ends')
+
+    def __init__(self, clean_ts, flagged_ts, flagged_masks):
+        self.ts = np.union1d(clean_ts, flagged_ts)
+        pos = np.searchsorted(self.ts, flagged_ts)
+        any_rule = np.zeros(len(self.ts), dtype=bool)
+        self.bitmaps = {}
+        for bit in RULE_BITS:
+            hit = pos[(flagged_masks & bit) != 0]
+            if len(hit):
+                mask = np.zeros(len(self.ts), dtype=bool)
+                mask[hit] = True
+                any_rule |= mask
+                self.bitmaps[bit] = np.packbits(mask)
+        # Bars in the clean store (a missing bar has a flag but no data)
+        self.known = np.packbits(np.isin(self.ts, clean_ts, assume_unique=True))
+
+        clean = ~any_rule
+        edges = np.diff(np.r_[0, clean.astype(np.int8), 0])
+        self.run_starts = np.flatnonzero(edges == 1)
+        self.run_ends = np.flatnonzero(edges == -1) - 1
+
+    def positions(self, lo, hi):
+        return np.searchsorted(self.ts, lo, 'left'), np.searchsorted(self.ts, hi, 'right')
+
+    def any_set(self, bitmap, i, j):
+        """Is any bit set at positions [i, j)? A single bar is one byte lookup."""
+        if j - i == 1:
+            return bool(bitmap[i >> 3] & (0x80 >> (i & 7)))
+        # Unpack only the bytes covering the window
+        b0 = i >> 3
+        chunk = np.unpackbits(bitmap[b0:(j + 7) >> 3])
+        return bool(chunk[i - b0 * 8:j - b0 * 8].any())
+
+class QualityIndex:
+    """Immutable index as of one published run. Reloads build a new one and swap the reference."""
+
+    def __init__(self, run_id, tickers, rule_ts, rule_tickers, loaded_at=None):
+        self.run_id = run_id
+        self.tickers = tickers              # ticker -> TickerIndex
+        self.rule_ts = rule_ts              # rule bit -> sorted flagged timestamps across tickers
+        self.rule_tickers = rule_tickers    # rule bit -> ticker of each of those timestamps
+        self.loaded_at = loaded_at or time.time()
+
+    def bar_status(self, ticker, lo, hi):
+        """Is every bar of the ticker in [lo, hi] clean? Lists the rules that fired"""
+        idx = self.tickers.get(ticker)
+        if idx is None:
+            return {'ticker': ticker, 'known': False, 'clean': None, 'bars': 0, 'rules': []}
+        i, j = idx.positions(lo, hi)
+        mask = sum(bit for bit, bitmap in idx.bitmaps.items() if j > i and idx.any_set(bitmap, i, j))
+        known = j > i and idx.any_set(idx.known, i, j)
+        return {
+            'ticker': ticker, 'known': known, 'clean': (known and not mask) if j > i else None,
+            'bars': int(j - i), 'rule_mask': mask, 'rules': [RULE_NAMES[bit] for bit in RULE_BITS if mask & bit],
+            'severity': severity_for_mask(mask) if mask else None,
+        }
+
+    def failing(self, bit, lo, hi):
+        """Tickers with at least one bar failing the rule in [lo, hi], with their bar counts"""
+        ts = self.rule_ts.get(bit)
+        if ts is None:
+            return {}
+        i, j = np.searchsorted(ts, lo, 'left'), np.searchsorted(ts, hi, 'right')
+        names, counts = np.unique(self.rule_tickers[bit][i:j], return_counts=True)
+        return dict(zip(names.tolist(), counts.tolist()))
+
+    def clean_ranges(self, ticker, lo, hi):
+        """Maximal runs of consecutive clean bars overlapping [lo, hi], as [first, last] timestamps"""
+        idx = self.tickers.get(ticker)
+        if idx is None:
+            return None
+        i, j = idx.positions(lo, hi)
+        if j <= i:
+            return []
+        # Runs are sorted and disjoint: binary search the ones that overlap positions [i, j)
+        a = np.searchsorted(idx.run_ends, i, 'left')
+        b = np.searchsorted(idx.run_starts, j - 1, 'right')
+        starts = np.maximum(idx.run_starts[a:b], i)
+        ends = np.minimum(idx.run_ends[a:b], j - 1)
+        first = np.datetime_as_string(idx.ts[starts].astype('datetime64[ns]'), unit='s')
+        last = np.datetime_as_string(idx.ts[ends].astype('datetime64[ns]'), unit='s')
+        return [list(pair) for pair in zip(first.tolist(), last.tolist())]
+
+def latest_run_id(data_folder, store_root):
+    """The run announced by the publish marker, else the newest run in the store"""
+    marker = os.path.join(data_folder, PUBLISH_MARKER)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            return json.load(f).get('run_id')
+    runs = query_quarantine(store_root, "SELECT max(run_id) AS run_id FROM quarantine")
+    return None if runs.empty else runs['run_id'].iloc[0]
+
+def build_index(store_root, clean_root, run_id, tickers=None):
+    """
+    Index the flag set current as of one run: the bars of every ticker in the clean store
+    plus the bars that run quarantined (which includes bars dropped from the clean store and
+    missing bars), plus the event flags (peer decoupling, vendor revision) of every run up to
+    it, which are only recorded by the run that saw them.
+    """
+    # Watch polls of one run can flag the same bar twice, and an event flag from an earlier
+    # run lands on a bar the latest run may flag again: combine their masks
+    records = query_quarantine(store_root, f"""
+        SELECT ticker, ts, bit_or(CASE WHEN run_id = ? THEN rule_mask ELSE rule_mask & {EVENT_RULES} END) AS rule_mask
+        FROM quarantine
+        WHERE run_id = ? OR (run_id <= ? AND (rule_mask & {EVENT_RULES}) != 0)
+        GROUP BY ticker, ts ORDER BY ticker, ts
+    """, [run_id, run_id, run_id])
+    by_ticker = {t: g for t, g in records.groupby('ticker', sort=False)}
+
+    if tickers is None:
+        names = [f[:-len(".parquet")] for f in os.listdir(clean_root) if f.endswith(".parquet")] if os.path.isdir(clean_root) else []
+        tickers = sorted(set(names) | set(by_ticker))
+
+    index = {}
+    for ticker in tickers:
+        path = clean_path(clean_root, ticker)
+        clean_ts = np.array([], dtype=np.int64)
+        if os.path.exists(path):
+            idx = pd.read_parquet(path, columns=[]).index
+            idx = pd.DatetimeIndex(idx)
+            if idx.tz is not None:
+                idx = idx.tz_localize(None)
+            clean_ts = np.unique(idx.as_unit('ns').asi8)
+        flagged = by_ticker.get(ticker)
+        if flagged is None:
+            flagged_ts, masks = np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        else:
+            flagged_ts = pd.DatetimeIndex(flagged['ts']).as_unit('ns').asi8
+            masks = flagged['rule_mask'].to_numpy(dtype=np.int64)
+        index[ticker] = TickerIndex(clean_ts, flagged_ts, masks)
+
+    # Cross-ticker postings per rule for "who failed rule X in this window"
+    rule_ts, rule_tickers = {}, {}
+    if not records.empty:
+        ts = pd.DatetimeIndex(records['ts']).as_unit('ns').asi8
+        masks = records['rule_mask'].to_numpy(dtype=np.int64)
+        names = records['ticker'].to_numpy(dtype=object)
+        for bit in RULE_BITS:
+            sel = (masks & bit) != 0
+            order = np.argsort(ts[sel], kind='stable')
+            rule_ts[bit] = ts[sel][order]
+            rule_tickers[bit] = names[sel][order]
+
+    logger.info(f"Indexed run {run_id}: {len(index)} tickers, {len(records)} flagged bars")
+    return QualityIndex(run_id, index, rule_ts, rule_tickers)
+
+class QualityService:
+    """
+    Holds the current QualityIndex and rebuilds it in a background thread whenever the
+    pipeline publishes a new run (publish marker identity changes). Requests read
+    self.index once, so a reload is an atomic reference swap and never blocks them.
+    """
+
+    def __init__(self, data_folder, store_root, clean_root, reload_seconds=5):
+        self.data_folder = data_folder
+        self.store_root = store_root
+        self.clean_root = clean_root
+        self.reload_seconds = reload_seconds
+        self.index = None
+        self._marker = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self, force=False):
+        """Rebuild if a new run was published. Returns True if the index was swapped."""
+        marker = file_identity(os.path.join(self.data_folder, PUBLISH_MARKER))
+        if not force and self.index is not None and marker == self._marker:
+            return False
+        run_id = latest_run_id(self.data_folder, self.store_root)
+        index = build_index(self.store_root, self.clean_root, run_id)
+        self.index, self._marker = index, marker
+        return True
+
+    def start_watching(self):
+        def watch():
+            while not self._stop.wait(self.reload_seconds):
+                try:
+                    self.reload()
+                except Exception as e:
+                    # Keep serving the previous index
+                    logger.error(f"Index reload failed: {e}")
+        self._thread = threading.Thread(target=watch, name="quality-index-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def handle(self, path, params):
+        """Route one query. Returns (status code, JSON-able payload)."""
+        index = self.index
+        get = lambda k: params.get(k, [None])[0]
+        try:
+            if path == "/health":
+                return 200, {'run_id': index.run_id, 'tickers': len(index.tickers), 'loaded_at': index.loaded_at}
+            if path == "/bar":
+                lo, hi = parse_window(get('start'), get('end'), get('date') or get('ts'))
+                return 200, {'run_id': index.run_id, **index.bar_status(get('ticker'), lo, hi)}
+            if path == "/failing":
+                bit = parse_rule(get('rule'))
+                lo, hi = parse_window(get('start'), get('end'), get('date'))
+                return 200, {'run_id': index.run_id, 'rule': RULE_NAMES[bit], 'tickers': index.failing(bit, lo, hi)}
+            if path == "/clean_ranges":
+                lo, hi = parse_window(get('start'), get('end'))
+                ranges = index.clean_ranges(get('ticker'), lo, hi)
+                if ranges is None:
+                    return 404, {'error': f"Unknown ticker {get('ticker')}"}
+                return 200, {'run_id': index.run_id, 'ticker': get('ticker'), 'ranges': ranges}
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        return 404, {'error': f"Unknown endpoint {path}", 'endpoints': ["/health", "/bar", "/failing", "/clean_ranges"]}
+
+def make_server(service, host="127.0.0.1", port=8765):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, one connection per client
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            status, payload = service.handle(url.path, parse_qs(url.query))
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    # python src/quality_service.py --port 8765
+    # curl 'localhost:8765/bar?ticker=AAPL&date=2026-01-20'
+    # curl 'localhost:8765/failing?rule=ML%20Anomaly&start=2026-01-19&end=2026-01-25'
+    # curl 'localhost:8765/clean_ranges?ticker=EURUSD=X'
+    import yaml
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Data quality query service")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    data_folder = settings['data_folder']
+    params = pipeline.get('quality_service') or {}
+    host = args.host or params.get('host', "127.0.0.1")
+    port = args.port or params.get('port', 8765)
+
+    service = QualityService(
+        data_folder,
+        settings.get('quarantine_store', f"{data_folder}/quarantine"),
+        settings.get('clean_store', f"{data_folder}/clean"),
+        params.get('reload_seconds', 5),
+    )
+    service.reload(force=True)
+    service.start_watching()
+    server = make_server(service, host, port)
+    logger.info(f"Serving run {service.index.run_id} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
@@ -0,0 +1,211 @@
+import os
+import uuid
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import duckdb
+
+logger = logging.getLogger("QuarantineStore")
+
+# Rule bitmask
+# Every quarantined bar carries the OR of all rules it failed, so one row per bar
+# instead of one row per (bar, rule) like the old UNION ALL report
+RULE_HIGH_LT_LOW = 1
+RULE_VOLUME_NON_POSITIVE = 2
+RULE_MISSING_VALUE = 4
+RULE_BENCHMARK_MISMATCH = 8
+RULE_ML_ANOMALY = 16
+RULE_INTERVAL_MISMATCH = 32
+RULE_MISSING_BAR = 64
+RULE_OFF_CALENDAR_BAR = 128
+RULE_DISTRIBUTION_DRIFT = 256
+RULE_PEER_DECOUPLING = 512
+RULE_VENDOR_REVISION = 1024
+
+# Maps the qa_reason prefixes produced by the validators to their rule bit
+REASON_TO_RULE = {
+    "Logic Error: High < Low": RULE_HIGH_LT_LOW,
+    "Logic Error: Volume <= 0": RULE_VOLUME_NON_POSITIVE,
+    "Missing Value": RULE_MISSING_VALUE,
+    "Benchmark Mismatch": RULE_BENCHMARK_MISMATCH,
+    "ML Anomaly": RULE_ML_ANOMALY,
+    "Interval Mismatch": RULE_INTERVAL_MISMATCH,
+    "Missing Bar": RULE_MISSING_BAR,
+    "Off-Calendar Bar": RULE_OFF_CALENDAR_BAR,
+    "Distribution Drift": RULE_DISTRIBUTION_DRIFT,
+    "Peer Decoupling": RULE_PEER_DECOUPLING,
+    "Vendor Revision": RULE_VENDOR_REVISION,
+}
+
+# Hard logic failures block the bar, softer signals are for manual review
+RULE_SEVERITY = {
+    RULE_HIGH_LT_LOW: "ERROR",
+    RULE_VOLUME_NON_POSITIVE: "ERROR",
+    RULE_MISSING_VALUE: "ERROR",
+    RULE_BENCHMARK_MISMATCH: "WARNING",
+    RULE_ML_ANOMALY: "WARNING",
+    RULE_INTERVAL_MISMATCH: "WARNING",
+    RULE_MISSING_BAR: "WARNING",
+    RULE_OFF_CALENDAR_BAR: "WARNING",
+    RULE_DISTRIBUTION_DRIFT: "WARNING",
+    RULE_PEER_DECOUPLING: "WARNING",
+    RULE_VENDOR_REVISION: "WARNING",
+}
+
+# Fixed schema so every partition file is typed the same way (no 'Check Forecast' in Close)
+QUARANTINE_SCHEMA = pa.schema([
+    ("run_id", pa.string()),
+    ("ticker", pa.string()),
+    ("ts", pa.timestamp("ns")),
+    ("rule_mask", pa.int64()),
+    ("severity", pa.string()),
+    ("qa_reason", pa.string()),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.float64()),
+    ("benchmark", pa.float64()),
+])
+
+def reason_to_rule(reason):
+    """Translate a validator qa_reason string into its rule bit (0 if unknown)"""
+    for prefix, rule in REASON_TO_RULE.items():
+        if str(reason).startswith(prefix):
+            return rule
+    return 0
+
+def severity_for_mask(mask):
+    """ERROR wins over WARNING when a bar failed several rules"""
+    for rule, severity in RULE_SEVERITY.items():
+        if mask & rule and severity == "ERROR":
+            return "ERROR"
+    return "WARNING"
+
+def build_quarantine_batch(quarantine_df, run_id, ticker, observed=None):
+    """
+    Convert a validator output (Date index, Close, qa_reason, optional Benchmark)
+    into a pyarrow Table with QUARANTINE_SCHEMA.
+
+    observed: the source OHLCV frame, used to attach Open/High/Low/Volume to each bar
+    Rows for the same timestamp are collapsed into one row with a combined rule mask.
+    """
+    if quarantine_df is None or quarantine_df.empty:
+        return QUARANTINE_SCHEMA.empty_table()
+
+    q = quarantine_df.copy()
+    q.index = pd.to_datetime(q.index)
+    if q.index.tz is not None:
+        q.index = q.index.tz_localize(None)
+    q.index.name = "ts"
+    q = q.reset_index()
+
+    q["rule_mask"] = q["qa_reason"].map(reason_to_rule).astype("int64")
+    if "Benchmark" not in q.columns:
+        q["Benchmark"] = np.nan
+
+    # Collapse (bar, rule) rows into one row per bar
+    grouped = q.groupby("ts", sort=True).agg(
+        rule_mask=("rule_mask", lambda s: int(np.bitwise_or.reduce(s.to_numpy()))),
+        qa_reason=("qa_reason", lambda s: "; ".join(dict.fromkeys(s.astype(str)))),
+        close=("Close", "first"),
+        benchmark=("Benchmark", "first"),
+    )
+
+    # Attach the observed OHLCV values for each quarantined bar
+    for col in ["open", "high", "low", "volume"]:
+        grouped[col] = np.nan
+    if observed is not None and not observed.empty:
+        obs = observed.copy()
+        obs.index = pd.to_datetime(obs.index)
+        if obs.index.tz is not None:
+            obs.index = obs.index.tz_localize(None)
+        obs = obs[~obs.index.duplicated(keep="last")]
+        for col in ["Open", "High", "Low", "Volume"]:
+            if col in obs.columns:
+                grouped[col.lower()] = pd.to_numeric(obs[col], errors="coerce").reindex(grouped.index).to_numpy()
+
+    grouped = grouped.reset_index()
+    grouped["close"] = pd.to_numeric(grouped["close"], errors="coerce")
+    grouped["benchmark"] = pd.to_numeric(grouped["benchmark"], errors="coerce")
+    grouped["run_id"] = run_id
+    grouped["ticker"] = ticker
+    grouped["severity"] = grouped["rule_mask"].map(severity_for_mask)
+
+    return pa.Table.from_pandas(grouped[QUARANTINE_SCHEMA.names], schema=QUARANTINE_SCHEMA, preserve_index=False)
+
+def append_quarantine_batch(table, store_root, run_date, part_key=None, run_id=None):
+    """
+    Append one record batch to the store under run_date=<YYYY-MM-DD>/.
+    Every call writes its own uniquely named file via temp file + rename, so parallel
+    workers never contend for the same file.
+
+    part_key: optional stable name (e.g. the ticker). Re-writing the same run_id/part_key
+    replaces the earlier file instead of duplicating records, which keeps resumed runs idempotent.
+    run_id: needed with part_key so an empty batch removes the records an earlier attempt of the
+    run wrote (a re-processed ticker that is clean now), an empty table has no run_id to read.
+    """
+    partition = os.path.join(store_root, f"run_date={run_date}")
+    suffix = str(part_key).replace(os.sep, "_") if part_key is not None else uuid.uuid4().hex
+
+    if table is None or table.num_rows == 0:
+        stale = os.path.join(partition, f"part-{run_id}-{suffix}.parquet")
+        if part_key is not None and run_id is not None and os.path.exists(stale):
+            os.remove(stale)
+        return None
+
+    os.makedirs(partition, exist_ok=True)
+    run_id = table.column("run_id")[0].as_py()
+    final_path = os.path.join(partition, f"part-{run_id}-{suffix}.parquet")
+    tmp_path = os.path.join(partition, f".{uuid.uuid4().hex}.parquet.tmp")
+
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, final_path)
+    return final_path
+
+def quarantine_connection(store_root):
+    """DuckDB connection with a 'quarantine' view over every run partition"""
+    con = duckdb.connect(database=':memory:')
+    pattern = os.path.join(store_root, "run_date=*", "*.parquet")
+    con.execute(f"""
+        CREATE VIEW quarantine AS
+        SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)
+    """)
+    return con
+
+def query_quarantine(store_root, sql="SELECT * FROM quarantine", params=None):
+    """Run SQL against the 'quarantine' view across all runs"""
+    if not os.path.isdir(store_root) or not any(
+        f.endswith(".parquet") for _, _, files in os.walk(store_root) for f in files
+    ):
+        return pd.DataFrame(columns=QUARANTINE_SCHEMA.names)
+
+    con = quarantine_connection(store_root)
+    try:
+        return con.execute(sql, params or []).fetchdf()
+    finally:
+        con.close()
+
+def export_run_report(store_root, run_id, report_path):
+    """
+    Write the CSV report for one run (Date/Ticker/Close/qa_reason kept for the dashboard).
+    Returns the number of quarantined bars.
+    """
+    df = query_quarantine(
+        store_root,
+        """
+        SELECT ts AS Date, ticker AS Ticker, close AS Close, qa_reason, rule_mask,
+               severity, open AS Open, high AS High, low AS Low, volume AS Volume, benchmark AS Benchmark
+        FROM quarantine
+        WHERE run_id = ?
+        ORDER BY Ticker, Date
+        """,
+        [run_id],
+    )
+    if df.empty:
+        return 0
+
+    df.to_csv(report_path, index=False)
+    return len(df)
@@ -0,0 +1,143 @@
+import os
+import uuid
+import logging
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("ResidualScoring")
+
+SCORE_COLUMNS = ['close', 'yhat', 'yhat_lower', 'yhat_upper', 'z', 'flag', 'run_id']
+
+def z_critical(interval_width):
+    """Standard normal quantile matching the forecast band (1.96 for 95%)"""
+    return NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+def band_z(y, yhat, lower, upper, interval_width=0.95):
+    """
+    Standardized residual and outside-the-band flag for aligned arrays.
+    z uses the upper half-width above the forecast and the lower one below it
+    (Prophet bands are not symmetric).
+    """
+    half = np.where(y >= yhat, upper - yhat, yhat - lower)
+    sigma = np.maximum(half, 1e-12) / z_critical(interval_width)
+    return (y - yhat) / sigma, (y < lower) | (y > upper)
+
+def score_bars(actual, forecast, interval_width=0.95):
+    """
+    Score every bar against its in-sample forecast interval in one vectorized pass.
+
+    actual:   Close series with a DatetimeIndex
+    forecast: DataFrame[ds, yhat, yhat_lower, yhat_upper] (Prophet or batch engine output)
+    Returns a DataFrame indexed by ts with close, yhat, bounds, z and flag.
+    z is the residual in units of the band's implied sigma (see band_z).
+    """
+    fc = forecast.set_index(pd.to_datetime(forecast['ds']))[['yhat', 'yhat_lower', 'yhat_upper']]
+    fc = fc[~fc.index.duplicated(keep='last')]
+    df = fc.join(pd.to_numeric(actual, errors='coerce').rename('close'), how='inner').dropna()
+    df.index.name = 'ts'
+
+    df['z'], df['flag'] = band_z(
+        df['close'].to_numpy(), df['yhat'].to_numpy(),
+        df['yhat_lower'].to_numpy(), df['yhat_upper'].to_numpy(), interval_width,
+    )
+    return df[['close', 'yhat', 'yhat_lower', 'yhat_upper', 'z', 'flag']]
+
+def _score_path(store_root, ticker):
+    return os.path.join(store_root, f"{str(ticker).replace(os.sep, '_')}.parquet")
+
+def load_scores(store_root, ticker):
+    path = _score_path(store_root, ticker)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=SCORE_COLUMNS, index=pd.DatetimeIndex([], name='ts'))
+    return pd.read_parquet(path)
+
+def update_scores(store_root, ticker, actual, forecast, run_id, interval_width=0.95, backfill=False):
+    """
+    Incrementally score a ticker and persist the per-bar results.
+
+    Only bars that were never scored, or whose close changed since (revisions), are scored;
+    earlier bars keep the score they got from the model of their time. backfill=True
+    rescores the whole history against the current forecast (still one vectorized pass).
+    Each newly scored bar is stamped with run_id. Returns the number of bars scored.
+    """
+    existing = pd.DataFrame() if backfill else load_scores(store_root, ticker)
+    actual = pd.to_numeric(actual, errors='coerce').dropna()
+    actual = actual[~actual.index.duplicated(keep='last')]
+
+    if existing.empty:
+        todo = actual
+    else:
+        stored = existing['close'].reindex(actual.index)
+        todo = actual[stored.isna().to_numpy() | ~np.isclose(stored.to_numpy(dtype=float), actual.to_numpy(), equal_nan=False)]
+
+    if todo.empty:
+        return 0
+
+    # Bars without a forecast (e.g. the warm-up bars of a batch engine) stay unscored
+    scored = score_bars(todo, forecast, interval_width).assign(run_id=run_id)
+    if scored.empty:
+        return 0
+    combined = scored if existing.empty else pd.concat([existing.drop(index=scored.index, errors='ignore'), scored])
+    combined = combined.sort_index()
+
+    os.makedirs(store_root, exist_ok=True)
+    path = _score_path(store_root, ticker)
+    tmp = os.path.join(store_root, f".{uuid.uuid4().hex}.parquet.tmp")
+    combined.to_parquet(tmp)
+    os.replace(tmp, path)
+
+    logger.info(f"Scored {len(scored)} bars for {ticker} ({int(scored['flag'].sum())} outside the band)")
+    return len(scored)
+
+def open_flags(store_root, ticker, interval_width=0.95, index=None):
+    """
+    Every bar whose stored score is outside its band, in the validator format (Date index,
+    Close, qa_reason) ready for build_quarantine_batch. A flag stays open until the bar is
+    rescored inside the band (its close was revised) or leaves the history, so each run reports
+    the full current set, not only the bars it scored. index limits it to the bars still held.
+    Reading back from the store keeps a resumed run's quarantine records identical.
+    """
+    scores = load_scores(store_root, ticker)
+    hits = scores[scores['flag'].astype(bool)]
+    if index is not None:
+        hits = hits[hits.index.isin(index)]
+    pct = f"{interval_width:.0%}"
+    reason = [
+        f"ML Anomaly: z={z:+.1f} outside {pct} band [{lo:.4g}, {hi:.4g}], scored in run {run}"
+        for z, lo, hi, run in zip(hits['z'], hits['yhat_lower'], hits['yhat_upper'], hits['run_id'])
+    ]
+    out = pd.DataFrame({'Close': hits['close'].to_numpy(), 'qa_reason': reason}, index=hits.index)
+    out.index.name = 'Date'
+    return out
+
+if __name__ == "__main__":
+    # Backfill: rescore the full history of tickers against their latest published forecast
+    # python src/residual_scoring.py EURUSD=X BTC-USD
+    import yaml
+    import argparse
+    from run_journal import open_journal, latest_artifacts
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Rescore every bar against the latest forecast interval")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--run-id", default="backfill", help="Stamp for the rescored bars")
+    parser.add_argument("--interval-width", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        settings = yaml.safe_load(f)['pipeline']['settings']
+    data_folder = settings['data_folder']
+    store = settings.get('residual_store', f"{data_folder}/residual_scores")
+    journal = open_journal(settings.get('journal_db', f"{data_folder}/run_journal.db"))
+    clean_files = latest_artifacts(journal, "validate", set(args.tickers))
+
+    for t in args.tickers:
+        forecast_path = os.path.join(data_folder, f"{t}_forecast.csv")
+        if t not in clean_files or not os.path.exists(forecast_path):
+            logger.warning(f"Skipping {t}: needs a validated history and a published forecast")
+            continue
+        close = pd.read_parquet(clean_files[t])['Close']
+        if close.index.tz is not None:
+            close.index = close.index.tz_localize(None)
+        update_scores(store, t, close, pd.read_csv(forecast_path), args.run_id, args.interval_width, backfill=True)
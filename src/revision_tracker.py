@@ -0,0 +1,177 @@
+import os
+import uuid
+import logging
+import numpy as np
+import pandas as pd
+import duckdb
+
+logger = logging.getLogger("RevisionTracker")
+
+# Hashed per bar. Adj Close is left out on purpose: every dividend restates it for the whole
+# history, so hashing it would report the entire series as revised after each payout.
+HASH_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+EVENT_COLUMNS = ['ts', 'kind', 'old_close', 'new_close']
+
+def state_path(root, ticker):
+    return os.path.join(root, f"{str(ticker).replace(os.sep, '_')}.npz")
+
+def bar_hashes(df, columns=HASH_COLUMNS):
+    """
+    (sorted int64 ns timestamps, uint64 hash of each bar's values, Close) for a Date-indexed frame.
+    Values are hashed as float64, so an int Volume read back as float hashes the same.
+    """
+    cols = [c for c in columns if c in df.columns]
+    values = pd.DataFrame({c: pd.to_numeric(df[c], errors='coerce').astype(float) for c in cols}, index=df.index)
+    values = values[~values.index.duplicated(keep='last')].sort_index()
+    ts = pd.DatetimeIndex(values.index).values.astype('datetime64[ns]').view(np.int64)   # UTC for tz-aware bars
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    close = values['Close'].to_numpy() if 'Close' in values.columns else np.full(len(values), np.nan)
+    return ts, hashes, close, cols
+
+def diff_hashes(old_ts, old_h, new_ts, new_h):
+    """
+    Vectorized diff of two sorted (timestamp, hash) arrays.
+    Returns (changed, inserted, deleted): positions in new of restated bars and of bars that appeared
+    inside the stored history, positions in old of bars that disappeared from the new download's range.
+    Bars after the stored history are ordinary new bars, bars outside the download's range were not sent.
+    """
+    none = np.array([], dtype=np.int64)
+    if len(old_ts) == 0 or len(new_ts) == 0:
+        return none, none, none
+    # Usual case: the stored bars in the download's range are exactly its first bars, only hashes can differ
+    a, b = int(np.searchsorted(old_ts, new_ts[0])), int(np.searchsorted(old_ts, new_ts[-1], side='right'))
+    m = b - a
+    if m <= len(new_ts) and np.array_equal(old_ts[a:b], new_ts[:m]):
+        rest = new_ts[m:]
+        return np.flatnonzero(old_h[a:b] != new_h[:m]), m + np.flatnonzero((rest > old_ts[0]) & (rest < old_ts[-1])), none
+
+    pos = np.minimum(np.searchsorted(old_ts, new_ts), len(old_ts) - 1)
+    found = old_ts[pos] == new_ts
+    changed = np.flatnonzero(found & (old_h[pos] != new_h))
+    inserted = np.flatnonzero(~found & (new_ts > old_ts[0]) & (new_ts < old_ts[-1]))
+
+    back = np.minimum(np.searchsorted(new_ts, old_ts), len(new_ts) - 1)
+    deleted = np.flatnonzero((new_ts[back] != old_ts) & (old_ts >= new_ts[0]) & (old_ts <= new_ts[-1]))
+    return changed, inserted, deleted
+
+def load_state(root, ticker):
+    """Stored (ts, hash, close, columns, run_id) of a ticker, or None before its first tracked run"""
+    path = state_path(root, ticker)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as f:
+        return f['ts'], f['hash'], f['close'], list(f['columns']), str(f['run_id'])
+
+def save_state(root, ticker, ts, hashes, close, columns, run_id):
+    os.makedirs(root, exist_ok=True)
+    path = state_path(root, ticker)
+    tmp = os.path.join(root, f".{uuid.uuid4().hex}.tmp.npz")
+    np.savez(tmp, ts=ts, hash=hashes, close=close, columns=np.array(columns), run_id=np.array(run_id))
+    os.replace(tmp, path)
+
+def _events_path(root, run_date, run_id, ticker):
+    return os.path.join(root, "events", f"run_date={run_date}", f"part-{run_id}-{str(ticker).replace(os.sep, '_')}.parquet")
+
+def track_revisions(root, ticker, df, run_id, run_date, columns=HASH_COLUMNS):
+    """
+    Diff a fresh download against the hashes stored by the previous run and store the new ones.
+    Bars the download no longer covers keep their stored hash, so the history grows past the
+    download window. The events (ts, kind, old_close, new_close) of this run are written to
+    <root>/events/run_date=<date>/ and returned; the first run of a ticker only stores a baseline.
+    A resumed run gets the events it found the first time instead of an empty diff against itself.
+    """
+    ts, hashes, close, cols = bar_hashes(df, columns)
+    stored = load_state(root, ticker)
+    events_path = _events_path(root, run_date, run_id, ticker)
+    if stored is not None and stored[4] == run_id:
+        return pd.read_parquet(events_path, columns=EVENT_COLUMNS) if os.path.exists(events_path) else pd.DataFrame(columns=EVENT_COLUMNS)
+
+    events = pd.DataFrame(columns=EVENT_COLUMNS)
+    if stored is not None and len(ts):
+        old_ts, old_h, old_close, old_cols, _ = stored
+        if old_cols != cols:
+            logger.warning(f"Hashed columns of {ticker} changed ({old_cols} -> {cols}), new revision baseline")
+        else:
+            changed, inserted, deleted = diff_hashes(old_ts, old_h, ts, hashes)
+            pos = np.searchsorted(old_ts, ts[changed])
+            events = pd.DataFrame({
+                'ts': np.concatenate([ts[changed], ts[inserted], old_ts[deleted]]),
+                'kind': ['changed'] * len(changed) + ['inserted'] * len(inserted) + ['deleted'] * len(deleted),
+                'old_close': np.concatenate([old_close[pos], np.full(len(inserted), np.nan), old_close[deleted]]),
+                'new_close': np.concatenate([close[changed], close[inserted], np.full(len(deleted), np.nan)]),
+            })
+            tz = pd.DatetimeIndex(df.index).tz
+            events['ts'] = pd.to_datetime(events['ts'].to_numpy(dtype='int64'), utc=tz is not None)
+            if tz is not None:
+                events['ts'] = events['ts'].dt.tz_convert(tz)
+            events = events.sort_values('ts', ignore_index=True)
+            # Keep the stored bars outside the download's range
+            before, after = old_ts < ts[0], old_ts > ts[-1]
+            ts = np.concatenate([old_ts[before], ts, old_ts[after]])
+            hashes = np.concatenate([old_h[before], hashes, old_h[after]])
+            close = np.concatenate([old_close[before], close, old_close[after]])
+
+    if not events.empty:
+        os.makedirs(os.path.dirname(events_path), exist_ok=True)
+        tmp = f"{events_path}.tmp"
+        events.assign(run_id=run_id, ticker=ticker).to_parquet(tmp, index=False)
+        os.replace(tmp, events_path)
+        counts = events['kind'].value_counts()
+        logger.warning(f"Vendor revisions for {ticker}: " + ", ".join(f"{n} {kind}" for kind, n in counts.items()))
+    save_state(root, ticker, ts, hashes, close, cols, run_id)
+    return events
+
+def revision_report(events):
+    """Events in the validator format (Date index, Close, qa_reason) for build_quarantine_batch"""
+    if events.empty:
+        return pd.DataFrame(columns=['Close', 'qa_reason'], index=pd.DatetimeIndex([], name='Date'))
+    reasons = np.where(events['kind'] == 'changed',
+                       "Vendor Revision: bar restated (Close " + events['old_close'].map('{:.6g}'.format)
+                       + " -> " + events['new_close'].map('{:.6g}'.format) + ")",
+                       "Vendor Revision: bar " + events['kind'])
+    close = events['new_close'].fillna(events['old_close'])
+    return pd.DataFrame({'Close': close.to_numpy(), 'qa_reason': reasons}, index=pd.DatetimeIndex(events['ts'], name='Date'))
+
+def revised_index(events):
+    """Tz-naive timestamps of the bars in the new download to check again (changed or inserted)"""
+    revised = pd.DatetimeIndex(events.loc[events['kind'] != 'deleted', 'ts'])
+    return revised.tz_localize(None) if revised.tz is not None else revised
+
+def load_events(root, ticker=None, since=None):
+    """Every stored revision event, optionally for one ticker and from a run_date on"""
+    pattern = os.path.join(root, "events", "run_date=*", "*.parquet")
+    if not os.path.isdir(os.path.join(root, "events")):
+        return pd.DataFrame(columns=EVENT_COLUMNS + ['run_id', 'ticker', 'run_date'])
+    where, params = [], []
+    if ticker:
+        where.append("ticker = ?")
+        params.append(ticker)
+    if since:
+        where.append("run_date >= ?")
+        params.append(str(since))
+    sql = f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    with duckdb.connect(database=':memory:') as con:
+        return con.execute(sql + " ORDER BY ticker, ts", params).fetchdf()
+
+if __name__ == "__main__":
+    # Revision history of the store:
+    # python src/revision_tracker.py [--ticker AAPL] [--since 2026-01-01]
+    import yaml
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List vendor revisions found by past runs")
+    parser.add_argument("--ticker")
+    parser.add_argument("--since", help="First run_date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        settings = yaml.safe_load(f)['pipeline']['settings']
+    root = settings.get('revision_store', f"{settings['data_folder']}/revisions")
+    events = load_events(root, args.ticker, args.since)
+    if events.empty:
+        print("No vendor revisions recorded")
+    else:
+        print(events.groupby(['run_date', 'ticker', 'kind']).size().unstack(fill_value=0).to_string())
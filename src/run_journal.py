@@ -0,0 +1,136 @@
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+
+logger = logging.getLogger("RunJournal")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT PRIMARY KEY,
+    started_at  TEXT NOT NULL,
+    finished_at TEXT,
+    status      TEXT NOT NULL,
+    params      TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stages (
+    run_id      TEXT NOT NULL,
+    ticker      TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    artifact    TEXT,
+    fingerprint TEXT,
+    has_issue   INTEGER NOT NULL DEFAULT 0,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, ticker, stage)
+);
+"""
+
+def open_journal(db_path):
+    """
+    Open (or create) the run journal.
+    WAL mode + synchronous=FULL: every committed stage survives a crash or kill -9,
+    and readers (e.g. a second worker) never block the writer.
+    """
+    folder = os.path.dirname(db_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    con = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=FULL")
+    con.executescript(SCHEMA)
+    return con
+
+def file_fingerprint(path):
+    """sha256 of a file's bytes (None if the artifact is missing)"""
+    if not path or not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def start_run(con, run_id, params):
+    """Register a new run with the parameters needed to resume it (dates, run_date...)"""
+    con.execute(
+        "INSERT INTO runs (run_id, started_at, status, params) VALUES (?, ?, 'running', ?)",
+        (run_id, datetime.now().isoformat(timespec="seconds"), json.dumps(params)),
+    )
+
+def resume_run(con, run_id):
+    """Mark an existing run as running again and return its original parameters"""
+    row = con.execute("SELECT status, params FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown run_id '{run_id}' in journal")
+
+    status, params = row
+    if status == "completed":
+        logger.warning(f"Run {run_id} already completed. Nothing left to resume except the final report.")
+
+    con.execute("UPDATE runs SET status = 'running', finished_at = NULL WHERE run_id = ?", (run_id,))
+    return json.loads(params)
+
+def finish_run(con, run_id, status):
+    """status: 'completed' | 'tripped' | 'failed'"""
+    con.execute(
+        "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?",
+        (status, datetime.now().isoformat(timespec="seconds"), run_id),
+    )
+
+def record_stage(con, run_id, ticker, stage, artifact=None, has_issue=False):
+    """Record that a stage finished for a ticker, along with the fingerprint of what it produced"""
+    con.execute(
+        """
+        INSERT OR REPLACE INTO stages (run_id, ticker, stage, artifact, fingerprint, has_issue, finished_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (run_id, ticker, stage, artifact, file_fingerprint(artifact), int(bool(has_issue)),
+         datetime.now().isoformat(timespec="seconds")),
+    )
+
+def clear_stages(con, run_id, ticker):
+    """Forget every checkpoint of a ticker (its input changed, so downstream results are stale)"""
+    con.execute("DELETE FROM stages WHERE run_id = ? AND ticker = ?", (run_id, ticker))
+
+def completed_stage(con, run_id, ticker, stage):
+    """
+    Return {'artifact', 'has_issue'} if the stage already finished in this run AND its
+    artifact is still on disk unchanged. Otherwise None, meaning the stage must run again.
+    """
+    row = con.execute(
+        "SELECT artifact, fingerprint, has_issue FROM stages WHERE run_id = ? AND ticker = ? AND stage = ?",
+        (run_id, ticker, stage),
+    ).fetchone()
+    if row is None:
+        return None
+
+    artifact, fingerprint, has_issue = row
+    if artifact and file_fingerprint(artifact) != fingerprint:
+        logger.warning(f"Artifact changed since checkpoint for {ticker}/{stage}: {artifact}. Re-running stage.")
+        return None
+
+    return {"artifact": artifact, "has_issue": bool(has_issue)}
+
+def run_progress(con, run_id):
+    """(tickers finished, tickers with an issue) across every process writing to this run"""
+    processed, failures = con.execute(
+        "SELECT COUNT(*), COALESCE(SUM(has_issue), 0) FROM stages WHERE run_id = ? AND stage = 'done'",
+        (run_id,),
+    ).fetchone()
+    return processed, failures
+
+def latest_artifacts(con, stage, tickers=None):
+    """{ticker: artifact} of the most recent run that finished the stage, for files still on disk"""
+    rows = con.execute(
+        "SELECT ticker, artifact FROM stages WHERE stage = ? AND artifact IS NOT NULL ORDER BY finished_at, run_id",
+        (stage,),
+    ).fetchall()
+    latest = {}
+    for ticker, artifact in rows:
+        if (tickers is None or ticker in tickers) and os.path.exists(artifact):
+            latest[ticker] = artifact
+    return latest
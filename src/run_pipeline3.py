@@ -3,14 +3,33 @@ import logging
 import pandas as pd
 import os
 import sys
+import time
+import argparse
 import yfinance as yf
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Custom modules I created
-from fetch_data import download_ohlcv_to_csv, download_ecb_data
+from fetch_data import download_ohlcv_to_csv, download_ecb_data, download_ecb_batch, load_ecb_series
 from validate_quality2 import load_data, run_quality_checks, check_with_benchmark
-from forecast_analysis import generate_forecast
+from forecast_analysis import generate_forecast, render_forecast_plot, sink, PLOT_MODE, PROPHET_PARAMS
+from residual_scoring import update_scores, open_flags
+from batch_forecast import forecast_batch, BATCH_ENGINES
+from quarantine_store import build_quarantine_batch, append_quarantine_batch, export_run_report
+from universe import load_universe, benchmark_keys, iter_chunks, enforce_memory_ceiling, infer_asset_class, MemoryCeilingExceeded
+from scheduler import ensure_schema, record_task, update_estimates, estimate_costs, lpt_order, simulate_makespan, report_accuracy
+from dashboard_data import publish_run
+from series_pyramid import publish_ticker_pyramids
+from interval_reconcile import load_intraday, reconcile_intervals
+from trading_calendar import gap_report
+from analyst_views import write_clean, clean_path
+from peer_correlation import update_peer_check, decoupling_report
+from snapshot_store import snapshot_ticker, chunk_grain
+from revision_tracker import track_revisions, revision_report, revised_index, HASH_COLUMNS
+from scale_breaks import detect_scale_breaks, apply_scale, expected_band, TOLERANCE
+from data_profiles import update_profiles, detect_drift, drift_report, partition_grain, partition_keys
+from run_journal import open_journal, start_run, resume_run, finish_run, record_stage, clear_stages, completed_stage
+import pyarrow as pa
 
 # Set custom cache location relative to project to avoid system level conflicts
 if not os.path.exists("cache"):
@@ -32,8 +51,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger("PipelineOrchestrator")
 
-def sanitize_index(df, ticker_name):
-    """Ensures Date index is clean, sorted and timezone-naive"""
+def sanitize_index(df, ticker_name, asset_class=None):
+    """Ensures Date index is clean, sorted and timezone-naive, with prices in consistent units"""
     try:
         # Column normalization
         if 'TIME_PERIOD' in df.columns:
@@ -55,204 +74,652 @@ def sanitize_index(df, ticker_name):
         if df.index.tz is not None:
             df.index = df.index.tz_localize(None)
 
-        # Unit Normalization
-        if ticker_name == "EURUSD=X" and not df.empty:
-            avg_price = df['Close'].mean()
-            if avg_price > 100 and avg_price < 2000:
-                logger.warning(f"Scale anomaly detected for {ticker_name} (~{avg_price:.2f}). Normalizing /1000")
-                for col in ['Open', 'High', 'Low', 'Close']:
-                    if col in df.columns:
-                        df[col] = df[col] / 1000
-            elif avg_price > 10000:
-                logger.critical(f"Data Type Mismatch: {ticker_name} contains prices around {avg_price:.0f}. This looks like Bitcoin data!")
-                return pd.DataFrame()
-
-        # Sort
-        df = df.sort_index()
-
-        return df
+        # Sort + Unit Normalization
+        return normalize_units(df, ticker_name, asset_class) if 'Close' in df.columns else df.sort_index()
     except Exception as e:
         logger.error(f"Sanitization failed for {ticker_name}: {e}")
         return df
 
-def process_yahoo_download(ticker, start, end, folder):
-    path = download_ohlcv_to_csv(ticker, start, end, "1d", folder)
+def normalize_units(df, ticker_name, asset_class=None):
+    """
+    x10^k jumps between bars (and whole series in the wrong units), judged against the expected
+    price band of the asset class. Returns the time-sorted frame with the wrong-unit segments
+    rescaled, or an empty DataFrame when no x10^k fix brings the series into its band.
+    The stacked detector gets this one series: it runs on the ticker's quality-checked bars,
+    which only exist inside process_ticker (the batch audit is scale_breaks.py).
+    """
+    if 'Close' not in df.columns or df.empty:
+        return df
+    df = df.sort_index()
+    scale_cfg = config['pipeline'].get('scale_checks', {}) or {}
+    band = expected_band(ticker_name, asset_class or infer_asset_class(ticker_name), scale_cfg.get('bands'), scale_cfg.get('tickers'))
+    shifts, segments, unfixable = detect_scale_breaks({ticker_name: df['Close']}, {ticker_name: band},
+                                                      scale_cfg.get('tolerance', TOLERANCE))
+    if unfixable:
+        median = pd.to_numeric(df['Close'], errors='coerce').median()
+        logger.critical(f"Data Type Mismatch: {ticker_name} contains prices around {median:.0f}, outside {band} under any x10^k unit fix. Wrong series?")
+        return pd.DataFrame()
+    for seg in segments.itertuples():
+        logger.warning(f"Scale break for {ticker_name}: {seg.bars} bars {seg.start:%Y-%m-%d} to {seg.end:%Y-%m-%d} rescaled x{seg.factor:g}")
+    if ticker_name in shifts:
+        df = apply_scale(df, shifts[ticker_name])
+    return df
+
+def process_yahoo_download(ticker, start, end, folder, interval="1d"):
+    path = download_ohlcv_to_csv(ticker, start, end, interval, folder)
     return ticker, path
 
 def process_ecb_download(etick, start, end, folder):
     path = download_ecb_data(etick, start, end, folder)
     return etick, path
 
-def run_automation():
-    logger.info("--- Starting Data Pipeline ---\n")
-
-    # 1 Dynamic Dates
-    days_back = config['pipeline']['settings']['history_days']
-    max_workers = config['pipeline']['settings']['max_workers']
+def process_ticker(meta, file_path, ecb_files, run_id, run_date, journal, intraday_path=None):
+    """
+    Validation -> Slice -> Benchmark -> Forecast for one ticker.
+    meta: the ticker's universe row (ticker, asset_class, exchange, interval, benchmark_key, ml, engine)
+    intraday_path: optional intraday download of the same ticker, cross-checked against the daily bars
+    Returns True if the ticker has a data issue (counts towards the circuit breaker).
+    Finished stages are checkpointed in the journal so a resumed run can skip them.
+    The stages are the same functions pipeline_cli runs one at a time.
+    All frames are local, so they are released as soon as this returns.
+    """
+    data_folder = config['pipeline']['settings']['data_folder']
+    quarantine_root = config['pipeline']['settings'].get('quarantine_store', f"{data_folder}/quarantine")
+    ticker = meta['ticker']
+    t0 = time.perf_counter()
+
+    # A Load master data worth 730 days
+    df_full = load_data(file_path)
+    if df_full is None: return False
+
+    # A1-B1, D1, D3 Revisions, quality checks, units, clean store, snapshot, calendar, profiles
+    clean_df_full, clean_path, revised, batches, ticker_has_issue = validate_ticker(meta, df_full, run_id, run_date, journal)
+
+    # C Weekly slice (in memory) for the benchmark check, plus the older bars the vendor revised
+    clean_df_full = sanitize_index(clean_df_full, ticker, meta.get('asset_class'))
+    cutoff_date = datetime.now() - timedelta(days=7)
+    df_weekly = clean_df_full[(clean_df_full.index >= cutoff_date) | clean_df_full.index.isin(revised)].copy()
+
+    # D, D2 Benchmark check of the weekly slice, intraday vs daily bars over the clean history
+    ecb_key = meta.get('benchmark_key')
+    recon_batches, recon_issue = reconcile_ticker(meta, df_weekly, clean_df_full, ecb_files.get(ecb_key) if ecb_key else None,
+                                                  intraday_path, run_id)
+    batches += recon_batches
+    ticker_has_issue |= recon_issue
+
+    # E ML Forecasting ON Full Clean History
+    # Only run on key assets
+    forecast_df = None
+    if meta.get('ml'):
+        forecast_df, ml_batches, is_anomaly = forecast_ticker(meta, clean_df_full, clean_path, run_id, journal)
+        batches += ml_batches
+        ticker_has_issue |= is_anomaly
+
+    # H Chart pyramid for the dashboard (fixed point budget regardless of history length)
+    if config['pipeline']['settings'].get('publish_pyramids', True) and not clean_df_full.empty:
+        publish_ticker_pyramids(data_folder, ticker, clean_df_full, forecast_df)
+
+    # Append this ticker's records to the store as soon as they exist
+    # (keyed by ticker so a resumed run replaces rather than duplicates them)
+    append_quarantine_batch(pa.concat_tables(batches), quarantine_root, run_date, part_key=ticker, run_id=run_id)
+    record_stage(journal, run_id, ticker, "done", has_issue=ticker_has_issue)
+
+    # Telemetry for the cost-aware scheduler
+    record_task(journal, run_id, ticker, meta.get('interval', '1d'), meta.get('ml'), len(df_full), time.perf_counter() - t0)
+
+    return ticker_has_issue
+
+def validate_ticker(meta, df_full, run_id, run_date, journal, keep=None):
+    """
+    Vendor revisions, quality checks and unit normalization of one download into the clean store,
+    then its snapshot, calendar gaps and data profiles. Records the ticker's 'validate' stage.
+    keep: stored clean bars outside a partial download, kept in the clean store around the new ones.
+    Returns (clean frame, clean store path or None, revised bars, quarantine batches, has_issue).
+    """
     data_folder = config['pipeline']['settings']['data_folder']
+    clean_root = config['pipeline']['settings'].get('clean_store', f"{data_folder}/clean")
+    profile_root = config['pipeline']['settings'].get('profile_store', f"{data_folder}/profiles")
+    ticker = meta['ticker']
+    ticker_has_issue = False
+    revision_batch = None
+
+    # A1 Vendor revisions: per-bar hashes of this download vs the ones stored by the last run.
+    # Restated, inserted and deleted bars are quarantined for review and checked again downstream
+    revised = pd.DatetimeIndex([])
+    revision_cfg = config['pipeline'].get('revisions', {}) or {}
+    if revision_cfg.get('enabled', True) and isinstance(df_full.index, pd.DatetimeIndex):
+        try:
+            revision_root = config['pipeline']['settings'].get('revision_store', f"{data_folder}/revisions")
+            events = track_revisions(revision_root, ticker, df_full, run_id, run_date, revision_cfg.get('columns', HASH_COLUMNS))
+            if not events.empty:
+                revised = revised_index(events)
+                revision_batch = build_quarantine_batch(revision_report(events), run_id, ticker, observed=df_full)
+        except Exception as e:
+            logger.error(f"Revision check failed for {ticker}: {e}")
+
+    # B Validate Master Data
+    # Clean the FULL history to ensure model doesn't train on garbage
+    clean_df_full, quarantine_df_full = run_quality_checks(df_full, ticker)
+
+    # B0 Unit normalization before anything is stored or trained on, so the clean store, the
+    # snapshots, the forecasts and every downstream check see the corrected prices
+    if not clean_df_full.empty:
+        clean_df_full = normalize_units(clean_df_full, ticker, meta.get('asset_class'))
+        if clean_df_full.empty:
+            ticker_has_issue = True
 
-    # Load ML Targets from Config
-    ml_target_list = config['pipeline'].get('ml_tickers', [])
+    # If data is too messy (empty after cleaning), skip it
+    clean_path = None
+    if clean_df_full.empty:
+        logger.warning(f"CRITICAL DATA LOSS: {ticker} is empty after validation")
+        ticker_has_issue = True
+    else:
+        if keep is not None and not keep.empty:
+            clean_df_full = pd.concat([keep, clean_df_full]).sort_index()
+        # The clean history is written once, as Parquet; analyst slices are DuckDB views over it
+        clean_path = write_clean(clean_root, ticker, clean_df_full)
+    record_stage(journal, run_id, ticker, "validate", artifact=clean_path, has_issue=ticker_has_issue)
+
+    # B1 Versioned snapshot of what this run downloaded and trained on (only changed chunks are written)
+    snapshot_cfg = config['pipeline'].get('snapshots', {}) or {}
+    if snapshot_cfg.get('enabled', True):
+        try:
+            snapshot_root = config['pipeline']['settings'].get('snapshot_store', f"{data_folder}/snapshots")
+            written, referenced = snapshot_ticker(snapshot_root, run_id, ticker, {'raw': df_full, 'clean': clean_df_full},
+                                                  chunk_grain(meta.get('interval', '1d')))
+            logger.info(f"Snapshot of {ticker}: {written} new chunk(s), {referenced - written} shared")
+        except Exception as e:
+            logger.error(f"Snapshot failed for {ticker}: {e}")
+
+    # Typed batches for this ticker (Full History Logic Failures + Vendor Revisions)
+    batches = [build_quarantine_batch(quarantine_df_full, run_id, ticker, observed=df_full)]
+    if revision_batch is not None:
+        batches.append(revision_batch)
+
+    # D1 Calendar check: bars missing from (or outside) the exchange calendar, reported for review
+    if isinstance(df_full.index, pd.DatetimeIndex):
+        try:
+            gaps = gap_report(df_full, meta.get('exchange'), meta.get('interval', '1d'))
+            if not gaps.empty:
+                n_missing = int(gaps['qa_reason'].str.startswith("Missing Bar").sum())
+                logger.warning(f"Calendar gaps for {ticker}: {n_missing} missing, {len(gaps) - n_missing} off-calendar bars")
+                batches.append(build_quarantine_batch(gaps, run_id, ticker, observed=df_full))
+        except ValueError as e:
+            logger.info(f"Skipping calendar check for {ticker}: {e}")
+
+    # D3 Profiles of the raw vendor data (only new partitions and those holding revised bars are computed)
+    # and drift of the latest partition against the ones before it, reported for review
+    if isinstance(df_full.index, pd.DatetimeIndex) and not df_full.empty:
+        try:
+            profile_params = config['pipeline'].get('profiles', {}) or {}
+            grain = partition_grain(meta.get('interval', '1d'))
+            profiles, recomputed = update_profiles(profile_root, ticker, df_full, grain, stale=set(partition_keys(revised, grain)))
+            drift = detect_drift(profiles, profile_params.get('reference_partitions', 12), profile_params.get('thresholds'))
+            drifted = drift_report(drift)
+            if not drifted.empty:
+                logger.warning(f"Distribution drift for {ticker}: {'; '.join(drifted['qa_reason'])}")
+                batches.append(build_quarantine_batch(drifted, run_id, ticker, observed=df_full))
+            logger.info(f"Profiled {len(recomputed)} partition(s) for {ticker}")
+        except Exception as e:
+            logger.error(f"Profiling failed for {ticker}: {e}")
+
+    return clean_df_full, clean_path, revised, batches, ticker_has_issue
+
+def reconcile_ticker(meta, df_window, clean_df, ecb_file, intraday_path, run_id):
+    """
+    Benchmark check of df_window against the ticker's ECB series and intraday-vs-daily check
+    of clean_df, for whichever of the two downloads is given.
+    Returns (quarantine batches, has_issue).
+    """
+    ticker, ecb_key = meta['ticker'], meta.get('benchmark_key')
+    batches, has_issue = [], False
+
+    # D. Benchmark check for EURUSD
+    if ecb_file and not df_window.empty:
+        try:
+            logger.info(f"Triggering Benchmark Check: {ticker} vs {ecb_key}")
+            df_ecb = sanitize_index(load_ecb_series(ecb_file), ecb_key, asset_class="fx")
+            recon_failures = check_with_benchmark(df_window, df_ecb)
+            if not recon_failures.empty:
+                has_issue = True
+                logger.warning(f"Found {len(recon_failures)} mismatches for {ticker} vs {ecb_key}")
+                batches.append(build_quarantine_batch(recon_failures, run_id, ticker, observed=df_window))
+        except Exception as e:
+            logger.error(f"Benchmark check failed for {ticker}: {e}")
+
+    # D2 Cross-interval check: intraday bars aggregated per exchange session vs the daily bars
+    if intraday_path and not clean_df.empty:
+        try:
+            mismatches, compared = reconcile_intervals(load_intraday(intraday_path), clean_df, meta.get('exchange'))
+            if not mismatches.empty:
+                has_issue = True
+                logger.warning(f"Found {len(mismatches)}/{len(compared)} sessions where intraday and daily bars disagree for {ticker}")
+                batches.append(build_quarantine_batch(mismatches, run_id, ticker, observed=clean_df))
+        except Exception as e:
+            logger.error(f"Interval check failed for {ticker}: {e}")
+
+    return batches, has_issue
+
+def forecast_ticker(meta, clean_df, history, run_id, journal):
+    """
+    Forecast of one ML ticker's clean history (a checkpointed or batch-engine forecast of this run
+    is reused) and residual scores of its bars. Records the Prophet forecast as the 'forecast' stage.
+    history: what Prophet trains on, the clean store path or a frame (None: nothing usable)
+    Returns (forecast frame or None, quarantine batches, is_anomaly).
+    """
+    ticker = meta['ticker']
+    checkpoint = completed_stage(journal, run_id, ticker, "forecast")
+    forecast_path = None
+    if checkpoint:
+        logger.info(f"Reusing checkpointed forecast for {ticker} (run {run_id})")
+        forecast_path, is_anomaly = checkpoint['artifact'], checkpoint['has_issue']
+    elif meta.get('engine') in BATCH_ENGINES:
+        # Batch engines run per chunk in run_batch_forecasts, no checkpoint means too little clean history
+        logger.warning(f"No {meta['engine']} forecast for {ticker}, skipping ML check")
+        is_anomaly = False
+    elif history is None:
+        is_anomaly = False
+    else:
+        logger.info(f"Training Prophet Model on full clean history for {ticker}...")
+        # Run Prophet Model
+        # Returns the forecast CSV path and boolean is_anomaly flag (plots are rendered for flagged tickers only)
+        forecast_path, is_anomaly = generate_forecast(history, ticker)
+        if forecast_path:
+            record_stage(journal, run_id, ticker, "forecast", artifact=forecast_path, has_issue=is_anomaly)
+
+    if is_anomaly:
+        logger.error(f"[ML ALERT] ML Anomaly: latest price outside the forecast interval for {ticker}")
+
+    # Score every bar against its in-sample interval (after the first run: only new or revised bars)
+    # and quarantine every bar still outside its band with its real timestamp and close
+    forecast_df, batches = None, []
+    if forecast_path and os.path.exists(forecast_path) and not clean_df.empty:
+        forecast_df, flagged_batch = score_residuals(meta, clean_df, forecast_path, run_id)
+        if flagged_batch is not None:
+            batches.append(flagged_batch)
+    return forecast_df, batches, bool(is_anomaly)
+
+def score_residuals(meta, clean_df, forecast_path, run_id):
+    """
+    Score the clean Close against the ticker's published forecast band in the residual store.
+    Returns (forecast frame, quarantine batch of every bar still outside its band, or None).
+    """
+    data_folder = config['pipeline']['settings']['data_folder']
+    residual_root = config['pipeline']['settings'].get('residual_store', f"{data_folder}/residual_scores")
+    ticker = meta['ticker']
+    forecast_df = pd.read_csv(forecast_path)
+    if meta.get('engine') in BATCH_ENGINES:
+        width = (config['pipeline'].get('batch_forecast', {}) or {}).get('interval_width', 0.95)
+    else:
+        width = PROPHET_PARAMS['interval_width']
+    update_scores(residual_root, ticker, clean_df['Close'], forecast_df, run_id, interval_width=width)
+    flagged = open_flags(residual_root, ticker, interval_width=width, index=clean_df.index)
+    if flagged.empty:
+        return forecast_df, None
+    return forecast_df, build_quarantine_batch(flagged, run_id, ticker, observed=clean_df)
+
+def open_run(journal, resume_run_id=None):
+    """
+    Start a new run in the journal, or re-open an existing one.
+    A resumed run keeps its original id and time window so its artifacts line up.
+    Returns (run_id, params)
+    """
+    days_back = config['pipeline']['settings']['history_days']
 
-    # Circuit Breaker Config
-    FAILURE_THRESHOLD = config['pipeline']['settings'].get('failure_threshold', 0.50)
-    processed_count = 0
-    failure_count = 0
+    if resume_run_id:
+        params = resume_run(journal, resume_run_id)
+        logger.info(f"Resuming run {resume_run_id}")
+        return resume_run_id, params
 
     today = datetime.now()
-    start_date = (today - timedelta(days=days_back)).strftime('%Y-%m-%d')
-    end_date = today.strftime('%Y-%m-%d')
-
-    logger.info(f"Time window: {start_date} to {end_date} ({days_back} days history)")
-
-    # 2 Yahoo Finance Data Ingestion
+    run_id = today.strftime('%Y%m%dT%H%M%S')
+    params = {
+        'run_date': today.strftime('%Y-%m-%d'),
+        'start_date': (today - timedelta(days=days_back)).strftime('%Y-%m-%d'),
+        'end_date': today.strftime('%Y-%m-%d'),
+    }
+    start_run(journal, run_id, params)
+    logger.info(f"Run id: {run_id} (resume with --resume {run_id})")
+    return run_id, params
+
+def ingest_yahoo(yahoo_tickers, journal, run_id, params, intervals=None, costs=None):
+    """
+    Parallel Yahoo download, skipping files already checkpointed in this run. Returns {ticker: path}
+    intervals: optional {ticker: yfinance interval}, defaults to daily bars
+    costs: optional scheduler estimates, the pool is fed longest-first so no big download starts last
+    """
+    intervals = intervals or {}
+    max_workers = config['pipeline']['settings']['max_workers']
+    data_folder = config['pipeline']['settings']['data_folder']
     yahoo_files = {}
-    yahoo_tickers = config['pipeline']['yahoo_tickers']
 
-    logger.info(f"Starting parallel download for {len(yahoo_tickers)} Yahoo tickers...")
+    # Skip downloads that already landed (and are unchanged) in this run
+    for t in yahoo_tickers:
+        checkpoint = completed_stage(journal, run_id, t, "ingest")
+        if checkpoint: yahoo_files[t] = checkpoint['artifact']
+    pending = dispatch_order([t for t in yahoo_tickers if t not in yahoo_files], costs)
+
+    logger.info(f"Starting parallel download for {len(pending)} Yahoo tickers ({len(yahoo_files)} checkpointed)...")
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(process_yahoo_download, t, start_date, end_date, data_folder): t for t in yahoo_tickers}
+        futures = {executor.submit(process_yahoo_download, t, params['start_date'], params['end_date'], data_folder, intervals.get(t, "1d")): t for t in pending}
 
         for future in as_completed(futures):
             ticker, path = future.result()
-            if path: yahoo_files[ticker] = path
+            if path:
+                yahoo_files[ticker] = path
+                # Fresh data: anything checkpointed downstream for this ticker is stale
+                clear_stages(journal, run_id, ticker)
+                record_stage(journal, run_id, ticker, "ingest", artifact=path)
             else:
                 logger.error(f"Download failed for {ticker}")
-    
-    # 3 ECB Data Ingestion
+
+    # Keep config order regardless of download completion order
+    return {t: yahoo_files[t] for t in yahoo_tickers if t in yahoo_files}
+
+def dispatch_order(tickers, costs=None):
+    """The tickers longest-first by their cost estimate (unknown ones last), or as given without estimates"""
+    if costs is None:
+        return list(tickers)
+    return lpt_order(costs.reindex(tickers).fillna(0.0))
+
+def ingest_intraday(tickers, journal, run_id, params, costs=None):
+    """
+    Intraday downloads for the tickers listed under interval_checks, checkpointed under
+    '<ticker>@<interval>' so they never collide with the daily file. Returns {ticker: path}
+    costs: optional scheduler estimates, dispatched longest-first as in ingest_yahoo
+    """
+    checks = config['pipeline'].get('interval_checks') or {}
+    data_folder = config['pipeline']['settings']['data_folder']
+    max_workers = config['pipeline']['settings']['max_workers']
+    wanted = {t: checks[t] for t in tickers if t in checks}
+    intraday_files = {}
+
+    for t, interval in wanted.items():
+        checkpoint = completed_stage(journal, run_id, f"{t}@{interval}", "ingest")
+        if checkpoint: intraday_files[t] = checkpoint['artifact']
+    pending = dispatch_order([t for t in wanted if t not in intraday_files], costs)
+    if not pending:
+        return intraday_files
+
+    # Yahoo only serves intraday bars for the last 730 days
+    start = max(params['start_date'], (datetime.strptime(params['end_date'], '%Y-%m-%d') - timedelta(days=729)).strftime('%Y-%m-%d'))
+    logger.info(f"Starting intraday download for {len(pending)} interval checks...")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(process_yahoo_download, t, start, params['end_date'], data_folder, wanted[t]): t for t in pending}
+
+        for future in as_completed(futures):
+            ticker, path = future.result()
+            if path:
+                intraday_files[ticker] = path
+                record_stage(journal, run_id, f"{ticker}@{wanted[ticker]}", "ingest", artifact=path)
+            else:
+                logger.error(f"Intraday download failed for {ticker}")
+
+    return intraday_files
+
+def ingest_ecb(ecb_tickers, journal, run_id, params):
+    """
+    ECB benchmark download, skipping files already checkpointed in this run. Returns {key: path}
+    Keys are fetched in batched multi-series requests (settings.ecb_batch_size keys per request),
+    or one parallel request per key when the batch size is 1.
+    """
+    max_workers = config['pipeline']['settings']['max_workers']
+    data_folder = config['pipeline']['settings']['data_folder']
+    batch_size = config['pipeline']['settings'].get('ecb_batch_size', 50)
     ecb_files = {}
-    ecb_tickers = config['pipeline']['ecb_tickers']
 
-    if ecb_tickers:
-        logger.info(f"Starting parallel download for {len(ecb_tickers)} ECB benchmark...")
+    for etick in ecb_tickers:
+        checkpoint = completed_stage(journal, run_id, etick, "ingest")
+        if checkpoint: ecb_files[etick] = checkpoint['artifact']
+    pending = [t for t in ecb_tickers if t not in ecb_files]
+
+    if pending and batch_size > 1:
+        logger.info(f"Starting batched download for {len(pending)} ECB benchmark...")
+        for etick, path in download_ecb_batch(pending, params['start_date'], params['end_date'], data_folder, batch_size).items():
+            ecb_files[etick] = path
+            record_stage(journal, run_id, etick, "ingest", artifact=path)
+        for etick in pending:
+            if etick not in ecb_files:
+                logger.error(f"Download failed for {etick}")
+    elif pending:
+        logger.info(f"Starting parallel download for {len(pending)} ECB benchmark...")
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {executor.submit(process_ecb_download, t, start_date, end_date, data_folder): t for t in ecb_tickers}
+            futures = {executor.submit(process_ecb_download, t, params['start_date'], params['end_date'], data_folder): t for t in pending}
 
             for future in as_completed(futures):
                 etick, path = future.result()
-                if path: ecb_files[etick] = path
+                if path:
+                    ecb_files[etick] = path
+                    record_stage(journal, run_id, etick, "ingest", artifact=path)
                 else:
                     logger.error(f"Download failed for {etick}")
 
-    # 4 Processing Loop (Validation -> Slice -> Forecast)
-    logger.info("Ingestion Complete. Starting Processing Loop...")
-    all_quarantine = pd.DataFrame()
-    benchmark_map = config['pipeline']['benchmark_mapping']
+    return ecb_files
+
+def run_batch_forecasts(metas, yahoo_files, journal, run_id):
+    """
+    Forecast every ticker of a chunk that uses a batch engine (ets / ar / seasonal_naive)
+    in one vectorized call per engine, before the per-ticker loop.
+    Each result is recorded as the ticker's 'forecast' stage, which process_ticker then reuses.
+    Returns {ticker: is_anomaly}.
+    """
+    # Clean Close history per engine (same checks as process_ticker, so both see identical data)
+    by_engine = {}
+    for meta in metas:
+        ticker, engine = meta['ticker'], meta.get('engine')
+        if not meta.get('ml') or engine not in BATCH_ENGINES or ticker not in yahoo_files:
+            continue
+        if completed_stage(journal, run_id, ticker, "forecast") or completed_stage(journal, run_id, ticker, "done"):
+            continue
+        df = load_data(yahoo_files[ticker])
+        if df is None or 'Close' not in df.columns or not isinstance(df.index, pd.DatetimeIndex):
+            logger.warning(f"Cannot batch forecast {ticker}: no dated Close column in {yahoo_files[ticker]}")
+            continue
+        clean_df, _ = run_quality_checks(df, ticker)
+        clean_df = sanitize_index(clean_df, ticker, meta.get('asset_class'))
+        if clean_df.empty or 'Close' not in clean_df.columns:
+            # Wrong series or nothing left after the checks: process_ticker reports the issue
+            logger.warning(f"Cannot batch forecast {ticker}: no clean prices after validation and unit checks")
+            continue
+        by_engine.setdefault(engine, {})[ticker] = pd.to_numeric(clean_df['Close'], errors='coerce')
+
+    return publish_batch_forecasts(by_engine, journal, run_id, yahoo_files)
+
+def publish_batch_forecasts(by_engine, journal, run_id, history_files):
+    """
+    One vectorized forecast per engine ({engine: {ticker: clean Close}}), published as the same
+    per-ticker CSV as the Prophet path and recorded as each ticker's 'forecast' stage.
+    history_files: {ticker: path} overlaid on plots of flagged tickers.
+    Returns {ticker: is_anomaly}.
+    """
+    data_folder = config['pipeline']['settings']['data_folder']
+    batch_cfg = config['pipeline'].get('batch_forecast', {}) or {}
+    results = {}
+
+    for engine, series in by_engine.items():
+        t0 = time.perf_counter()
+        forecasts, summary = forecast_batch(
+            series, engine,
+            horizon=batch_cfg.get('horizon', 30),
+            interval_width=batch_cfg.get('interval_width', 0.95),
+            season_length=batch_cfg.get('season_length', 5),
+        )
+        elapsed = time.perf_counter() - t0
+        logger.info(f"Batch {engine} forecast: {len(summary)} tickers in {elapsed:.2f}s")
+        if summary.empty:
+            continue
+
+        # One MLflow run per engine and chunk, not one per ticker
+        run_key = f"Batch_{engine}_{run_id}"
+        sink.log_run(
+            run_key,
+            params={"model_type": engine, "run_id": run_id},
+            metrics={
+                "n_series": len(summary),
+                "seconds": elapsed,
+                "median_mape_percent": float(summary['mape_percent'].median()),
+                "anomalies": int(summary['is_anomaly'].sum()),
+            },
+            run_name=f"BatchForecast_{engine}",
+        )
+
+        # Same per-ticker artifact as the Prophet path
+        for ticker, frame in forecasts.groupby('ticker', sort=False):
+            forecast_path = f"{data_folder}/{ticker}_forecast.csv"
+            frame.drop(columns='ticker').to_csv(forecast_path, index=False)
+            is_anomaly = bool(summary.loc[ticker, 'is_anomaly'])
+            record_stage(journal, run_id, ticker, "forecast", artifact=forecast_path, has_issue=is_anomaly)
+            results[ticker] = is_anomaly
+
+            if PLOT_MODE == 'all' or (PLOT_MODE == 'flagged' and is_anomaly):
+                plot_path = render_forecast_plot(ticker, history_files.get(ticker), title=f"{engine} forecast for {ticker}")
+                sink.log_artifact(run_key, plot_path)
+        sink.end_run(run_key)
+
+    return results
+
+def report_path(run_date):
+    data_folder = config['pipeline']['settings']['data_folder']
+    return f"{data_folder}/QUARANTINE_REPORT_{run_date.replace('-', '_')}.csv"
+
+def run_peer_check(universe, run_id, run_date):
+    """
+    Cross-sectional check after every ticker's clean history is written: bars newer than the
+    saved state are pushed through the rolling peer correlation, and tickers that stop
+    co-moving with their peer group are quarantined for review.
+    Returns the number of flagged bars.
+    """
+    settings = config['pipeline']['settings']
+    data_folder = settings['data_folder']
+    clean_root = settings.get('clean_store', f"{data_folder}/clean")
+    params = dict(config['pipeline'].get('peer_check', {}) or {})
+    state_path = params.pop('state_file', f"{data_folder}/peer_correlation.npz")
 
-    for ticker, file_path in yahoo_files.items():
-        processed_count += 1
-        ticker_has_issue = False
-        
-        # A Load master data worth 730 days
-        df_full = load_data(file_path)
-        if df_full is None: continue
+    try:
+        flags = update_peer_check(state_path, clean_root, universe, config['pipeline'].get('peer_groups'), **params)
+    except MemoryCeilingExceeded as e:
+        logger.error(f"Skipping peer check: {e}")
+        return 0
+
+    batches = []
+    for ticker in flags['ticker'].unique():
+        observed = pd.read_parquet(clean_path(clean_root, ticker))
+        report = decoupling_report(flags, ticker, params.get('window', 30))
+        report['Close'] = pd.to_numeric(observed['Close'], errors='coerce').reindex(report.index).to_numpy()
+        logger.warning(f"Peer decoupling for {ticker}: {len(report)} bar(s), latest {report['qa_reason'].iloc[-1]}")
+        batches.append(build_quarantine_batch(report, run_id, ticker, observed=observed))
+    append_quarantine_batch(pa.concat_tables(batches) if batches else None, settings.get('quarantine_store', f"{data_folder}/quarantine"),
+                            run_date, part_key="peer_check", run_id=run_id)
+    return len(flags)
+
+def run_automation(resume_run_id=None):
+    logger.info("--- Starting Data Pipeline ---\n")
 
-        # B Validate Master Data
-        # Clean the FULL history to ensure model doesn't train on garbage
-        clean_df_full, quarantine_df_full = run_quality_checks(df_full, ticker)
+    # 1 Dynamic Dates
+    days_back = config['pipeline']['settings']['history_days']
+    data_folder = config['pipeline']['settings']['data_folder']
+    quarantine_root = config['pipeline']['settings'].get('quarantine_store', f"{data_folder}/quarantine")
+    journal = open_journal(config['pipeline']['settings'].get('journal_db', f"{data_folder}/run_journal.db"))
+    ensure_schema(journal)
 
-        # If data is too messy (empty after cleaning), skip it
-        if clean_df_full.empty:
-            logger.warning(f"CRITICAL DATA LOSS: {ticker} is empty after validation")
-            ticker_has_issue = True
-        else:
-            # Save as Parquet (Scale improvement: Faster and smaller than csv)
-            trusted_path = file_path.replace(".csv", ".parquet")
-            clean_df_full.to_parquet(trusted_path)
-
-        # Overwrite the original file with CLEAN full history
-        # Ensure file_path now points to trusted data for the ML model
-        clean_df_full.to_csv(file_path)
-
-        # C Create Weekly Slice for Analysts
-        # Slice clean data to just the last 7 days
-        clean_df_full = sanitize_index(clean_df_full, ticker)
-
-        # calculate the cutoff (7 days ago)
-        cutoff_date = datetime.now() - timedelta(days=7)
-
-        # Create the slice
-        df_weekly = clean_df_full[clean_df_full.index >= cutoff_date].copy()
-
-        # Save slice for analysts
-        weekly_filename = file_path.replace(".csv", "_Analyst_Weekly_view.csv")
-        df_weekly.to_csv(weekly_filename)
-        logger.info(f"Created Analyst View for {ticker}: {weekly_filename}")        
-
-        # D. Benchmark check for EURUSD
-        # Only run this for the weekly data
-        if ticker in benchmark_map and not df_weekly.empty:
-            ecb_key = benchmark_map[ticker]
-            if ecb_key in ecb_files:
-                try:
-                    logger.info(f"Triggering Benchmark Check: {ticker} vs {ecb_key}")
-                    df_ecb = pd.read_csv(ecb_files[ecb_key])
-                
-                    # Sanitize ECB Data
-                    df_ecb = sanitize_index(df_ecb, ecb_key)
-
-                    # Merge df_weekly and df_ecb
-                    recon_failures = check_with_benchmark(df_weekly, df_ecb)
-
-                    if not recon_failures.empty:
-                        ticker_has_issue = True
-                        logger.warning(f"Found {len(recon_failures)} mismatches for {ticker} (Weekly View)")
-                        # Add to report
-                        quarantine_df_full = pd.concat([quarantine_df_full, recon_failures[['Close', 'qa_reason']]])
-                except Exception as e:
-                    logger.error(f"Benchmark check failed for {ticker}: {e}")
-                    
-        # Accumulate ALL Failures (Full History Logic Failures + Weekly Recon Failures)
-        if not quarantine_df_full.empty:
-            quarantine_df_full['Ticker'] = ticker
-            all_quarantine = pd.concat([all_quarantine, quarantine_df_full])
-
-        # E ML Forecasting ON Full Clean History
-        # Only run on key assets
-        if ticker in ml_target_list:
-            logger.info(f"Training Prophet Model on full clean history for {ticker}...")
-            # Run Prophet Model
-            # Returns image path and boolean is_anomaly flag
-            img_path, is_anomaly = generate_forecast(file_path, ticker)
-
-            if is_anomaly:
-                ticker_has_issue = True
-                msg = "ML Anomaly: Price outside 95% Confidence Interval"
-                logger.error(f"[ML ALERT] {msg} for {ticker}")
-
-                # Add to Quarantine Report
-                anomaly_row = pd.DataFrame([{
-                    'Ticker': ticker,
-                    'Close': 'Check Forecast',
-                    'qa_reason': msg
-                }])
-                all_quarantine = pd.concat([all_quarantine, anomaly_row])
-
-        # F Circuit Breaker Logic
-        if ticker_has_issue:
-            failure_count += 1
-        
-        if processed_count >= 2:
-            fail_rate = failure_count / processed_count
-            if fail_rate >= FAILURE_THRESHOLD:
-                logger.critical(f"CIRCUIT BREAKER TRIPPED! Failure rate {fail_rate:.0%} exceeds {FAILURE_THRESHOLD:.0%}.")
-                logger.critical("Stopping pipeline to prevent data corruption.")
-                sys.exit(1) # Kill GitHub Action
-        
+    # Circuit Breaker Config
+    FAILURE_THRESHOLD = config['pipeline']['settings'].get('failure_threshold', 0.50)
+    processed_count = 0
+    failure_count = 0
+
+    run_id, params = open_run(journal, resume_run_id)
+    run_date = params['run_date']
+
+    logger.info(f"Time window: {params['start_date']} to {params['end_date']} ({days_back} days history)")
+
+    # 2 Universe (manifest file or inline config lists)
+    universe = load_universe(config['pipeline'])
+    chunk_size = config['pipeline']['settings'].get('chunk_size', 50)
+    memory_ceiling = config['pipeline']['settings'].get('max_memory_mb')
+    logger.info(f"Universe: {len(universe)} instruments, streamed in chunks of {chunk_size}")
+
+    # Expected duration from historical telemetry (rows, interval, ML, past durations). Tickers are
+    # streamed longest-first: the download pools get their big downloads first instead of finishing
+    # on one, and the processing order matches the one the prediction assumes
+    costs = estimate_costs(journal, universe, days_back)
+    universe = universe.set_index('ticker', drop=False).loc[lpt_order(costs)].reset_index(drop=True)
+    predicted_makespan = simulate_makespan(costs, 1)
+    logger.info(f"Scheduler: predicted processing time {predicted_makespan:.1f}s, heaviest task {costs.idxmax() if len(costs) else '-'}")
+    loop_start = time.perf_counter()
+
+    # 3 ECB Data Ingestion (small, shared by every chunk)
+    ecb_files = ingest_ecb(benchmark_keys(universe, config['pipeline']), journal, run_id, params)
+
+    # 4 Streaming Loop (Download chunk -> Validation -> Slice -> Forecast -> release)
+    # Only one chunk of downloads is held at a time, each ticker's frames are dropped once persisted
+    report_name = report_path(run_date)
+
+    for chunk in iter_chunks(universe, chunk_size):
+        yahoo_files = ingest_yahoo(chunk['ticker'].tolist(), journal, run_id, params,
+                                   intervals=dict(zip(chunk['ticker'], chunk['interval'])), costs=costs)
+        intraday_files = ingest_intraday(list(yahoo_files), journal, run_id, params, costs=costs)
+        run_batch_forecasts(chunk.to_dict('records'), yahoo_files, journal, run_id)
+
+        for meta in chunk.to_dict('records'):
+            ticker = meta['ticker']
+            if ticker not in yahoo_files: continue
+
+            # Replayed checkpoints don't count towards the breaker: a resumed run would otherwise rebuild
+            # the failure ratio that tripped it and stop again before reaching any unprocessed ticker
+            if completed_stage(journal, run_id, ticker, "done"):
+                logger.info(f"Skipping {ticker}: already completed in run {run_id}")
+                continue
+            processed_count += 1
+            ticker_has_issue = process_ticker(meta, yahoo_files[ticker], ecb_files, run_id, run_date, journal,
+                                              intraday_path=intraday_files.get(ticker))
+
+            # F Circuit Breaker Logic
+            if ticker_has_issue:
+                failure_count += 1
+
+            if processed_count >= 2:
+                fail_rate = failure_count / processed_count
+                if fail_rate >= FAILURE_THRESHOLD:
+                    logger.critical(f"CIRCUIT BREAKER TRIPPED! Failure rate {fail_rate:.0%} exceeds {FAILURE_THRESHOLD:.0%}.")
+                    logger.critical("Stopping pipeline to prevent data corruption.")
+                    export_run_report(quarantine_root, run_id, report_name)
+                    finish_run(journal, run_id, "tripped")
+                    logger.critical(f"Fix the root cause, then resume with: --resume {run_id}")
+                    sys.exit(1) # Kill GitHub Action
+
+            # G Memory guard (hard ceiling, the run stays resumable if it trips)
+            try:
+                enforce_memory_ceiling(memory_ceiling)
+            except MemoryCeilingExceeded as e:
+                logger.critical(f"{e}. Stopping after {ticker}.")
+                finish_run(journal, run_id, "failed")
+                logger.critical(f"Lower chunk_size or raise max_memory_mb, then resume with: --resume {run_id}")
+                sys.exit(1)
+
+        del yahoo_files, intraday_files
+
+    # 5 Cross-sectional peer check (needs every ticker, so it runs once after the loop)
+    run_peer_check(universe, run_id, run_date)
 
     # 6 Final Reports
-    if not all_quarantine.empty:
-        report_name = f"{data_folder}/QUARANTINE_REPORT_{datetime.now().strftime('%Y_%m_%d')}.csv"        
-        all_quarantine.to_csv(report_name) # Only save if errors exist
+    # The store already holds every record, the CSV is just this run's view of it
+    total_issues = export_run_report(quarantine_root, run_id, report_name) # Only save if errors exist
+    finish_run(journal, run_id, "completed")
+    publish_run(data_folder, run_id, report_name if total_issues else None)
 
-        # Only alert on New issues (Last 7 days)
-        # Assumes index is Datetime If not skip filtering for now or need to set index
-        # For safety in this script, just log the total count
+    # Predicted vs actual, then persist the updated cost estimates for the next run
+    report_accuracy(journal, run_id, costs, predicted_makespan, time.perf_counter() - loop_start)
+    update_estimates(journal, run_id)
 
-        logger.error(f"Pipeline finished with {len(all_quarantine)} TOTAL issues. Report: {report_name}")
+    if total_issues:
+        logger.error(f"Pipeline finished with {total_issues} TOTAL issues. Report: {report_name}")
     else:
         logger.info("Pipeline finished SUCCESSFULLY. No data issues found.")
 
 if __name__ == "__main__":
-    run_automation()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Financial data quality pipeline")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a crashed or tripped run, only executing unfinished work")
+    args = parser.parse_args()
+
+    run_automation(resume_run_id=args.resume)
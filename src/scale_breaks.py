@@ -0,0 +1,178 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("ScaleBreaks")
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close')
+
+# A unit switch (EUR vs mEUR, pence vs pounds, a vendor dropping a x1000 factor) moves the
+# price by an exact power of ten between two bars. Up to x1000 either way is corrected.
+MAX_POWER = 3
+TOLERANCE = 0.1        # log10 distance from an exact power of ten (x10 means a ratio of 7.9 to 12.6)
+MIN_IN_BAND = 0.5      # below this share of bars in the band even after a fix, the series is the wrong one
+
+SEGMENT_COLUMNS = ['ticker', 'start', 'end', 'bars', 'factor']
+_NO_SEGMENTS = pd.DataFrame(columns=SEGMENT_COLUMNS)
+
+# Expected price range per asset class, wide on purpose: they only decide which units are right
+DEFAULT_BANDS = {
+    'fx': (1e-4, 1e5),
+    'equity': (1e-2, 1e6),
+    'index': (1.0, 1e6),
+    'crypto': (1e-8, 1e7),
+}
+
+def expected_band(ticker, asset_class, bands=None, overrides=None):
+    """(low, high) price band: a per-ticker override, else the asset class band, else the widest default"""
+    if overrides and ticker in overrides:
+        return tuple(float(x) for x in overrides[ticker])
+    merged = {**DEFAULT_BANDS, **(bands or {})}
+    low, high = merged.get(asset_class, (1e-8, 1e7))
+    return float(low), float(high)
+
+def stack_log_prices(series):
+    """
+    {ticker: Close series} -> (tickers, (n, T) log10 prices of the valid bars, left-aligned and
+    NaN-padded, [positions of the valid bars in each input series])
+    """
+    tickers, values, positions = [], [], []
+    for t, s in series.items():
+        s = pd.Series(s) if not isinstance(s, pd.Series) else s
+        v = s.to_numpy(dtype=float) if pd.api.types.is_numeric_dtype(s) else pd.to_numeric(s, errors='coerce').to_numpy(dtype=float)
+        ok = np.flatnonzero(np.isfinite(v) & (v > 0))
+        tickers.append(t)
+        values.append(np.log10(v[ok]))
+        positions.append(ok)
+    T = max((len(v) for v in values), default=0)
+    L = np.full((len(tickers), T), np.nan)
+    for i, v in enumerate(values):
+        L[i, :len(v)] = v
+    return tickers, L, positions
+
+def detect_scale_breaks(series, bands, tolerance=TOLERANCE, max_power=MAX_POWER):
+    """
+    One stacked pass over {ticker: Close series} (sorted by time, split-adjusted).
+    Every bar-to-bar log10 change within `tolerance` of +-1..max_power is a unit break; the running
+    sum of the breaks gives each bar's unit level. Per ticker, the one x10^k correction of all levels
+    is chosen that puts the most bars inside its (low, high) band, then the one changing the fewest
+    bars, so only the segments in the wrong units are rescaled and a whole series in the wrong
+    units is fixed too. Corrections beyond x10^max_power are not considered.
+
+    bands: {ticker: (low, high)}
+    Returns (shifts, segments, unfixable):
+        shifts     {ticker: int array, power of ten to multiply each row by} for tickers that need one
+        segments   DataFrame (ticker, start, end, bars, factor) of the rescaled runs of bars
+        unfixable  tickers with fewer than MIN_IN_BAND of their bars in the band under any correction
+    """
+    tickers, L, positions = stack_log_prices(series)
+    if not tickers or L.shape[1] == 0:
+        return {}, _NO_SEGMENTS.copy(), []
+
+    valid = ~np.isnan(L)
+    # Breaks are rare: only bar-to-bar moves of nearly x10 or more are looked at closely
+    with np.errstate(invalid='ignore'):
+        D = np.diff(L, axis=1)
+        r_, c_ = np.nonzero(np.abs(D) >= 1 - tolerance)
+    d = D[r_, c_]
+    k = np.rint(d)
+    hit = (np.abs(k) <= max_power) & (np.abs(d - k) <= tolerance)
+    level = np.zeros(L.shape, dtype=np.int64)
+    np.add.at(level, (r_[hit], c_[hit] + 1), k[hit].astype(np.int64))
+    broken = np.unique(r_[hit])
+    level[broken] = np.cumsum(level[broken], axis=1)
+
+    lo = np.log10([bands[t][0] for t in tickers])[:, None]
+    hi = np.log10([bands[t][1] for t in tickers])[:, None]
+    base = L.copy()    # every bar in the units of the first segment
+    base[broken] -= level[broken]
+    lvl_min = np.where(valid, level, np.iinfo(np.int64).max).min(axis=1)
+    lvl_max = np.where(valid, level, np.iinfo(np.int64).min).max(axis=1)
+
+    # Score every candidate unit level r: bars in band first, bars left untouched second.
+    # A bar is in band for the integer r in [ceil(lo - base), floor(hi - base)], so the counts of all
+    # candidates come from one difference array (+1 at the first r, -1 after the last) per ticker.
+    candidates = np.arange(-2 * max_power, 2 * max_power + 1)
+    C = len(candidates)
+    n, T = L.shape
+    owner = np.broadcast_to(np.arange(n)[:, None], L.shape)[valid]
+    with np.errstate(invalid='ignore'):
+        first = np.clip(np.ceil(lo - base)[valid] - candidates[0], 0, C).astype(np.int64)
+        last = np.clip(np.floor(hi - base)[valid] - candidates[0] + 1, 0, C).astype(np.int64)
+    ok = last > first
+    steps = (np.bincount(owner[ok] * (C + 1) + first[ok], minlength=n * (C + 1))
+             - np.bincount(owner[ok] * (C + 1) + last[ok], minlength=n * (C + 1)))
+    in_band = np.cumsum(steps.reshape(n, C + 1), axis=1)[:, :C]
+    untouched = np.bincount(owner * C + np.clip(level[valid] - candidates[0], 0, C - 1), minlength=n * C).reshape(n, C)
+    n_valid = valid.sum(axis=1)
+    allowed = (lvl_max[:, None] - candidates <= max_power) & (candidates - lvl_min[:, None] <= max_power)
+    scores = np.where(allowed, in_band * (T + 1) + untouched, -1)
+    best = scores.argmax(axis=1)
+    target = candidates[best]
+    enough = in_band[np.arange(len(tickers)), best] >= MIN_IN_BAND * np.maximum(n_valid, 1)
+
+    shifts, rows, unfixable = {}, [], []
+    for i, t in enumerate(tickers):
+        if n_valid[i] == 0:
+            continue
+        if not enough[i]:
+            unfixable.append(t)
+            continue
+        shift = target[i] - level[i, :n_valid[i]]
+        if not shift.any():
+            continue
+        # Spread the shift of each valid bar onto the rows around it (NaN rows take the previous bar's)
+        full = np.zeros(len(series[t]), dtype=np.int64)
+        marks = np.zeros(len(series[t]), dtype=bool)
+        full[positions[i]], marks[positions[i]] = shift, True
+        idx = np.maximum.accumulate(np.where(marks, np.arange(len(full)), 0))
+        full = np.where(idx >= positions[i][0], full[idx], shift[0])
+        shifts[t] = full
+
+        index = pd.Series(series[t]).index[positions[i]]
+        edges = np.flatnonzero(np.diff(shift)) + 1
+        for a, b in zip(np.r_[0, edges], np.r_[edges, len(shift)]):
+            if shift[a]:
+                rows.append({'ticker': t, 'start': index[a], 'end': index[b - 1], 'bars': int(b - a), 'factor': 10.0 ** shift[a]})
+    # Building an empty frame costs more than the whole check of a clean ticker, hence the copy
+    return shifts, (pd.DataFrame(rows, columns=SEGMENT_COLUMNS) if rows else _NO_SEGMENTS.copy()), unfixable
+
+def apply_scale(df, shift, columns=PRICE_COLUMNS):
+    """Multiply the price columns by 10**shift row by row (shift from detect_scale_breaks)"""
+    factor = 10.0 ** np.asarray(shift, dtype=float)
+    return df.assign(**{c: pd.to_numeric(df[c], errors='coerce') * factor for c in columns if c in df.columns})
+
+if __name__ == "__main__":
+    # Audit the whole clean store in one stacked pass:
+    # python src/scale_breaks.py [--tickers EURUSD=X GBPUSD=X]
+    import os
+    import yaml
+    import argparse
+    from universe import load_universe
+    from analyst_views import clean_path
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Find x10^k unit breaks in the clean store")
+    parser.add_argument("--tickers", nargs="+", help="Default: the whole universe")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    clean_root = settings.get('clean_store', f"{settings['data_folder']}/clean")
+    scale_cfg = pipeline.get('scale_checks', {}) or {}
+    universe = load_universe(pipeline).set_index('ticker')
+    tickers = args.tickers or universe.index.tolist()
+
+    series, bands = {}, {}
+    for t in tickers:
+        if os.path.exists(clean_path(clean_root, t)):
+            series[t] = pd.read_parquet(clean_path(clean_root, t), columns=['Close'])['Close'].sort_index()
+            asset_class = universe.loc[t, 'asset_class'] if t in universe.index else None
+            bands[t] = expected_band(t, asset_class, scale_cfg.get('bands'), scale_cfg.get('tickers'))
+    shifts, segments, unfixable = detect_scale_breaks(series, bands, scale_cfg.get('tolerance', TOLERANCE))
+    logger.info(f"Scanned {len(series)} clean histories: {len(shifts)} with unit breaks, {len(unfixable)} outside their price band")
+    if not segments.empty:
+        print(segments.to_string(index=False))
+    for t in unfixable:
+        print(f"{t}: prices outside {bands[t]} under any x10^k correction, check the series itself")
@@ -0,0 +1,128 @@
+import heapq
+import logging
+from datetime import datetime
+import pandas as pd
+
+logger = logging.getLogger("Scheduler")
+
+# Per-task telemetry and the rolling cost estimates live in the run journal database
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_telemetry (
+    run_id      TEXT NOT NULL,
+    ticker      TEXT NOT NULL,
+    interval    TEXT NOT NULL,
+    ml          INTEGER NOT NULL,
+    rows        INTEGER NOT NULL,
+    seconds     REAL NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, ticker)
+);
+
+CREATE TABLE IF NOT EXISTS task_estimates (
+    ticker      TEXT PRIMARY KEY,
+    interval    TEXT NOT NULL,
+    ml          INTEGER NOT NULL,
+    rows        INTEGER NOT NULL,
+    seconds     REAL NOT NULL,
+    samples     INTEGER NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+"""
+
+# Weight of the newest run in the per-ticker moving average
+EWMA_ALPHA = 0.3
+
+# Cold-start guesses, replaced by observed history as soon as one run has finished
+BARS_PER_DAY = {'1d': 0.7, '1h': 10, '90m': 7, '60m': 10, '30m': 20, '15m': 40, '5m': 120, '2m': 300, '1m': 600}
+DEFAULT_SECONDS_PER_ROW = {False: 0.00005, True: 0.004}
+DEFAULT_OVERHEAD_SECONDS = {False: 0.05, True: 3.0}
+
+def ensure_schema(con):
+    con.executescript(SCHEMA)
+
+def record_task(con, run_id, ticker, interval, ml, rows, seconds):
+    """Store the measured duration of one ticker's processing"""
+    con.execute(
+        "INSERT OR REPLACE INTO task_telemetry VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (run_id, ticker, interval, int(bool(ml)), int(rows), float(seconds), datetime.now().isoformat(timespec="seconds")),
+    )
+
+def update_estimates(con, run_id):
+    """Fold this run's telemetry into the per-ticker EWMA estimates. Returns the number updated."""
+    rows = con.execute(
+        "SELECT ticker, interval, ml, rows, seconds FROM task_telemetry WHERE run_id = ?", (run_id,)
+    ).fetchall()
+    now = datetime.now().isoformat(timespec="seconds")
+
+    for ticker, interval, ml, n_rows, seconds in rows:
+        prev = con.execute(
+            "SELECT interval, ml, seconds, samples FROM task_estimates WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        # A changed workload (new interval / ML switched on) starts a fresh estimate
+        if prev and (prev[0], prev[1]) == (interval, ml):
+            estimate = EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * prev[2]
+            samples = prev[3] + 1
+        else:
+            estimate, samples = seconds, 1
+        con.execute(
+            "INSERT OR REPLACE INTO task_estimates VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ticker, interval, ml, n_rows, estimate, samples, now),
+        )
+    return len(rows)
+
+def estimate_costs(con, universe, history_days):
+    """
+    Expected seconds per ticker:
+    1. The ticker's own moving average when its interval/ML setting is unchanged
+    2. Otherwise rows x seconds-per-row learned from tickers with the same (interval, ml) class
+    3. Otherwise built-in defaults (cold start)
+    """
+    history = pd.read_sql_query("SELECT * FROM task_estimates", con)
+    own = history.set_index('ticker') if not history.empty else None
+
+    # seconds/row per (interval, ml) class, median is robust to the odd slow download
+    per_row = {}
+    if not history.empty:
+        history = history[history['rows'] > 0]
+        for (interval, ml), group in history.groupby(['interval', 'ml']):
+            per_row[(interval, bool(ml))] = (group['seconds'] / group['rows']).median()
+
+    costs = {}
+    for ticker, interval, ml in zip(universe['ticker'], universe['interval'], universe['ml']):
+        ml = bool(ml)
+        if own is not None and ticker in own.index and own.loc[ticker, 'interval'] == interval and bool(own.loc[ticker, 'ml']) == ml:
+            costs[ticker] = float(own.loc[ticker, 'seconds'])
+            continue
+
+        rows = history_days * BARS_PER_DAY.get(interval, 1)
+        if (interval, ml) in per_row:
+            costs[ticker] = rows * per_row[(interval, ml)]
+        else:
+            costs[ticker] = DEFAULT_OVERHEAD_SECONDS[ml] + rows * DEFAULT_SECONDS_PER_ROW[ml]
+
+    return pd.Series(costs, dtype=float)
+
+def lpt_order(costs):
+    """Longest-processing-time-first: the classic greedy that keeps makespan within 4/3 of optimal"""
+    return costs.sort_values(ascending=False, kind='stable').index.tolist()
+
+def simulate_makespan(costs, n_workers):
+    """Predicted wall time when tasks are dispatched longest-first to n_workers idle workers"""
+    loads = [0.0] * max(1, n_workers)
+    heapq.heapify(loads)
+    for cost in costs.sort_values(ascending=False).to_numpy():
+        heapq.heappush(loads, heapq.heappop(loads) + cost)
+    return max(loads)
+
+def report_accuracy(con, run_id, costs, predicted_makespan, actual_makespan):
+    """Log predicted vs actual completion time and the per-task estimate error"""
+    actual = pd.read_sql_query(
+        "SELECT ticker, seconds FROM task_telemetry WHERE run_id = ?", con, params=(run_id,)
+    ).set_index('ticker')['seconds']
+    both = pd.concat([costs.rename('predicted'), actual.rename('actual')], axis=1, join='inner')
+
+    logger.info(f"Predicted completion: {predicted_makespan:.1f}s | Actual: {actual_makespan:.1f}s")
+    if not both.empty:
+        mape = (both['predicted'] - both['actual']).abs().div(both['actual'].clip(lower=1e-3)).mean() * 100
+        logger.info(f"Task cost estimates: {len(both)} tasks, mean abs error {mape:.0f}%")
+    return both
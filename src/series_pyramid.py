@@ -0,0 +1,167 @@
+import os
+import json
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("SeriesPyramid")
+
+# How each column is aggregated into a coarser bucket.
+# first/last/min/max per bucket is M4 downsampling: the rendered line keeps every
+# extreme and every bucket edge, so spikes never disappear when zoomed out.
+OHLC_AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+FORECAST_AGG = {'yhat': 'mean', 'yhat_lower': 'min', 'yhat_upper': 'max', 'y_min': 'min', 'y_max': 'max', 'y': 'last'}
+
+DEFAULT_FACTOR = 4        # each level has ~4x fewer rows than the one below
+DEFAULT_MIN_ROWS = 250    # stop once a level is this small
+
+def reduce_segments(values, starts, ends, how):
+    """Aggregate contiguous segments [starts[i], ends[i]) with ufunc.reduceat (no per-segment Python loop)"""
+    if how == 'first':
+        return values[starts]
+    if how == 'last':
+        return values[ends - 1]
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+
+    filled = np.where(np.isnan(values), 0.0, values)
+    sums = np.add.reduceat(filled, starts)
+    if how == 'sum':
+        return sums
+    counts = np.add.reduceat((~np.isnan(values)).astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+def _epoch_ns(index):
+    """int64 nanoseconds whatever the index resolution (pandas may hand out us/s units)"""
+    return pd.DatetimeIndex(index).as_unit('ns').asi8
+
+def downsample(df, bucket_ns, agg):
+    """
+    Collapse a DatetimeIndex-ed frame into fixed-width time buckets.
+    Each output row is stamped with the bucket start, so levels stay time-aligned.
+    """
+    ts = _epoch_ns(df.index)
+    if len(ts) == 0:
+        return df.iloc[0:0]
+
+    bucket = (ts - ts[0]) // bucket_ns
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+
+    out = {}
+    for col, how in agg.items():
+        if col in df.columns:
+            out[col] = reduce_segments(df[col].to_numpy(dtype=float), starts, ends, how)
+
+    index = pd.DatetimeIndex(ts[0] + bucket[starts] * bucket_ns, name=df.index.name)
+    return pd.DataFrame(out, index=index)
+
+def build_levels(df, agg, factor=DEFAULT_FACTOR, min_rows=DEFAULT_MIN_ROWS):
+    """[(bucket_seconds, frame)] from full resolution (bucket 0) to the coarsest level"""
+    df = df.sort_index()
+    levels = [(0, df)]
+    if len(df) < 2:
+        return levels
+
+    # Start from the typical bar spacing so level 1 is exactly `factor` bars per bucket
+    base_ns = int(np.median(np.diff(_epoch_ns(df.index))))
+    bucket_ns = max(base_ns, 1) * factor
+    current = df
+    while len(current) > min_rows:
+        current = downsample(df, bucket_ns, agg)
+        if len(current) >= len(levels[-1][1]):
+            break
+        levels.append((bucket_ns / 1e9, current))
+        bucket_ns *= factor
+    return levels
+
+def publish_pyramid(df, out_dir, agg, factor=DEFAULT_FACTOR, min_rows=DEFAULT_MIN_ROWS):
+    """
+    Write level_<k>.parquet files plus a manifest.json describing each level.
+    Written to a temp folder and swapped in, so the dashboard never sees half a pyramid.
+    """
+    levels = build_levels(df, agg, factor, min_rows)
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {'levels': []}
+    for k, (bucket_seconds, frame) in enumerate(levels):
+        frame.to_parquet(os.path.join(tmp_dir, f"level_{k}.parquet"))
+        manifest['levels'].append({
+            'level': k,
+            'bucket_seconds': bucket_seconds,
+            'rows': len(frame),
+            'start': frame.index[0].isoformat() if len(frame) else None,
+            'end': frame.index[-1].isoformat() if len(frame) else None,
+        })
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    old_dir = out_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+def publish_ticker_pyramids(data_folder, ticker, clean_df=None, forecast_df=None):
+    """
+    Per ticker: data/pyramid/<ticker>/ohlc and .../forecast
+    forecast_df: Prophet output (ds, yhat, yhat_lower, yhat_upper), joined with the actual close
+    """
+    root = os.path.join(data_folder, "pyramid", ticker)
+    os.makedirs(root, exist_ok=True)
+
+    if clean_df is not None and not clean_df.empty:
+        publish_pyramid(clean_df, os.path.join(root, "ohlc"), OHLC_AGG)
+
+    if forecast_df is not None and not forecast_df.empty:
+        fc = forecast_df.set_index(pd.to_datetime(forecast_df['ds']))[['yhat', 'yhat_lower', 'yhat_upper']]
+        fc.index.name = 'ds'
+        if clean_df is not None and 'Close' in clean_df.columns:
+            actual = clean_df['Close'].reindex(fc.index)
+            fc = fc.assign(y=actual, y_min=actual, y_max=actual)
+        publish_pyramid(fc, os.path.join(root, "forecast"), FORECAST_AGG)
+
+def choose_level(manifest, start, end, point_budget):
+    """
+    Finest level whose expected row count inside [start, end] fits the point budget.
+    Falls back to the coarsest level when even that is too dense.
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    window_s = max((end - start).total_seconds(), 0)
+
+    for lvl in manifest['levels']:
+        if lvl['bucket_seconds'] > 0:
+            expected = window_s / lvl['bucket_seconds']
+        else:
+            span = (pd.Timestamp(lvl['end']) - pd.Timestamp(lvl['start'])).total_seconds() or 1
+            expected = lvl['rows'] * min(1.0, window_s / span)
+        if expected <= point_budget:
+            return lvl['level']
+    return manifest['levels'][-1]['level']
+
+def load_window(pyramid_dir, start, end, point_budget, reader=pd.read_parquet, manifest=None):
+    """
+    Rows of the best level for [start, end], at most point_budget as long as the budget is
+    above the coarsest level's size (min_rows). Steps to a coarser level if the estimate
+    was optimistic. Returns (level, frame).
+    """
+    if manifest is None:
+        with open(os.path.join(pyramid_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+
+    level = choose_level(manifest, start, end, point_budget)
+    last_level = manifest['levels'][-1]['level']
+    while True:
+        frame = reader(os.path.join(pyramid_dir, f"level_{level}.parquet"))
+        window = frame.loc[pd.Timestamp(start):pd.Timestamp(end)]
+        if len(window) <= point_budget or level == last_level:
+            return level, window
+        level += 1
@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from data_profiles import partition_keys
+
+logger = logging.getLogger("SnapshotStore")
+
+# Layout under the store root:
+#   chunks/<h[:2]>/<hash>.parquet          one time-aligned slice of one series, immutable
+#   manifests/<run_id>/<ticker>.json       {kind: [[chunk key, hash, rows], ...]} per ticker and run
+# A run references chunks by content hash, so unchanged years are shared by every snapshot
+# and a daily run only writes the chunks whose content changed.
+KINDS = ('raw', 'clean')
+
+def chunk_grain(interval):
+    """Yearly chunks for daily bars (~252 rows), monthly chunks for intraday bars"""
+    return 'Y' if interval in (None, '1d') else 'M'
+
+def content_hash(chunk):
+    """sha256 of the rows (values + index) and the schema, stable across runs and processes"""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(chunk.index.name)] + [f"{c}:{t}" for c, t in chunk.dtypes.astype(str).items()]).encode())
+    h.update(pd.util.hash_pandas_object(chunk, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _chunk_path(root, digest):
+    return os.path.join(root, "chunks", digest[:2], f"{digest}.parquet")
+
+def _manifest_path(root, run_id, ticker):
+    return os.path.join(root, "manifests", str(run_id), f"{str(ticker).replace(os.sep, '_')}.json")
+
+def _write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def snapshot_ticker(root, run_id, ticker, frames, grain='Y', created_at=None):
+    """
+    Record this run's version of a ticker's series ({kind: frame}, kinds from KINDS).
+    Each frame is split into time-aligned chunks; only chunks not already in the store are written.
+    created_at (epoch seconds, default now) is what as-of reads resolve against.
+    Returns (chunks written, chunks referenced).
+    """
+    manifest = {'run_id': run_id, 'ticker': ticker, 'created_at': created_at or time.time(), 'grain': grain, 'series': {}}
+    written = referenced = 0
+    for kind, df in frames.items():
+        if df is None or df.empty:
+            continue
+        df = df.sort_index()
+        keys = partition_keys(df.index, grain)
+        entries = []
+        for key in pd.unique(keys):
+            chunk = df[keys == key]
+            digest = content_hash(chunk)
+            path = _chunk_path(root, digest)
+            if not os.path.exists(path):
+                _write_atomic(path, lambda tmp: chunk.to_parquet(tmp))
+                written += 1
+            entries.append([str(key), digest, len(chunk)])
+        manifest['series'][kind] = entries
+        referenced += len(entries)
+
+    def write_manifest(tmp):
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+    _write_atomic(_manifest_path(root, run_id, ticker), write_manifest)
+    return written, referenced
+
+def list_snapshots(root, ticker=None):
+    """One row per (run, ticker) snapshot: run_id, ticker, created_at, chunks, rows"""
+    rows = []
+    base = os.path.join(root, "manifests")
+    for run_id in sorted(os.listdir(base)) if os.path.isdir(base) else []:
+        for name in sorted(os.listdir(os.path.join(base, run_id))):
+            if not name.endswith(".json") or (ticker and name != f"{ticker}.json"):
+                continue
+            with open(os.path.join(base, run_id, name)) as f:
+                m = json.load(f)
+            for kind, entries in m['series'].items():
+                rows.append({'run_id': run_id, 'ticker': m['ticker'], 'kind': kind,
+                             'created_at': pd.Timestamp(m['created_at'], unit='s'),
+                             'chunks': len(entries), 'rows': sum(e[2] for e in entries)})
+    return pd.DataFrame(rows, columns=['run_id', 'ticker', 'kind', 'created_at', 'chunks', 'rows'])
+
+def resolve_run(root, ticker, as_of):
+    """The latest run that snapshotted the ticker at or before as_of (a date or timestamp)"""
+    snaps = list_snapshots(root, ticker)
+    cutoff = pd.Timestamp(as_of)
+    if len(str(as_of)) <= 10:
+        cutoff += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')   # a bare date means end of that day
+    snaps = snaps[snaps['created_at'] <= cutoff]
+    if snaps.empty:
+        raise LookupError(f"No snapshot of {ticker} at or before {as_of}")
+    return snaps.sort_values('created_at')['run_id'].iloc[-1]
+
+def load_snapshot(root, ticker, run_id=None, as_of=None, kind='clean', start=None, end=None):
+    """
+    load_data-style read of a ticker as it was in one run (run_id, or the latest run as of a date).
+    Only the chunks overlapping [start, end] are read, and they are concatenated as Arrow tables
+    without an intermediate copy.
+    """
+    if run_id is None:
+        run_id = resolve_run(root, ticker, as_of or pd.Timestamp.now())
+    path = _manifest_path(root, run_id, ticker)
+    if not os.path.exists(path):
+        raise LookupError(f"Run {run_id} has no snapshot of {ticker}")
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = manifest['series'].get(kind)
+    if entries is None:
+        raise LookupError(f"Run {run_id} has no {kind} snapshot of {ticker}")
+
+    # Chunk keys are period prefixes ('2025', '2025-03'), comparable with the bounds' prefixes
+    width = len(entries[0][0]) if entries else 0
+    lo = str(pd.Timestamp(start).date())[:width] if start is not None else None
+    hi = str(pd.Timestamp(end).date())[:width] if end is not None else None
+    needed = [e for e in entries if (lo is None or e[0] >= lo) and (hi is None or e[0] <= hi)]
+    if not needed:
+        return pd.DataFrame()
+
+    table = pa.concat_tables([pq.read_table(_chunk_path(root, digest)) for _, digest, _ in needed])
+    df = table.to_pandas()
+    if start is not None or end is not None:
+        df = df.loc[start:end]
+    return df
+
+def retained_runs(snapshots, keep_last=7, keep_daily=30, keep_monthly=24, keep=()):
+    """
+    Runs kept by the retention policy: the last keep_last runs, the last run of each of the last
+    keep_daily days and of each of the last keep_monthly months, plus any pinned run ids.
+    """
+    runs = snapshots.groupby('run_id')['created_at'].max().sort_values()
+    if runs.empty:
+        return set()
+    kept = set(runs.index[-keep_last:]) if keep_last else set()
+    for period, count in (('D', keep_daily), ('M', keep_monthly)):
+        periods = runs.dt.to_period(period)
+        last_per_period = runs.groupby(periods).tail(1)
+        recent = last_per_period[periods[last_per_period.index] > periods.iloc[-1] - count]
+        kept |= set(recent.index)
+    return kept | (set(keep) & set(runs.index))
+
+def collect_garbage(root, keep_last=7, keep_daily=30, keep_monthly=24, keep=(), grace_seconds=3600, dry_run=False):
+    """
+    Mark and sweep: drop the manifests of runs outside the retention policy, then delete chunks
+    no remaining manifest references. Chunks younger than grace_seconds are left alone, since a
+    run in progress may have written them before its manifest.
+    Returns {'runs_deleted', 'chunks_deleted', 'bytes_freed'}.
+    """
+    snapshots = list_snapshots(root)
+    kept = retained_runs(snapshots, keep_last, keep_daily, keep_monthly, keep)
+    doomed = sorted(set(snapshots['run_id']) - kept)
+
+    referenced = set()
+    base = os.path.join(root, "manifests")
+    for run_id in kept:
+        for name in os.listdir(os.path.join(base, run_id)):
+            if name.endswith(".json"):
+                with open(os.path.join(base, run_id, name)) as f:
+                    for entries in json.load(f)['series'].values():
+                        referenced.update(e[1] for e in entries)
+
+    now = time.time()
+    chunks_deleted = bytes_freed = 0
+    for dirpath, _, files in os.walk(os.path.join(root, "chunks")):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if name.endswith(".parquet") and name[:-len(".parquet")] not in referenced and now - os.path.getmtime(path) > grace_seconds:
+                chunks_deleted += 1
+                bytes_freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+
+    if not dry_run:
+        for run_id in doomed:
+            shutil.rmtree(os.path.join(base, run_id), ignore_errors=True)
+    logger.info(f"GC{' (dry run)' if dry_run else ''}: {len(doomed)} run(s), {chunks_deleted} chunk(s), {bytes_freed / 1024 / 1024:.1f} MB")
+    return {'runs_deleted': len(doomed), 'chunks_deleted': chunks_deleted, 'bytes_freed': bytes_freed}
+
+if __name__ == "__main__":
+    # python src/snapshot_store.py list --ticker AAPL
+    # python src/snapshot_store.py show AAPL --as-of 2026-01-15 --kind clean --out aapl_20260115.csv
+    # python src/snapshot_store.py gc --dry-run
+    import yaml
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Versioned, content-addressed snapshots of every run's data")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="Snapshots per run and ticker")
+    p_list.add_argument("--ticker")
+    p_show = sub.add_parser("show", help="A ticker's series as of a run or date")
+    p_show.add_argument("ticker")
+    p_show.add_argument("--run-id")
+    p_show.add_argument("--as-of", help="Date or timestamp, the latest run at or before it")
+    p_show.add_argument("--kind", choices=KINDS, default="clean")
+    p_show.add_argument("--start")
+    p_show.add_argument("--end")
+    p_show.add_argument("--out", help="Write to .csv or .parquet instead of printing")
+    p_gc = sub.add_parser("gc", help="Apply the retention policy and delete unreferenced chunks")
+    p_gc.add_argument("--keep-last", type=int)
+    p_gc.add_argument("--keep-daily", type=int)
+    p_gc.add_argument("--keep-monthly", type=int)
+    p_gc.add_argument("--keep", nargs="*", default=[], help="Run ids to keep regardless of the policy")
+    p_gc.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    root = settings.get('snapshot_store', f"{settings['data_folder']}/snapshots")
+    retention = (pipeline.get('snapshots', {}) or {}).get('retention', {}) or {}
+
+    if args.command == "list":
+        print(list_snapshots(root, args.ticker).to_string(index=False))
+    elif args.command == "show":
+        df = load_snapshot(root, args.ticker, args.run_id, args.as_of, args.kind, args.start, args.end)
+        if args.out:
+            if args.out.endswith(".parquet"):
+                df.to_parquet(args.out)
+            else:
+                df.to_csv(args.out)
+            logger.info(f"Wrote {len(df)} rows of {args.ticker} to {args.out}")
+        else:
+            print(df.to_string(max_rows=50))
+    else:
+        collect_garbage(
+            root,
+            keep_last=args.keep_last if args.keep_last is not None else retention.get('keep_last', 7),
+            keep_daily=args.keep_daily if args.keep_daily is not None else retention.get('keep_daily', 30),
+            keep_monthly=args.keep_monthly if args.keep_monthly is not None else retention.get('keep_monthly', 24),
+            keep=args.keep,
+            grace_seconds=retention.get('grace_seconds', 3600),
+            dry_run=args.dry_run,
+        )
@@ -0,0 +1,158 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger("TelemetrySink")
+
+_STOP = object()
+
+class TelemetrySink:
+    """
+    Background MLflow writer.
+
+    The forecasting hot path only puts records on an in-memory queue; a single daemon
+    thread turns each one into one create_run + one log_batch call (instead of a round
+    trip per param/metric against the SQLite tracking store) and uploads artifacts.
+    Records are keyed by a local run key, so an artifact submitted later (e.g. a plot
+    rendered only for flagged tickers) lands in the same MLflow run.
+    When the store falls max_queue records behind, new records are dropped and counted
+    rather than stalling the pipeline.
+    """
+
+    def __init__(self, tracking_uri, experiment_name, client=None, max_queue=10000):
+        self.tracking_uri = tracking_uri
+        self.experiment_name = experiment_name
+        self._client = client
+        self._experiment_id = None
+        self._runs = {}  # local run key -> MLflow run id
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._errors = 0
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._drain, name="telemetry-sink", daemon=True)
+        self._thread.start()
+
+    # Producer side (called from the hot path, never blocks on MLflow)
+    def log_run(self, key, params=None, metrics=None, tags=None, run_name=None):
+        """run_name defaults to the key; only used when the key's MLflow run is first created"""
+        self._put(('run', key, params or {}, metrics or {}, tags or {}, run_name))
+
+    def log_artifact(self, key, path):
+        self._put(('artifact', key, path))
+
+    def set_tag(self, key, name, value):
+        self._put(('run', key, {}, {}, {name: value}, None))
+
+    def end_run(self, key, status="FINISHED"):
+        self._put(('end', key, status))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning(f"Telemetry queue full ({self._queue.maxsize} records), dropped {self._dropped} so far, latest for {item[1]}")
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far has been written. Returns False on timeout."""
+        done = threading.Event()
+        try:
+            self._queue.put(('flush', done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=30):
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.warning("Telemetry sink still full at close, leaving its thread behind")
+                return
+            self._thread.join(timeout)
+        if self._dropped:
+            logger.warning(f"Telemetry sink dropped {self._dropped} record(s) on a full queue")
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    # Consumer side (background thread)
+    def _client_and_experiment(self):
+        if self._client is None:
+            from mlflow.tracking import MlflowClient
+            self._client = MlflowClient(tracking_uri=self.tracking_uri)
+        if self._experiment_id is None:
+            experiment = self._client.get_experiment_by_name(self.experiment_name)
+            if experiment is None:
+                self._experiment_id = self._client.create_experiment(self.experiment_name)
+            else:
+                self._experiment_id = experiment.experiment_id
+        return self._client
+
+    def _run_id(self, client, key, run_name=None):
+        if key not in self._runs:
+            self._runs[key] = client.create_run(self._experiment_id, run_name=run_name or str(key)).info.run_id
+        return self._runs[key]
+
+    def _write(self, item):
+        from mlflow.entities import Metric, Param, RunTag
+
+        client = self._client_and_experiment()
+        if item[0] == 'artifact':
+            client.log_artifact(self._run_id(client, item[1]), item[2])
+            return
+        if item[0] == 'end':
+            client.set_terminated(self._run_id(client, item[1]), status=item[2])
+            self._runs.pop(item[1], None)
+            return
+
+        _, key, params, metrics, tags, run_name = item
+        run_id = self._run_id(client, key, run_name)
+        now = int(time.time() * 1000)
+        client.log_batch(
+            run_id,
+            metrics=[Metric(k, float(v), now, 0) for k, v in metrics.items()],
+            params=[Param(k, str(v)) for k, v in params.items()],
+            tags=[RunTag(k, str(v)) for k, v in tags.items()],
+        )
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if item[0] == 'flush':
+                item[1].set()
+                continue
+            try:
+                self._write(item)
+            except Exception as e:
+                # Telemetry must never take the pipeline down
+                self._errors += 1
+                logger.error(f"MLflow write failed for {item[1]}: {e}")
+
+_SINK = None
+_SINK_LOCK = threading.Lock()
+
+def get_sink(tracking_uri, experiment_name):
+    """Process-wide sink, flushed at interpreter exit so queued telemetry is not lost"""
+    global _SINK
+    with _SINK_LOCK:
+        if _SINK is None:
+            _SINK = TelemetrySink(tracking_uri, experiment_name)
+            atexit.register(_shutdown)
+        return _SINK
+
+def _shutdown():
+    if _SINK is not None:
+        if not _SINK.flush(timeout=float(os.environ.get("TELEMETRY_FLUSH_TIMEOUT", 60))):
+            logger.warning("Telemetry sink did not drain before exit, some MLflow records were dropped")
+        _SINK.close()
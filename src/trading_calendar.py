@@ -0,0 +1,265 @@
+import os
+import re
+import logging
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import yaml
+
+logger = logging.getLogger("TradingCalendar")
+
+CALENDAR_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'calendars.yaml'))
+
+NS_PER_DAY = 86_400 * 10**9
+NS_PER_MINUTE = 60 * 10**9
+WEEKDAYS = {'Mon': 0, 'Tue': 1, 'Wed': 2, 'Thu': 3, 'Fri': 4, 'Sat': 5, 'Sun': 6}
+INTERVAL_UNITS = {'m': NS_PER_MINUTE, 'h': 60 * NS_PER_MINUTE, 'd': NS_PER_DAY}
+
+@lru_cache(maxsize=8)
+def load_calendars(path=CALENDAR_FILE):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)['calendars']
+
+def calendar_names():
+    return sorted(load_calendars())
+
+def calendar_spec(name):
+    calendars = load_calendars()
+    if name not in calendars:
+        raise ValueError(f"Unknown trading calendar '{name}', expected one of {sorted(calendars)}")
+    return calendars[name]
+
+def _minutes(hhmm):
+    h, m = str(hhmm).split(":")
+    return int(h) * 60 + int(m)
+
+def session_hours(name):
+    """(timezone, open minute, close minute) of the regular session, local time"""
+    spec = calendar_spec(name)
+    return spec['timezone'], _minutes(spec['open']), _minutes(spec['close'])
+
+def interval_ns(interval):
+    """Yahoo interval string ('1d', '1h', '60m', '15m') -> bar length in ns"""
+    match = re.fullmatch(r"(\d+)([mhd])", str(interval))
+    if not match or (match.group(2) == 'd' and match.group(1) != '1'):
+        raise ValueError(f"Unsupported calendar interval '{interval}'")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+def _easter(years):
+    """Gregorian Easter Sunday for an array of years (anonymous algorithm), as datetime64[D]"""
+    y = np.asarray(years)
+    a, b, c = y % 19, y // 100, y % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return np.array([f"{yy:04d}-{mm:02d}-{dd:02d}" for yy, mm, dd in zip(y, month, day)], dtype='datetime64[D]')
+
+def _weekday(days):
+    # 1970-01-01 was a Thursday
+    return (days.astype('int64') + 3) % 7
+
+def _nth_weekday(rule, years):
+    """'11/4/Thu' = 4th Thursday of November, '05/-1/Mon' = last Monday of May, '+1' shifts the result"""
+    rule, _, shift = str(rule).partition('+')
+    month, n, day = rule.split('/')
+    month, n, wd = int(month), int(n), WEEKDAYS[day]
+    first = np.array([f"{y:04d}-{month:02d}" for y in years], dtype='datetime64[M]')
+    if n > 0:
+        start = first.astype('datetime64[D]')
+        out = start + (wd - _weekday(start)) % 7 + 7 * (n - 1)
+    else:
+        end = (first + 1).astype('datetime64[D]') - 1
+        out = end - (_weekday(end) - wd) % 7 - 7 * (-n - 1)
+    return out + int(shift or 0)
+
+def _fixed(entries, years, observed):
+    """Fixed-date rules for every year, moved off weekends according to the observed policy"""
+    out = []
+    for entry in entries or []:
+        date, since = (entry['date'], entry.get('since', 0)) if isinstance(entry, dict) else (entry, 0)
+        yrs = [y for y in years if y >= since]
+        days = np.array([f"{y:04d}-{date}" for y in yrs], dtype='datetime64[D]')
+        if observed == 'nearest':
+            wd = _weekday(days)
+            moved = days + np.where(wd == 5, -1, np.where(wd == 6, 1, 0))
+            # A Saturday New Year is not observed on the last Friday of the previous year
+            days = moved[moved.astype('datetime64[Y]') == days.astype('datetime64[Y]')]
+        out.append(days)
+    days = np.sort(np.concatenate(out)) if out else np.array([], dtype='datetime64[D]')
+
+    if observed == 'next':
+        # UK style: a weekend holiday moves to the next weekday that is not already a holiday
+        taken = set()
+        for day in days:
+            while _weekday(np.array([day]))[0] >= 5 or day in taken:
+                day = day + 1
+            taken.add(day)
+        days = np.array(sorted(taken), dtype='datetime64[D]')
+    return days
+
+def _rule_days(rules, years, observed):
+    rules = rules or {}
+    parts = [_fixed(rules.get('fixed'), years, observed)]
+    easter = _easter(years)
+    parts += [easter + int(offset) for offset in rules.get('easter', []) or []]
+    parts += [_nth_weekday(rule, years) for rule in rules.get('nth_weekday', []) or []]
+    dates = np.array(rules.get('dates', []) or [], dtype='datetime64[D]')
+    parts.append(dates[np.isin(dates.astype('datetime64[Y]').astype(int) + 1970, years)])
+    return np.unique(np.concatenate(parts)) if parts else np.array([], dtype='datetime64[D]')
+
+@lru_cache(maxsize=1024)
+def session_days(name, year):
+    """
+    Trading days of one calendar year as datetime64[D] plus each day's close minute
+    (shortened on early-close days).
+    """
+    spec = calendar_spec(name)
+    years = [year]
+    holidays = _rule_days(spec.get('holidays'), years, spec.get('observed', 'none'))
+
+    days = np.arange(np.datetime64(f"{year:04d}-01-01"), np.datetime64(f"{year + 1:04d}-01-01"))
+    days = days[np.is_busday(days, weekmask=spec.get('weekmask', '1111100'), holidays=holidays)]
+
+    close = np.full(len(days), _minutes(spec['close']))
+    early = spec.get('early_close')
+    if early:
+        close[np.isin(days, _rule_days(early, years, 'none'))] = _minutes(early['time'])
+    return days, close
+
+def _week_bounds(spec, year):
+    """
+    UTC ns of each week's open and close for calendars with a weekly session
+    (week_open / week_close: "Day HH:MM Zone"), one entry per week touching the year.
+    """
+    mondays = np.arange(np.datetime64(f"{year - 1:04d}-12-25"), np.datetime64(f"{year + 1:04d}-01-08"))
+    mondays = mondays[_weekday(mondays) == 0]
+    bounds = []
+    for key in ('week_open', 'week_close'):
+        day, hhmm, tz = spec[key].split()
+        # Sunday belongs to the week of the following Monday
+        wall = mondays + (WEEKDAYS[day] + 1) % 7 - 1
+        wall = wall.astype('datetime64[ns]').astype('int64') + _minutes(hhmm) * NS_PER_MINUTE
+        bounds.append(pd.DatetimeIndex(wall.astype('datetime64[ns]')).tz_localize(tz).as_unit('ns').asi8)
+    return bounds
+
+def _weekly_grid(spec, step, year):
+    """Bars of a weekly session (FX): every bar that starts after the week opens and ends by its close"""
+    start = np.datetime64(f"{year:04d}-01-01", 'ns').astype('int64')
+    end = np.datetime64(f"{year + 1:04d}-01-01", 'ns').astype('int64')
+    bars = np.arange(start, end, step, dtype='int64')
+    opens, closes = _week_bounds(spec, year)
+    week = np.searchsorted(opens, bars, 'right') - 1
+    bars = bars[(week >= 0) & (bars + step <= closes[np.maximum(week, 0)])]
+    holidays = _rule_days(spec.get('holidays'), [year], spec.get('observed', 'none'))
+    return bars[~np.isin(bars // NS_PER_DAY, holidays.astype('int64'))]
+
+@lru_cache(maxsize=4096)
+def _year_grid(name, interval, year, thin=False):
+    """
+    Expected bar timestamps of one calendar year as a sorted int64 ns array.
+    Daily bars are naive session dates (like Yahoo's daily index), intraday bars are UTC bar
+    starts. Built by broadcasting session days against bar offsets, no per-day loop.
+    thin=True returns the bars of the thin days instead: allowed, but not expected.
+    """
+    spec = calendar_spec(name)
+    step = interval_ns(interval)
+    days, close = session_days(name, year)
+    day_ns = days.astype('datetime64[ns]').astype('int64')
+    if step >= NS_PER_DAY:
+        grid = day_ns
+    elif 'week_open' in spec:
+        grid = _weekly_grid(spec, step, year)
+    else:
+        tz, open_min, close_min = session_hours(name)
+        n_bars = -(-(close_min - open_min) * NS_PER_MINUTE // step)
+        offsets = open_min * NS_PER_MINUTE + np.arange(n_bars, dtype='int64') * step
+        # The last bar of a regular session may be partial (15:30 on the hour grid), on an
+        # early-close day Yahoo only sends the bars that fit before the shortened close
+        end = np.where((close < close_min)[:, None], offsets[None, :] + step, offsets[None, :] + 1)
+        keep = end <= (close * NS_PER_MINUTE)[:, None]
+        grid = (day_ns[:, None] + offsets[None, :])[keep]
+        if tz != 'UTC':
+            local = pd.DatetimeIndex(grid.astype('datetime64[ns]')).tz_localize(tz, ambiguous='NaT', nonexistent='NaT')
+            grid = local[~local.isna()].as_unit('ns').asi8
+
+    if not spec.get('thin'):
+        return grid[:0] if thin else grid
+    # Days are UTC dates for intraday bars of a UTC calendar, local session dates otherwise
+    if step < NS_PER_DAY and spec['timezone'] != 'UTC':
+        local_days = pd.DatetimeIndex(grid).tz_localize('UTC').tz_convert(spec['timezone']).tz_localize(None)
+        bar_days = local_days.as_unit('ns').asi8 // NS_PER_DAY
+    else:
+        bar_days = grid // NS_PER_DAY
+    on_thin = np.isin(bar_days, _rule_days(spec.get('thin'), [year], 'none').astype('int64'))
+    return grid[on_thin] if thin else grid[~on_thin]
+
+def _to_ns(value, daily):
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    ns = ts.as_unit('ns').value
+    return ns // NS_PER_DAY * NS_PER_DAY if daily else ns
+
+def expected_bars(name, interval, start, end, thin=False):
+    """
+    Sorted int64 ns timestamps of every bar the calendar expects in [start, end]
+    (with thin=True: the bars it allows on thin days without expecting them).
+    Years are generated once per process and cached, so a lookup is a concatenate + two
+    binary searches.
+    """
+    daily = interval_ns(interval) >= NS_PER_DAY
+    lo, hi = _to_ns(start, daily), _to_ns(end, daily)
+    # One year of margin on each side for sessions whose UTC times cross the year boundary
+    y0 = pd.Timestamp(lo - NS_PER_DAY).year
+    y1 = pd.Timestamp(hi + NS_PER_DAY).year
+    grid = np.concatenate([_year_grid(name, interval, y, thin) for y in range(y0, y1 + 1)])
+    return grid[np.searchsorted(grid, lo, 'left'):np.searchsorted(grid, hi, 'right')]
+
+def bar_keys(index, name, interval):
+    """Each bar of an index in the calendar's integer convention (naive session dates for daily, UTC ns for intraday)"""
+    idx = pd.DatetimeIndex(index)
+    if interval_ns(interval) >= NS_PER_DAY:
+        if idx.tz is not None:
+            idx = idx.tz_convert(session_hours(name)[0]).tz_localize(None)
+        return idx.as_unit('ns').asi8 // NS_PER_DAY * NS_PER_DAY
+    if idx.tz is None:
+        idx = idx.tz_localize('UTC')
+    return idx.as_unit('ns').asi8
+
+def calendar_gaps(index, name, interval):
+    """
+    (missing, extra) int64 ns arrays between the observed bars and the calendar,
+    over the observed span only (no gaps before a listing or after the last download).
+    Bars on thin days are neither missing nor extra.
+    """
+    observed = np.unique(bar_keys(index, name, interval))
+    if len(observed) == 0:
+        return observed, observed
+    expected = expected_bars(name, interval, observed[0], observed[-1])
+    missing = np.setdiff1d(expected, observed, assume_unique=True)
+    extra = np.setdiff1d(observed, expected, assume_unique=True)
+    extra = np.setdiff1d(extra, expected_bars(name, interval, observed[0], observed[-1], thin=True), assume_unique=True)
+    return missing, extra
+
+def gap_report(df, name, interval):
+    """
+    Missing and off-calendar bars in the validator format (Date index, Close, qa_reason),
+    ready for build_quarantine_batch. Intraday timestamps are UTC.
+    """
+    missing, extra = calendar_gaps(df.index, name, interval)
+
+    close = pd.Series(pd.to_numeric(df['Close'], errors='coerce').to_numpy() if 'Close' in df.columns else np.nan,
+                      index=bar_keys(df.index, name, interval))
+    extra_close = close[~close.index.duplicated(keep='last')].reindex(extra).to_numpy()
+
+    out = pd.DataFrame({
+        'Close': np.concatenate([np.full(len(missing), np.nan), extra_close]),
+        'qa_reason': [f"Missing Bar: no {interval} bar on the {name} calendar"] * len(missing)
+                   + [f"Off-Calendar Bar: {interval} bar outside {name} sessions"] * len(extra),
+    }, index=pd.DatetimeIndex(np.concatenate([missing, extra]).astype('datetime64[ns]'), name='Date'))
+    return out.sort_index()
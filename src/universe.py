@@ -0,0 +1,131 @@
+import os
+import gc
+import logging
+import pandas as pd
+from batch_forecast import ENGINES
+
+logger = logging.getLogger("Universe")
+
+# Manifest schema: one row per instrument
+UNIVERSE_COLUMNS = ['ticker', 'asset_class', 'exchange', 'interval', 'benchmark_key', 'ml', 'engine']
+
+class MemoryCeilingExceeded(MemoryError):
+    """Raised when the process stays above settings.max_memory_mb even after releasing frames"""
+
+def infer_asset_class(ticker):
+    """Best guess from Yahoo ticker conventions, used when the manifest has no asset_class"""
+    if ticker.endswith("=X"):
+        return "fx"
+    if ticker.endswith("-USD") or ticker.endswith("-EUR"):
+        return "crypto"
+    if ticker.startswith("^"):
+        return "index"
+    return "equity"
+
+def infer_exchange(ticker, asset_class):
+    """Calendar/exchange code from Yahoo suffixes (.AS = Euronext Amsterdam, no suffix = US)"""
+    if asset_class == "fx":
+        return "FX"
+    if asset_class == "crypto":
+        return "CRYPTO"
+    suffix_map = {".AS": "XAMS", ".PA": "XPAR", ".DE": "XETR", ".L": "XLON"}
+    for suffix, exchange in suffix_map.items():
+        if ticker.endswith(suffix):
+            return exchange
+    return "XNYS"
+
+def load_universe(pipeline_config):
+    """
+    Load the ticker universe as a DataFrame with UNIVERSE_COLUMNS.
+
+    Source: 'universe_file' (CSV or Parquet manifest) when configured, otherwise the
+    inline yahoo_tickers / ml_tickers / ml_engines / benchmark_mapping lists from config.yaml.
+    Missing attributes are filled from the inline config and ticker conventions.
+    """
+    ml_tickers = set(pipeline_config.get('ml_tickers', []) or [])
+    ml_engines = pipeline_config.get('ml_engines', {}) or {}
+    default_engine = (pipeline_config.get('settings', {}) or {}).get('default_ml_engine', 'prophet')
+    benchmark_map = pipeline_config.get('benchmark_mapping', {}) or {}
+    path = pipeline_config.get('universe_file')
+
+    if path:
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if 'ticker' not in df.columns:
+            raise ValueError(f"Universe manifest {path} has no 'ticker' column")
+        logger.info(f"Loaded universe manifest {path}: {len(df)} instruments")
+    else:
+        df = pd.DataFrame({'ticker': pipeline_config.get('yahoo_tickers', [])})
+
+    df = df.copy()
+    df['ticker'] = df['ticker'].astype(str).str.strip()
+    df = df[df['ticker'] != ""].drop_duplicates(subset='ticker', keep='first')
+
+    for col in UNIVERSE_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = df.astype({col: object for col in UNIVERSE_COLUMNS})
+
+    # Fill the gaps
+    blank = lambda s: s.isna() | (s.astype(str).str.strip() == "")
+    df.loc[blank(df['asset_class']), 'asset_class'] = df['ticker'].map(infer_asset_class)
+    df.loc[blank(df['exchange']), 'exchange'] = [
+        infer_exchange(t, a) for t, a in zip(df['ticker'], df['asset_class'])
+    ]
+    df.loc[blank(df['interval']), 'interval'] = "1d"
+    df.loc[blank(df['benchmark_key']), 'benchmark_key'] = df['ticker'].map(benchmark_map)
+    df['benchmark_key'] = df['benchmark_key'].where(~blank(df['benchmark_key']), None)
+
+    ml_flag = df['ml'].astype(str).str.strip().str.lower().isin(["1", "true", "yes", "y"])
+    df['ml'] = ml_flag | df['ticker'].isin(ml_tickers) | df['ticker'].isin(list(ml_engines))
+
+    # Forecast engine: manifest column, then ml_engines, then the default (None when not forecast)
+    df.loc[blank(df['engine']), 'engine'] = df['ticker'].map(ml_engines)
+    df.loc[blank(df['engine']), 'engine'] = default_engine
+    df['engine'] = df['engine'].astype(str).str.strip().str.lower().astype(object).where(df['ml'], None)
+    unknown = set(df['engine'].dropna()) - set(ENGINES)
+    if unknown:
+        raise ValueError(f"Unknown forecast engine(s) {sorted(unknown)}, expected one of {ENGINES}")
+
+    return df[UNIVERSE_COLUMNS].reset_index(drop=True)
+
+def benchmark_keys(universe, pipeline_config):
+    """All ECB series needed: the configured list plus every manifest benchmark_key"""
+    keys = list(pipeline_config.get('ecb_tickers', []) or [])
+    for key in universe['benchmark_key'].dropna():
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+def iter_chunks(universe, chunk_size):
+    """Yield the universe in fixed-size slices so only one chunk of downloads is alive at a time"""
+    for start in range(0, len(universe), chunk_size):
+        yield universe.iloc[start:start + chunk_size]
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, falls back to peak RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def enforce_memory_ceiling(ceiling_mb):
+    """
+    Called after each ticker's results are persisted and its frames released.
+    Collects garbage when over the ceiling and raises if that does not bring RSS back under it.
+    """
+    if not ceiling_mb:
+        return current_rss_mb()
+
+    rss = current_rss_mb()
+    if rss > ceiling_mb:
+        gc.collect()
+        rss = current_rss_mb()
+        if rss > ceiling_mb:
+            raise MemoryCeilingExceeded(f"RSS {rss:.0f} MB exceeds max_memory_mb={ceiling_mb}")
+    return rss
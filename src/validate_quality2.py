@@ -96,6 +96,7 @@ def check_with_benchmark(df_target, df_benchmark, threshold=0.01):
         SELECT
             t.Date,
             t.Close,
+            b.Close AS Benchmark,
             'Benchmark Mismatch > {threshold*100}%' as qa_reason
         FROM target t
         INNER JOIN benchmark b ON t.Date = b.Date
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dashboard_data import file_identity
+from residual_scoring import band_z
+from quarantine_store import build_quarantine_batch, append_quarantine_batch
+from analyst_views import clean_path
+
+logger = logging.getLogger("WatchService")
+
+BAR_COLUMNS = ['ticker', 'ts', 'Open', 'High', 'Low', 'Close', 'Volume']
+VERDICT_COLUMNS = ['ticker', 'ts', 'close', 'yhat', 'yhat_lower', 'yhat_upper', 'z', 'verdict', 'qa_reason']
+STATUS_FILE = "_WATCH_STATUS.json"
+
+def _utc_ns(values):
+    idx = pd.DatetimeIndex(values)
+    if idx.tz is None:
+        idx = idx.tz_localize('UTC')
+    return idx.tz_convert('UTC').as_unit('ns').asi8
+
+def check_bars(bars):
+    """
+    The batch validator's rules (High < Low, Volume <= 0, missing values) on a micro-batch of
+    bars from many tickers at once. Returns one qa_reason per bar ('' when the bar is clean),
+    with the same prefixes as run_quality_checks so the quarantine rule bits match.
+    """
+    high, low, close = (pd.to_numeric(bars[c], errors='coerce').to_numpy(dtype=float) for c in ('High', 'Low', 'Close'))
+    volume = pd.to_numeric(bars['Volume'], errors='coerce').to_numpy(dtype=float)
+
+    reasons = np.full(len(bars), '', dtype=object)
+    for mask, reason in (
+        (np.isnan(close) | np.isnan(high) | np.isnan(low), "Missing Value: Close"),
+        (volume <= 0, "Logic Error: Volume <= 0"),
+        (high < low, "Logic Error: High < Low"),
+    ):
+        reasons[mask] = np.where(reasons[mask] == '', reason, reasons[mask] + "; " + reason)
+    return reasons
+
+def to_bars(histories):
+    """{ticker: OHLCV frame with a DatetimeIndex} -> one long frame with BAR_COLUMNS"""
+    frames = []
+    for ticker, df in histories.items():
+        frame = df.reset_index()
+        frame = frame.rename(columns={frame.columns[0]: 'ts'}).assign(ticker=ticker)
+        frames.append(frame[[c for c in BAR_COLUMNS if c in frame.columns]])
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=BAR_COLUMNS)
+
+class SimulatedFeed:
+    """
+    Local replay feed for tests and demos: each poll releases the next bars_per_poll bars of
+    every ticker, None once every history is exhausted.
+    """
+
+    def __init__(self, histories, bars_per_poll=1):
+        self._bars = to_bars(histories)
+        seq = self._bars.groupby('ticker', sort=False).cumcount() // bars_per_poll
+        self._groups = {k: v for k, v in self._bars.groupby(seq).indices.items()}
+        self._next = 0
+
+    def poll(self):
+        rows = self._groups.get(self._next)
+        if rows is None:
+            return None
+        self._next += 1
+        return self._bars.iloc[rows].reset_index(drop=True)
+
+class YahooFeed:
+    """Polls the latest bars of every ticker in one yfinance request (the forming bar is re-sent until it closes)"""
+
+    def __init__(self, tickers, interval="1h", period="1d"):
+        self.tickers, self.interval, self.period = list(tickers), interval, period
+
+    def poll(self):
+        import yfinance as yf
+        try:
+            df = yf.download(self.tickers, period=self.period, interval=self.interval, group_by='ticker',
+                             auto_adjust=False, progress=False, threads=True)
+        except Exception as e:
+            logger.error(f"Yahoo poll failed: {e}")
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        if df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        if not isinstance(df.columns, pd.MultiIndex):
+            df.columns = pd.MultiIndex.from_product([self.tickers[:1], df.columns])
+        long = df.stack(level=0, future_stack=True).rename_axis(['ts', 'ticker']).reset_index()
+        return long.dropna(subset=['Close'])[BAR_COLUMNS]
+
+class WatchService:
+    """
+    Resident validation service. Keeps per-ticker state in memory between polls:
+    last bar seen, recent history and the published forecast bands (reloaded only when the
+    nightly run republishes them), so each poll only validates and scores the new bars.
+    Verdicts are published per poll: flagged bars to the quarantine store, a status file
+    for the dashboard.
+    """
+
+    def __init__(self, tickers, data_folder, quarantine_root=None, run_id=None, interval_width=0.95, history_bars=500):
+        self.tickers = list(tickers)
+        self.data_folder = data_folder
+        self.quarantine_root = quarantine_root
+        self.run_id = run_id or f"watch-{datetime.now():%Y%m%dT%H%M%S}"
+        self.interval_width = interval_width
+        self.history_bars = history_bars
+
+        self._last_ts = {}
+        self._last_close = {}
+        self._bands = {}          # ticker -> (ds ns, yhat, lower, upper)
+        self._band_ids = {}
+        self._recent = pd.DataFrame(columns=BAR_COLUMNS)
+        self._polls = 0
+        self._stats = {'bars': 0, 'flagged': 0}
+
+    # State
+    def seed(self, bars):
+        """Take already validated bars (BAR_COLUMNS) as history: they set each ticker's last bar"""
+        if bars.empty:
+            return
+        bars = bars.sort_values(['ticker', 'ts'], kind='stable')
+        newest = bars.groupby('ticker', sort=False).tail(1)
+        for t, s, c in zip(newest['ticker'], _utc_ns(newest['ts']), newest['Close']):
+            self._last_ts[t] = int(s)
+            self._last_close[t] = float(c)
+        self._append_history(bars.groupby('ticker', sort=False).tail(self.history_bars))
+
+    def warm_start(self, clean_root):
+        """Seed the last bar and recent history of each ticker from the clean store, then load the bands"""
+        histories = {}
+        for ticker in self.tickers:
+            path = clean_path(clean_root, ticker)
+            if os.path.exists(path):
+                histories[ticker] = pd.read_parquet(path).tail(self.history_bars)
+        self.seed(to_bars(histories))
+        logger.info(f"Warm start: history for {len(histories)}/{len(self.tickers)} tickers")
+        self.refresh_models()
+
+    def refresh_models(self):
+        """(Re)load forecast bands whose published file changed. Returns the number reloaded."""
+        reloaded = 0
+        for ticker in self.tickers:
+            path = os.path.join(self.data_folder, f"{ticker}_forecast.csv")
+            identity = file_identity(path)
+            if identity is None or identity == self._band_ids.get(ticker):
+                continue
+            fc = pd.read_csv(path, parse_dates=['ds']).sort_values('ds')
+            self._bands[ticker] = (
+                _utc_ns(fc['ds']),
+                fc['yhat'].to_numpy(dtype=float),
+                fc['yhat_lower'].to_numpy(dtype=float),
+                fc['yhat_upper'].to_numpy(dtype=float),
+            )
+            self._band_ids[ticker] = identity
+            reloaded += 1
+        if reloaded:
+            logger.info(f"Loaded forecast bands for {reloaded} tickers")
+        return reloaded
+
+    def history(self, ticker):
+        """Recent bars of a ticker held in memory"""
+        return self._recent[self._recent['ticker'] == ticker].tail(self.history_bars)
+
+    # Hot path
+    def step(self, bars, received_at=None):
+        """
+        Validate and score one micro-batch of bars (any number of tickers).
+        Bars already seen are skipped; a re-sent bar with a changed close (the forming bar)
+        is re-evaluated. Returns one verdict row per new bar with its arrival-to-verdict latency.
+        """
+        received_at = received_at or time.perf_counter()
+        if bars is None or bars.empty:
+            return pd.DataFrame(columns=VERDICT_COLUMNS + ['latency_ms'])
+
+        # 1 New or revised bars only (vectorized against the per-ticker state)
+        bars = bars.sort_values(['ticker', 'ts'], kind='stable').reset_index(drop=True)
+        tickers = bars['ticker'].to_numpy(dtype=object)
+        ts = _utc_ns(bars['ts'])
+        close = pd.to_numeric(bars['Close'], errors='coerce').to_numpy(dtype=float)
+        last_ts = np.array([self._last_ts.get(t, -1) for t in tickers], dtype=np.int64)
+        last_close = np.array([self._last_close.get(t, np.nan) for t in tickers], dtype=float)
+        fresh = (ts > last_ts) | ((ts == last_ts) & ~np.isclose(close, last_close))
+        if not fresh.any():
+            return pd.DataFrame(columns=VERDICT_COLUMNS + ['latency_ms'])
+        bars, tickers, ts, close = bars[fresh].reset_index(drop=True), tickers[fresh], ts[fresh], close[fresh]
+
+        # 2 Validation rules
+        reasons = check_bars(bars)
+        invalid = reasons != ''
+
+        # 3 Score against the in-memory band (latest band row at or before the bar)
+        yhat, lower, upper = (np.full(len(bars), np.nan) for _ in range(3))
+        names, inverse = np.unique(tickers, return_inverse=True)
+        for i, ticker in enumerate(names):
+            band = self._bands.get(ticker)
+            if band is None:
+                continue
+            rows = np.flatnonzero(inverse == i)
+            pos = np.searchsorted(band[0], ts[rows], side='right') - 1
+            ok = pos >= 0
+            for target, source in zip((yhat, lower, upper), band[1:]):
+                target[rows[ok]] = source[pos[ok]]
+        with np.errstate(invalid='ignore'):
+            z, outside = band_z(close, yhat, lower, upper, self.interval_width)
+        no_model = np.isnan(yhat)
+        outside = outside & ~no_model & ~invalid
+
+        pct = f"{self.interval_width:.0%}"
+        for i in np.flatnonzero(outside):
+            reasons[i] = f"ML Anomaly: z={z[i]:+.1f} outside {pct} band [{lower[i]:.4g}, {upper[i]:.4g}]"
+        verdict = np.where(invalid, 'invalid', np.where(no_model, 'no_model', np.where(outside, 'outside_band', 'ok')))
+
+        # 4 Update the per-ticker state (rows are sorted, so the last row per ticker is its newest bar)
+        last = np.r_[tickers[1:] != tickers[:-1], True]
+        for t, s, c in zip(tickers[last], ts[last], close[last]):
+            self._last_ts[t] = int(s)
+            self._last_close[t] = float(c)
+        self._append_history(bars[~invalid])
+
+        verdicts = pd.DataFrame({
+            'ticker': tickers, 'ts': pd.to_datetime(ts, utc=True), 'close': close,
+            'yhat': yhat, 'yhat_lower': lower, 'yhat_upper': upper, 'z': z,
+            'verdict': verdict, 'qa_reason': reasons,
+        })
+        verdicts['latency_ms'] = (time.perf_counter() - received_at) * 1000
+
+        # 5 Publish this poll's results
+        self._polls += 1
+        self._stats['bars'] += len(verdicts)
+        self._stats['flagged'] += int((invalid | outside).sum())
+        self._publish(verdicts, bars, invalid | outside)
+        return verdicts
+
+    def _append_history(self, bars):
+        if bars.empty:
+            return
+        bars = bars[BAR_COLUMNS].drop_duplicates(['ticker', 'ts'], keep='last')
+        if len(self._recent):
+            # A re-sent forming bar replaces the row it updates instead of adding a second one
+            resent = pd.MultiIndex.from_frame(self._recent[['ticker', 'ts']]).isin(pd.MultiIndex.from_frame(bars[['ticker', 'ts']]))
+            recent = self._recent[~resent] if resent.any() else self._recent
+            self._recent = pd.concat([recent, bars], ignore_index=True)
+        else:
+            self._recent = bars.copy()
+        # Trim only when the buffer is well over budget, so most polls are a single concat
+        if len(self._recent) > 2 * self.history_bars * max(1, len(self.tickers)):
+            self._recent = self._recent.groupby('ticker', sort=False).tail(self.history_bars).reset_index(drop=True)
+
+    def _publish(self, verdicts, bars, flagged):
+        if self.quarantine_root and flagged.any():
+            observed = bars[flagged].assign(ts=pd.to_datetime(verdicts['ts'][flagged].to_numpy()))
+            hits = verdicts[flagged]
+            tables = []
+            for ticker, rows in hits.groupby('ticker', sort=False):
+                q = pd.DataFrame({'Close': rows['close'].to_numpy(), 'qa_reason': rows['qa_reason'].to_numpy()},
+                                 index=pd.DatetimeIndex(rows['ts'], name='Date'))
+                obs = observed[observed['ticker'] == ticker].set_index('ts')
+                tables.append(build_quarantine_batch(q, self.run_id, ticker, observed=obs))
+            run_date = datetime.now().strftime('%Y-%m-%d')
+            append_quarantine_batch(pa.concat_tables(tables), self.quarantine_root, run_date, part_key=f"poll{self._polls:06d}")
+
+        latest = verdicts.groupby('ticker', sort=False).tail(1)
+        status = {
+            'run_id': self.run_id,
+            'updated_at': time.time(),
+            'polls': self._polls,
+            **self._stats,
+            'last_poll': {
+                'bars': len(verdicts),
+                'flagged': int(flagged.sum()),
+                'latency_ms': float(verdicts['latency_ms'].max()),
+            },
+            'tickers': {
+                r.ticker: {'ts': r.ts.isoformat(), 'close': r.close, 'verdict': r.verdict,
+                           'z': None if np.isnan(r.z) else round(float(r.z), 2)}
+                for r in latest.itertuples()
+            },
+        }
+        path = os.path.join(self.data_folder, STATUS_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(status, f)
+        os.replace(tmp, path)
+
+    # Loop
+    def run(self, feed, poll_seconds=60, max_polls=None, model_refresh_seconds=300):
+        """Poll the feed until it is exhausted (None), max_polls is reached or the process is interrupted"""
+        last_refresh = time.monotonic()
+        polls = 0
+        logger.info(f"Watching {len(self.tickers)} tickers every {poll_seconds}s (run {self.run_id})")
+        try:
+            while max_polls is None or polls < max_polls:
+                started = time.monotonic()
+                bars = feed.poll()
+                if bars is None:
+                    break
+                verdicts = self.step(bars, time.perf_counter())
+                polls += 1
+
+                if len(verdicts):
+                    flagged = verdicts[verdicts['verdict'].isin(['invalid', 'outside_band'])]
+                    logger.info(f"Poll {polls}: {len(verdicts)} new bars, {len(flagged)} flagged, "
+                                f"verdict in {verdicts['latency_ms'].iloc[0]:.1f} ms")
+                    for r in flagged.itertuples():
+                        logger.warning(f"[WATCH] {r.ticker} {r.ts}: {r.qa_reason}")
+
+                if time.monotonic() - last_refresh >= model_refresh_seconds:
+                    self.refresh_models()
+                    last_refresh = time.monotonic()
+                time.sleep(max(0.0, poll_seconds - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            logger.info("Watch mode interrupted")
+        return polls
+
+if __name__ == "__main__":
+    # python src/watch_service.py                        -> poll Yahoo for the universe
+    # python src/watch_service.py --simulate --poll 0    -> replay the local *_1h.csv files
+    import glob
+    import yaml
+    import argparse
+    from universe import load_universe
+    from interval_reconcile import load_intraday
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Resident intraday validation service")
+    parser.add_argument("--interval", help="Bar interval to poll (default: watch.interval)")
+    parser.add_argument("--poll", type=float, help="Seconds between polls (default: watch.poll_seconds)")
+    parser.add_argument("--max-polls", type=int)
+    parser.add_argument("--simulate", action="store_true", help="Replay local intraday CSVs instead of polling Yahoo")
+    parser.add_argument("--warmup", type=int, default=200, help="Simulation: bars per ticker used as history before replay")
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as f:
+        pipeline = yaml.safe_load(f)['pipeline']
+    settings = pipeline['settings']
+    watch_cfg = pipeline.get('watch', {}) or {}
+    data_folder = settings['data_folder']
+    interval = args.interval or watch_cfg.get('interval', '1h')
+    poll_seconds = watch_cfg.get('poll_seconds', 60) if args.poll is None else args.poll
+
+    if args.simulate:
+        histories = {}
+        for path in sorted(glob.glob(os.path.join(data_folder, f"*_{interval}.csv"))):
+            ticker = os.path.basename(path).split("_")[0]
+            histories[ticker] = load_intraday(path)
+        tickers = list(histories)
+        # The first bars of each file play the role of history, the rest arrives bar by bar
+        warm = to_bars({t: h.iloc[:args.warmup] for t, h in histories.items()})
+        feed = SimulatedFeed({t: h.iloc[args.warmup:] for t, h in histories.items()})
+    else:
+        tickers = load_universe(pipeline)['ticker'].tolist()
+        feed = YahooFeed(tickers, interval=interval)
+
+    service = WatchService(
+        tickers, data_folder,
+        quarantine_root=settings.get('quarantine_store', f"{data_folder}/quarantine"),
+        interval_width=watch_cfg.get('interval_width', 0.95),
+        history_bars=watch_cfg.get('history_bars', 500),
+    )
+    if args.simulate:
+        service.seed(warm)
+        service.refresh_models()
+    else:
+        service.warm_start(settings.get('clean_store', f"{data_folder}/clean"))
+    service.run(feed, poll_seconds=poll_seconds, max_polls=args.max_polls,
+                model_refresh_seconds=watch_cfg.get('model_refresh_seconds', 300))
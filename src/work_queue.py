@@ -0,0 +1,217 @@
+import os
+import json
+import heapq
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger("WorkQueue")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    run_id        TEXT NOT NULL,
+    shard_id      INTEGER NOT NULL,
+    tickers       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    worker_id     TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    processed     INTEGER NOT NULL DEFAULT 0,
+    failures      INTEGER NOT NULL DEFAULT 0,
+    est_cost      REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, shard_id)
+);
+
+CREATE TABLE IF NOT EXISTS queue_runs (
+    run_id  TEXT PRIMARY KEY,
+    payload TEXT NOT NULL
+);
+"""
+
+def open_queue(db_path):
+    """
+    Open (or create) the shared job queue.
+    Plain SQLite file in WAL mode, shared by the worker processes of one host. WAL needs shared
+    memory, so the file must be on a local disk: SQLite locking is not safe on network filesystems.
+    """
+    folder = os.path.dirname(db_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+
+    con = sqlite3.connect(db_path, timeout=60, isolation_level=None, check_same_thread=False)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=FULL")
+    con.executescript(SCHEMA)
+
+    # Queues created before cost-aware scheduling have no est_cost column
+    columns = [row[1] for row in con.execute("PRAGMA table_info(shards)")]
+    if 'est_cost' not in columns:
+        con.execute("ALTER TABLE shards ADD COLUMN est_cost REAL NOT NULL DEFAULT 0")
+    return con
+
+def enqueue_run(con, run_id, tickers, shard_size, payload, costs=None):
+    """
+    Split the ticker universe into shards and publish them with the shared run payload
+    (dates, benchmark files...). Re-enqueueing an existing run is a no-op.
+
+    costs: optional {ticker: expected seconds}. Tickers are then packed into balanced shards
+    (see pack_shards) and workers claim the most expensive shard first.
+    """
+    if con.execute("SELECT 1 FROM queue_runs WHERE run_id = ?", (run_id,)).fetchone():
+        logger.info(f"Run {run_id} already enqueued")
+        return 0
+
+    costs = costs or {}
+    if costs:
+        shards = pack_shards(tickers, costs, shard_size)
+    else:
+        shards = [tickers[i:i + shard_size] for i in range(0, len(tickers), shard_size)]
+
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        con.execute("INSERT INTO queue_runs (run_id, payload) VALUES (?, ?)", (run_id, json.dumps(payload)))
+        con.executemany(
+            "INSERT INTO shards (run_id, shard_id, tickers, est_cost) VALUES (?, ?, ?, ?)",
+            [(run_id, i, json.dumps(shard), sum(costs.get(t, 0) for t in shard)) for i, shard in enumerate(shards)],
+        )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+    logger.info(f"Enqueued {len(tickers)} tickers as {len(shards)} shards for run {run_id}")
+    return len(shards)
+
+def pack_shards(tickers, costs, shard_size):
+    """
+    Greedy LPT bin packing: the next most expensive ticker goes into the currently cheapest
+    shard that still has room, so heavy (e.g. Prophet) tickers are spread over the shards
+    instead of all landing in the first one. Shards are returned most expensive first.
+    """
+    n_shards = -(-len(tickers) // shard_size)
+    shards = [[] for _ in range(n_shards)]
+    loads = [(0.0, i) for i in range(n_shards)]
+    for t in sorted(tickers, key=lambda t: costs.get(t, 0), reverse=True):
+        load, i = heapq.heappop(loads)
+        shards[i].append(t)
+        if len(shards[i]) < shard_size:
+            heapq.heappush(loads, (load + costs.get(t, 0), i))
+    return sorted(shards, key=lambda shard: sum(costs.get(t, 0) for t in shard), reverse=True)
+
+def run_payload(con, run_id):
+    row = con.execute("SELECT payload FROM queue_runs WHERE run_id = ?", (run_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def claim_shard(con, run_id, worker_id, lease_seconds, max_attempts=3):
+    """
+    Atomically lease the next pending shard (or one whose lease expired because its
+    worker died). Returns (shard_id, tickers) or None when nothing is claimable.
+    """
+    now = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        # Shards that keep killing their workers are parked instead of retried forever
+        con.execute(
+            """
+            UPDATE shards SET status = 'failed', worker_id = NULL
+            WHERE run_id = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?
+            """,
+            (run_id, now, max_attempts),
+        )
+        row = con.execute(
+            """
+            SELECT shard_id, tickers, status FROM shards
+            WHERE run_id = ?
+              AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+            ORDER BY est_cost DESC, shard_id
+            LIMIT 1
+            """,
+            (run_id, now),
+        ).fetchone()
+
+        if row is None:
+            con.execute("COMMIT")
+            return None
+
+        shard_id, tickers, status = row
+        con.execute(
+            """
+            UPDATE shards SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1
+            WHERE run_id = ? AND shard_id = ?
+            """,
+            (worker_id, now + lease_seconds, run_id, shard_id),
+        )
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+
+    if status == 'leased':
+        logger.warning(f"Reclaimed shard {shard_id} of run {run_id} after lease expiry")
+    return shard_id, json.loads(tickers)
+
+def claimable_shards(con, run_id):
+    """
+    (shards claim_shard would hand out now, earliest expiry of the leases still held or None).
+    Lets the coordinator start a replacement worker only when there is work for it.
+    """
+    now = time.time()
+    claimable, next_expiry = con.execute(
+        """
+        SELECT COALESCE(SUM(status = 'pending' OR (status = 'leased' AND lease_expires < ?)), 0),
+               MIN(CASE WHEN status = 'leased' AND lease_expires >= ? THEN lease_expires END)
+        FROM shards WHERE run_id = ?
+        """,
+        (now, now, run_id),
+    ).fetchone()
+    return int(claimable), next_expiry
+
+def heartbeat(con, run_id, shard_id, worker_id, lease_seconds):
+    """Extend the lease. Returns False if the shard was reclaimed by someone else."""
+    cur = con.execute(
+        """
+        UPDATE shards SET lease_expires = ?
+        WHERE run_id = ? AND shard_id = ? AND worker_id = ? AND status = 'leased'
+        """,
+        (time.time() + lease_seconds, run_id, shard_id, worker_id),
+    )
+    return cur.rowcount == 1
+
+def complete_shard(con, run_id, shard_id, worker_id, processed, failures):
+    """Mark a shard done with its circuit breaker counts (only the current lease holder can)"""
+    cur = con.execute(
+        """
+        UPDATE shards SET status = 'done', processed = ?, failures = ?, lease_expires = NULL
+        WHERE run_id = ? AND shard_id = ? AND worker_id = ? AND status = 'leased'
+        """,
+        (processed, failures, run_id, shard_id, worker_id),
+    )
+    return cur.rowcount == 1
+
+def cancel_pending(con, run_id):
+    """Stop handing out work (e.g. the global circuit breaker tripped)"""
+    con.execute("UPDATE shards SET status = 'cancelled' WHERE run_id = ? AND status = 'pending'", (run_id,))
+
+def reset_unfinished(con, run_id):
+    """Put failed/cancelled shards back in the queue, used when a run is resumed"""
+    con.execute(
+        "UPDATE shards SET status = 'pending', worker_id = NULL, attempts = 0 WHERE run_id = ? AND status IN ('failed', 'cancelled')",
+        (run_id,),
+    )
+
+def queue_status(con, run_id):
+    """{status: shard count} plus the summed processed/failures of finished shards"""
+    counts = dict(con.execute(
+        "SELECT status, COUNT(*) FROM shards WHERE run_id = ? GROUP BY status", (run_id,)
+    ).fetchall())
+    processed, failures = con.execute(
+        "SELECT COALESCE(SUM(processed), 0), COALESCE(SUM(failures), 0) FROM shards WHERE run_id = ? AND status = 'done'",
+        (run_id,),
+    ).fetchone()
+    counts['processed'] = processed
+    counts['failures'] = failures
+    return counts
+
+def shard_costs(con, run_id):
+    """{shard_id: estimated seconds} for the makespan prediction"""
+    return dict(con.execute("SELECT shard_id, est_cost FROM shards WHERE run_id = ?", (run_id,)).fetchall())
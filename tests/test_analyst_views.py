@@ -0,0 +1,68 @@
+import pytest
+import os
+import sys
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from analyst_views import write_clean, materialize, DEFAULT_VIEWS
+from quarantine_store import build_quarantine_batch, append_quarantine_batch
+from dashboard_data import cache_stats, invalidate
+
+def make_store(root):
+    clean_root = os.path.join(root, "clean")
+    idx = pd.date_range(end=pd.Timestamp.today().normalize(), periods=40, freq="D", name="Date")
+    for ticker, price in [("AAPL", 200.0), ("EURUSD=X", 1.1)]:
+        write_clean(clean_root, ticker, pd.DataFrame({'Close': price, 'Volume': 1.0}, index=idx))
+    universe = pd.DataFrame({
+        'ticker': ["AAPL", "EURUSD=X"], 'asset_class': ["equity", "fx"],
+        'exchange': ["XNYS", "FX"], 'interval': ["1d", "1d"],
+    })
+    return clean_root, universe
+
+# Test 1 Views are computed from the clean store on demand, with filters
+def test_views_over_clean_store(tmp_path):
+    invalidate()
+    clean_root, universe = make_store(str(tmp_path))
+
+    week = materialize("last_7_days", clean_root, universe=universe, ticker="EURUSD=X")
+    assert set(week['ticker']) == {"EURUSD=X"}
+    assert len(week) == 8   # today and the 7 days before
+
+    fx = materialize("by_asset_class", clean_root, universe=universe, asset_class="fx")
+    assert len(fx) == 40 and (fx['Close'] == 1.1).all()
+
+    # No quarantine store yet: the flagged view is empty rather than failing
+    assert materialize("flagged", clean_root, str(tmp_path / "missing"), universe=universe).empty
+
+# Test 2 Repeated requests are served from the cache until the clean store changes
+def test_materialize_cache(tmp_path):
+    invalidate()
+    clean_root, universe = make_store(str(tmp_path))
+
+    materialize("last_month", clean_root, universe=universe)
+    hits = cache_stats()['hits']
+    materialize("last_month", clean_root, universe=universe)
+    assert cache_stats()['hits'] == hits + 1
+
+    with pytest.raises(ValueError):
+        materialize("no_such_view", clean_root, universe=universe)
+
+# Test 3 New quarantine records, universe changes and edited view SQL each invalidate the cached result
+def test_materialize_cache_inputs(tmp_path):
+    invalidate()
+    clean_root, universe = make_store(str(tmp_path))
+    store = str(tmp_path / "quarantine")
+
+    def flag(run_id, day):
+        q = pd.DataFrame({'Close': 200.0, 'qa_reason': ["Logic Error: High < Low"]}, index=pd.DatetimeIndex([day], name="Date"))
+        append_quarantine_batch(build_quarantine_batch(q, run_id, "AAPL"), store, "2026-01-10", part_key=f"{run_id}_AAPL")
+
+    flag("r1", "2026-01-05")
+    assert len(materialize("flagged", clean_root, store, universe=universe)) == 1
+    flag("r2", "2026-01-06")    # same run_date partition, the store root is unchanged
+    assert len(materialize("flagged", clean_root, store, universe=universe)) == 2
+
+    moved = universe.assign(asset_class=["etf", "fx"])
+    assert set(materialize("flagged", clean_root, store, universe=moved)['asset_class']) == {"etf"}
+
+    edited = dict(DEFAULT_VIEWS, flagged="SELECT ticker FROM quarantine WHERE ts >= '2026-01-06'")
+    assert len(materialize("flagged", clean_root, store, universe=universe, views=edited)) == 1
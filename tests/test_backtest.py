@@ -0,0 +1,53 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from backtest import run_backtest, cutoff_positions
+
+def random_walks(n, length, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2023-01-01", periods=length)
+    return {f"T{i}": pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, length))), index=idx) for i in range(n)}
+
+# Test 1 Cutoffs leave a full horizon and an initial training window
+def test_cutoff_positions():
+    pos = cutoff_positions(500, 20, 30)
+    assert len(pos) == 20 and pos == sorted(pos)
+    assert pos[0] >= 250 and pos[-1] == 500 - 30 - 1
+    assert cutoff_positions(40, 20, 30) == []
+
+# Test 2 Out-of-sample coverage + cache by data hash
+def test_backtest_batch_engine_and_cache(tmp_path):
+    series = random_walks(6, 400)
+    engines = {t: "ets" for t in series}
+    cache = str(tmp_path / "bt")
+
+    cv, summary = run_backtest(series, engines, cache, n_cutoffs=5, horizon=10, workers=2)
+    assert set(summary.index) == set(series)
+    assert (summary['cutoffs'] == 5).all()
+    assert len(cv) == 6 * 5 * 10
+    assert (cv['ds'] > cv['cutoff']).all()
+    # Random walks: the 95% band should cover most out-of-sample bars
+    assert summary['coverage'].mean() > 0.8
+    assert np.allclose(summary['alert_rate'], 1 - summary['coverage'])
+
+    # Unchanged data -> served from cache; a revised series is recomputed
+    files = set(os.listdir(cache))
+    series["T0"].iloc[-1] *= 1.01
+    cv2, summary2 = run_backtest(series, engines, cache, n_cutoffs=5, horizon=10, workers=2)
+    assert len(set(os.listdir(cache)) - files) == 1
+    assert summary2.drop("T0").equals(summary.drop("T0"))
+
+# Test 3 A ticker's batch-engine backtest does not depend on the tickers recomputed with it
+def test_batch_cutoffs_per_ticker(tmp_path):
+    series = random_walks(2, 400)
+    series["T1"] = series["T1"].iloc[:300]
+    engines = {t: "ets" for t in series}
+
+    together, _ = run_backtest(series, engines, str(tmp_path / "a"), n_cutoffs=5, horizon=10, workers=1)
+    solo, _ = run_backtest({"T1": series["T1"]}, engines, str(tmp_path / "b"), n_cutoffs=5, horizon=10, workers=1)
+    short = together[together['ticker'] == "T1"].sort_values(['cutoff', 'ds'], ignore_index=True)
+    assert short['cutoff'].nunique() == 5
+    pd.testing.assert_frame_equal(short, solo.sort_values(['cutoff', 'ds'], ignore_index=True))
@@ -0,0 +1,43 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from batch_forecast import forecast_batch, BATCH_ENGINES
+
+def random_walks(n, length, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2024-01-01", periods=length)
+    return {f"T{i}": pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, length))), index=idx) for i in range(n)}
+
+# Test 1 Same output contract as Prophet for every engine
+@pytest.mark.parametrize("engine", BATCH_ENGINES)
+def test_forecast_contract_and_coverage(engine):
+    """History + horizon rows per ticker, ordered band, ~95% in-sample coverage"""
+    series = random_walks(50, 300)
+    series["SHORT"] = series["T0"].iloc[-40:]
+    forecasts, summary = forecast_batch(series, engine, horizon=10)
+
+    assert list(forecasts.columns) == ['ticker', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    assert forecasts.groupby('ticker').size().to_dict() == {**{f"T{i}": 310 for i in range(50)}, "SHORT": 50}
+
+    t1 = forecasts[forecasts['ticker'] == "T1"]
+    assert (t1['ds'].iloc[:300].to_numpy() == series["T1"].index.to_numpy()).all()
+    assert t1['ds'].is_monotonic_increasing
+    future = t1.iloc[300:]
+    assert (future['yhat_lower'] <= future['yhat']).all() and (future['yhat'] <= future['yhat_upper']).all()
+
+    fitted = t1.iloc[:300].dropna()
+    actual = series["T1"].loc[fitted['ds']].to_numpy()
+    coverage = ((actual >= fitted['yhat_lower'].to_numpy()) & (actual <= fitted['yhat_upper'].to_numpy())).mean()
+    assert 0.9 <= coverage <= 0.99
+    assert summary.loc["T1", 'mape_percent'] < 5
+
+# Test 2 A broken last print is flagged
+def test_latest_jump_is_anomaly():
+    series = random_walks(20, 300, seed=1)
+    series["T3"].iloc[-1] *= 1.25
+    _, summary = forecast_batch(series, "ets")
+    assert bool(summary.loc["T3", 'is_anomaly'])
+    assert summary['is_anomaly'].sum() <= 4
@@ -0,0 +1,41 @@
+import pytest
+import os
+import sys
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import dashboard_data
+
+# Test 1 Memoized by file identity
+def test_reports_cached_until_file_changes(tmp_path):
+    """Repeated rerenders hit the cache, an overwritten report is reloaded"""
+    dashboard_data.invalidate()
+    folder = str(tmp_path)
+    pd.DataFrame({'Ticker': ["A"], 'qa_reason': ["x"], 'Close': [1.0]}).to_csv(f"{folder}/QUARANTINE_REPORT_2026_01_01.csv", index=False)
+    pd.DataFrame({'Ticker': ["B"], 'qa_reason': ["y"], 'Close': [2.0]}).to_csv(f"{folder}/QUARANTINE_REPORT_2026_01_02.csv", index=False)
+
+    path, df = dashboard_data.latest_report(folder)
+    assert path.endswith("2026_01_02.csv") and df['Ticker'].iloc[0] == "B"
+    assert dashboard_data.latest_report(folder)[1] is df  # served from cache
+
+    pd.DataFrame({'Ticker': ["C", "D"], 'qa_reason': ["z", "z"], 'Close': [3.0, 4.0]}).to_csv(path, index=False)
+    assert list(dashboard_data.latest_report(folder)[1]['Ticker']) == ["C", "D"]
+
+# Test 2 Bounded size and publish invalidation
+def test_lru_bound_and_publish_invalidation(tmp_path):
+    dashboard_data.invalidate()
+    dashboard_data.set_max_entries(2)
+    try:
+        for i in range(3):
+            dashboard_data.cached(("k", i), lambda: i)
+        assert dashboard_data.cache_stats()['entries'] == 2
+
+        folder = str(tmp_path)
+        dashboard_data.publish_run(folder, "run1")
+        assert dashboard_data.check_published(folder)['run_id'] == "run1"
+        dashboard_data.cached(("k", 99), lambda: 99)
+
+        dashboard_data.publish_run(folder, "run2")
+        assert dashboard_data.check_published(folder)['run_id'] == "run2"
+        assert ("k", 99) not in dashboard_data._CACHE
+    finally:
+        dashboard_data.set_max_entries(32)
@@ -0,0 +1,72 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from data_profiles import update_profiles, merge_profiles, summarize, detect_drift, drift_report
+from quarantine_store import reason_to_rule, RULE_DISTRIBUTION_DRIFT
+
+def make_bars(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2020-01-01", periods=n, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(1_000, 5_000, n).astype(float)}, index=idx)
+
+# Test 1 Merged partition profiles match the full history, updates only recompute new partitions
+def test_merge_and_incremental(tmp_path):
+    df = make_bars()
+    df.iloc[10, df.columns.get_loc('Close')] = np.nan
+    root = str(tmp_path)
+
+    profiles, todo = update_profiles(root, "AAA", df.iloc[:-5], "M")
+    assert len(todo) == profiles['partition'].nunique() == 46
+
+    profiles, todo = update_profiles(root, "AAA", df, "M")
+    assert todo == ["2023-10"]
+
+    stats = {c: summarize(s) for c, s in merge_profiles(profiles).items()}
+    close = df['Close'].dropna()
+    assert stats['Close']['nulls'] == 1 and stats['Close']['rows'] == len(df)
+    assert stats['Close']['mean'] == pytest.approx(close.mean())
+    assert stats['Close']['std'] == pytest.approx(close.std())
+    assert stats['Close']['skew'] == pytest.approx(close.skew(), abs=0.01)
+    assert stats['Close']['p50'] == pytest.approx(close.median(), rel=0.01)
+    assert stats['Volume']['distinct'] == pytest.approx(df['Volume'].nunique(), rel=0.05)
+
+# Test 2 A vendor unit switch and a volume collapse are flagged, the unchanged series is not
+def test_drift(tmp_path):
+    df = make_bars()
+    profiles, _ = update_profiles(str(tmp_path / "a"), "AAA", df, "M")
+    assert not detect_drift(profiles)['drifted'].any()
+    assert drift_report(detect_drift(profiles)).empty
+
+    current = df.index >= "2023-10-01"
+    df.loc[current, ['Open', 'High', 'Low', 'Close']] *= 1000
+    df.loc[current, 'Volume'] /= 20
+    profiles, _ = update_profiles(str(tmp_path / "b"), "AAA", df, "M")
+    drift = detect_drift(profiles).set_index('column')
+    assert drift.loc['Close', 'level_log10'] == pytest.approx(3, abs=0.2)
+    assert drift.loc[['Close', 'Volume'], 'drifted'].all()
+    assert not drift.loc['Return', 'drifted']
+
+    report = drift_report(drift.reset_index())
+    assert (report.index == df.index[-1]).all()
+    assert all(reason_to_rule(r) == RULE_DISTRIBUTION_DRIFT for r in report['qa_reason'])
+
+# Test 3 A stationary random walk with clustered volume (AR(1) log volume, persistence and spread
+# like BTC-USD's) is never flagged, in any month of its history
+def test_no_drift_on_stationary_history(tmp_path):
+    rng = np.random.default_rng(1)
+    df = make_bars(seed=1)
+    log_volume = np.zeros(len(df))
+    shocks = rng.normal(0, 0.4, len(df))
+    for t in range(1, len(df)):
+        log_volume[t] = 0.7 * log_volume[t - 1] + shocks[t]
+    df['Volume'] = np.round(1e6 * np.exp(log_volume))
+
+    profiles, _ = update_profiles(str(tmp_path), "AAA", df, "M")
+    for month in sorted(profiles['partition'].unique())[12:]:
+        drift = detect_drift(profiles, current=month)
+        assert not drift['drifted'].any(), drift[drift['drifted']]
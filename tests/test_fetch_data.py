@@ -0,0 +1,61 @@
+import pytest
+import os
+import sys
+import itertools
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+import fetch_data
+from fetch_data import group_ecb_keys, download_ecb_batch, load_ecb_series, split_ecb_frame, ECB_COLUMNS
+
+CURRENCIES = ["USD", "GBP", "JPY", "CHF", "SEK", "NOK", "DKK", "PLN", "CZK", "HUF", "RON", "BGN", "TRY", "AUD", "CAD",
+              "CNY", "HKD", "IDR", "ILS", "INR", "KRW", "MXN", "MYR", "NZD", "PHP", "SGD", "THB", "ZAR", "BRL", "ISK"]
+
+def fake_sdmx(known, calls, fail_multi=False):
+    """Stand-in for ecbdata.get_series: expands '+' keys and answers in the SDMX csvdata layout"""
+    def get_series(request, start=None, end=None, detail=None):
+        calls.append(request)
+        if fail_multi and "+" in request:
+            raise Exception("REQUEST ERROR 500: Internal Server Error.")
+        flow, *dims = request.split(".")
+        rows = []
+        for combo in itertools.product(*(d.split("+") for d in dims)):
+            key = ".".join([flow, *combo])
+            if key in known:
+                for day, value in zip(["2026-01-02", "2026-01-05"], ["1.1", "1.2"]):
+                    rows.append({'KEY': key, 'FREQ': combo[0], 'CURRENCY': combo[1], 'TITLE': "ECB reference rate",
+                                 'TIME_PERIOD': day, 'OBS_VALUE': value, 'OBS_STATUS': "A"})
+        if not rows:
+            raise Exception("REQUEST ERROR 404: No results found.")
+        return pd.DataFrame(rows)
+    return get_series
+
+# Test 1 Keys that differ in one dimension collapse into multi-value requests, other dataflows stay separate
+def test_group_ecb_keys():
+    keys = [f"EXR.D.{c}.EUR.SP00.A" for c in CURRENCIES] + ["ICP.M.U2.N.000000.4.ANR", "EXR.D.USD.EUR.SP00.A"]
+    requests = group_ecb_keys(keys)
+    assert len(requests) == 2
+    assert requests[0][0] == "EXR.D." + "+".join(CURRENCIES) + ".EUR.SP00.A" and len(requests[0][1]) == 30
+    assert requests[1] == ("ICP.M.U2.N.000000.4.ANR", ["ICP.M.U2.N.000000.4.ANR"])
+    assert [len(m) for _, m in group_ecb_keys(keys[:30], max_keys=20)] == [20, 10]
+
+# Test 2 One request for 30 currencies, split into typed per-series files; failures fall back to single keys
+def test_download_ecb_batch(tmp_path, monkeypatch):
+    keys = [f"EXR.D.{c}.EUR.SP00.A" for c in CURRENCIES]
+    calls = []
+    monkeypatch.setattr(fetch_data.ecbdata, "get_series", fake_sdmx(set(keys[:-1]), calls))
+    paths = download_ecb_batch(keys, "2026-01-01", "2026-01-31", str(tmp_path))
+    assert len(calls) == 1 and set(paths) == set(keys[:-1])      # the unknown ISK series is just missing
+
+    df = load_ecb_series(paths["EXR.D.USD.EUR.SP00.A"])
+    assert list(df.columns) == ECB_COLUMNS
+    assert pd.api.types.is_datetime64_any_dtype(df['TIME_PERIOD']) and df['OBS_VALUE'].dtype == float
+    assert set(df['KEY']) == {"EXR.D.USD.EUR.SP00.A"} and paths["EXR.D.USD.EUR.SP00.A"].endswith("_2026-01-31.parquet")
+
+    calls.clear()
+    monkeypatch.setattr(fetch_data.ecbdata, "get_series", fake_sdmx(set(keys[:3]), calls, fail_multi=True))
+    paths = download_ecb_batch(keys[:4], "2026-01-01", "2026-01-31", str(tmp_path))
+    assert len(calls) == 5 and set(paths) == set(keys[:3])
+
+    # A response without the value column is reported, not written as an empty series
+    with pytest.raises(ValueError, match="OBS_VALUE"):
+        split_ecb_frame(pd.DataFrame({'TIME_PERIOD': ["2026-01-02"]}), keys[:1], "2026-01-01", "2026-01-31", str(tmp_path))
@@ -0,0 +1,61 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from interval_reconcile import aggregate_sessions, reconcile_intervals, load_intraday
+
+def make_hourly(days=5):
+    # NYSE bars 09:00-16:00 New York time, 09:00 is pre-market and must be ignored
+    stamps = [
+        pd.Timestamp(f"2025-03-{d:02d} {h:02d}:30", tz="America/New_York")
+        for d in range(3, 3 + days) for h in range(9, 16)
+    ]
+    idx = pd.DatetimeIndex(stamps).tz_convert("UTC")
+    n = len(idx)
+    price = 100 + np.arange(n, dtype=float)
+    return pd.DataFrame({'Open': price, 'High': price + 2, 'Low': price - 1, 'Close': price + 1, 'Volume': 10.0}, index=idx)
+
+# Test 1 Session aggregation: first open, max high, min low, last close, summed volume
+def test_aggregate_sessions():
+    hourly = make_hourly()
+    sessions = aggregate_sessions(hourly, 'XNYS')
+
+    assert len(sessions) == 5
+    first = sessions.iloc[0]
+    # 09:30 ... 15:30 local are in the session (7 bars), opening at 09:30 = the 1st bar of the day
+    assert first['bars'] == 7
+    assert first['Open'] == 100.0
+    assert first['High'] == 108.0
+    assert first['Low'] == 99.0
+    assert first['Close'] == 107.0
+    assert first['Volume'] == 70.0
+
+# Test 2 One join against the daily bars flags only the day that disagrees
+def test_reconcile_flags_mismatch():
+    hourly = make_hourly()
+    sessions = aggregate_sessions(hourly, 'XNYS')
+    daily = sessions.drop(columns='bars').copy()
+    daily.index = pd.date_range("2025-03-03", periods=5, freq="D")
+    daily.loc["2025-03-05", 'Close'] *= 1.02
+
+    mismatches, compared = reconcile_intervals(hourly, daily, 'XNYS')
+
+    # First and last (possibly partial) sessions are not compared
+    assert len(compared) == 3
+    assert list(mismatches.index) == [pd.Timestamp("2025-03-05")]
+    assert mismatches['qa_reason'].iloc[0].startswith("Interval Mismatch: Close")
+
+# Test 3 Raw yfinance layout (Price / Ticker / Datetime header lines)
+def test_load_intraday_multiheader(tmp_path):
+    path = tmp_path / "X_1h.csv"
+    path.write_text(
+        "Price,Close,High,Low,Open,Volume\n"
+        "Ticker,X,X,X,X,X\n"
+        "Datetime,,,,,\n"
+        "2025-03-03 14:30:00+00:00,1.5,2,1,1.2,100\n"
+    )
+    df = load_intraday(path)
+    assert str(df.index.tz) == "UTC"
+    assert df['Close'].iloc[0] == 1.5
@@ -0,0 +1,77 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from peer_correlation import RollingCorrelation, update_peer_check, decoupling_report
+from analyst_views import write_clean
+from quarantine_store import reason_to_rule, RULE_PEER_DECOUPLING
+
+def make_group(root, n_bars=300, break_at=None, seed=0):
+    """Four tickers driven by one factor; P3's feed is replaced by unrelated noise from break_at on"""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2024-01-02", periods=n_bars, name="Date")
+    factor = rng.normal(0, 0.01, n_bars)
+    for i in range(4):
+        r = factor + rng.normal(0, 0.005, n_bars)
+        if break_at is not None and i == 3:
+            r[break_at:] = rng.normal(0, 0.01, n_bars - break_at)
+        write_clean(root, f"P{i}", pd.DataFrame({'Close': 100 * np.exp(np.cumsum(r))}, index=idx))
+    return pd.DataFrame({'ticker': [f"P{i}" for i in range(4)], 'asset_class': "equity", 'interval': "1d"}), idx
+
+# Test 1 Running sums with ragged calendars match a pairwise-complete recompute of the window
+def test_running_sums_match_recompute():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0, 0.01, (200, 5))
+    returns[rng.random(returns.shape) < 0.1] = np.nan
+    returns[150:, 4] = 0.0   # stale feed
+
+    state = RollingCorrelation(list("ABCDE"), window=40, block_size=2)
+    for t, row in enumerate(returns):
+        state.push(t, row)
+    exact = pd.DataFrame(returns[-40:]).corr(min_periods=20).to_numpy()
+    corr = state.correlation(min_obs=20)
+    assert np.allclose(corr[:4, :4], exact[:4, :4], equal_nan=True)
+    assert (corr[4, :4] == 0).all()
+
+# Test 2 A feed that stops co-moving with its peers is flagged, incremental runs resume from the state
+def test_decoupling_flagged_incrementally(tmp_path):
+    clean, state = str(tmp_path / "clean"), str(tmp_path / "peers.npz")
+    universe, idx = make_group(clean, break_at=250)
+
+    # First run sees the history up to the break: nothing to flag
+    for ticker in universe['ticker']:
+        close = pd.read_parquet(os.path.join(clean, f"{ticker}.parquet"))
+        write_clean(clean, ticker, close.iloc[:240])
+    assert update_peer_check(state, clean, universe).empty
+
+    # Next run only pushes the new bars and flags P3 after the break
+    make_group(clean, break_at=250)
+    flags = update_peer_check(state, clean, universe)
+    assert set(flags['ticker']) == {"P3"}
+    assert flags['Date'].min() > idx[250] and flags['Date'].min() < idx[280]
+    assert (flags['baseline'] > 0.6).all()
+
+    report = decoupling_report(flags, "P3", 30)
+    assert reason_to_rule(report['qa_reason'].iloc[0]) == RULE_PEER_DECOUPLING
+    assert update_peer_check(state, clean, universe).empty   # nothing new to push
+
+# Test 3 A universe change rebuilds the state but only flags bars the previous state had not seen
+def test_rebuild_does_not_reflag_history(tmp_path):
+    clean, state = str(tmp_path / "clean"), str(tmp_path / "peers.npz")
+    universe, idx = make_group(clean, break_at=250)
+    for ticker in universe['ticker']:
+        close = pd.read_parquet(os.path.join(clean, f"{ticker}.parquet"))
+        write_clean(clean, ticker, close.iloc[:291])
+    assert not update_peer_check(state, clean, universe).empty   # P3 flagged up to idx[290]
+
+    # P4 joins the universe: full rebuild, the flagged history is not reported twice
+    write_clean(clean, "P4", pd.read_parquet(os.path.join(clean, "P0.parquet")))
+    universe = pd.concat([universe, pd.DataFrame({'ticker': ["P4"], 'asset_class': "equity", 'interval': "1d"})], ignore_index=True)
+    assert update_peer_check(state, clean, universe).empty
+
+    # The bars after the rebuild are flagged as usual
+    make_group(clean, break_at=250)
+    flags = update_peer_check(state, clean, universe)
+    assert set(flags['ticker']) == {"P3"} and flags['Date'].min() == idx[291]
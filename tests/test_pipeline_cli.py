@@ -0,0 +1,129 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from pipeline_cli import config, select_universe, plan_stage, window_params, run_validate, run_report, run_forecast
+from run_journal import open_journal, start_run, record_stage
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Point every store of the config at a temp folder"""
+    settings = dict(config['pipeline']['settings'], data_folder=str(tmp_path), clean_store=str(tmp_path / "clean"),
+                    quarantine_store=str(tmp_path / "quarantine"), revision_store=str(tmp_path / "revisions"),
+                    profile_store=str(tmp_path / "profiles"), snapshot_store=str(tmp_path / "snapshots"),
+                    residual_store=str(tmp_path / "residual_scores"))
+    monkeypatch.setitem(config['pipeline'], 'settings', settings)
+    return tmp_path, open_journal(str(tmp_path / "journal.db"))
+
+def make_universe():
+    return pd.DataFrame({'ticker': ["AAPL", "EURUSD=X", "GBPUSD=X", "BTC-USD"],
+                         'interval': ["1d", "1d", "1h", "1d"], 'exchange': ["XNYS", "FX", "FX", "CRYPTO"],
+                         'benchmark_key': [None, "EXR.D.USD.EUR.SP00.A", None, None],
+                         'ml': [False, True, False, False], 'engine': [None, "ets", None, None]})
+
+# Test 1 Ticker patterns and intervals select the universe, the dry-run plan names the stored inputs it reuses
+def test_selection_and_plan(stores):
+    tmp_path, journal = stores
+    universe = make_universe()
+    assert select_universe(universe, ["*USD=X"])['ticker'].tolist() == ["EURUSD=X", "GBPUSD=X"]
+    assert select_universe(universe, ["*USD*"], ["1d"])['ticker'].tolist() == ["EURUSD=X", "BTC-USD"]
+
+    raw = tmp_path / "EURUSD=X.csv"
+    raw.write_text("Date,Close\n2026-01-02,1.1\n")
+    start_run(journal, "r1", {})
+    record_stage(journal, "r1", "EURUSD=X", "ingest", artifact=str(raw))
+
+    selected = select_universe(universe, ["EURUSD=X", "AAPL"])
+    plan = plan_stage(journal, "validate", selected, window_params()).set_index('ticker')
+    assert plan.loc["EURUSD=X", 'input'] == str(raw)
+    assert "run ingest first" in plan.loc["AAPL", 'action']
+    plan = plan_stage(journal, "forecast", selected, window_params())
+    assert plan['action'].str.contains("run validate first").all()
+
+# Test 2 validate reuses the latest download, report reads the quarantine store for the selection and window
+def test_validate_then_report(stores):
+    tmp_path, journal = stores
+    raw = tmp_path / "AAPL.csv"
+    pd.DataFrame({'Date': ["2026-01-05", "2026-01-06", "2026-01-07"], 'Open': [10.0, 10.0, 10.0],
+                  'High': [11.0, 9.0, 11.0], 'Low': [9.0, 10.0, 9.0], 'Close': [10.0, 9.5, 10.5],
+                  'Volume': [100, 100, 100]}).to_csv(raw, index=False)
+    start_run(journal, "r1", {})
+    record_stage(journal, "r1", "AAPL", "ingest", artifact=str(raw))
+
+    selected = select_universe(make_universe(), ["AAPL"])
+    params = window_params("2026-01-05", "2026-01-07")
+    start_run(journal, "adhoc-validate", params)
+    assert run_validate(journal, "adhoc-validate", params, selected) == 0
+    assert len(pd.read_parquet(tmp_path / "clean" / "AAPL.parquet")) == 2
+
+    plan = plan_stage(journal, "forecast", selected, params)
+    assert plan['input'].iloc[0].endswith("AAPL.parquet")
+
+    n, out = run_report(params, selected, run_id="adhoc-validate", out=str(tmp_path / "report.csv"))
+    report = pd.read_csv(out)
+    assert n == 1 and report['Date'].iloc[0].startswith("2026-01-06") and "High < Low" in report['qa_reason'].iloc[0]
+    assert run_report(window_params("2026-01-07", "2026-01-07"), selected, out=str(tmp_path / "empty.csv"))[0] == 0
+
+# Test 3 The clean store keeps the unit-corrected prices, a series no unit fix can explain is an issue
+def test_validate_stores_corrected_units(stores):
+    tmp_path, journal = stores
+    idx = pd.bdate_range("2025-06-02", periods=60)
+    eur = 1.1 + 0.001 * (pd.Series(range(60)) % 7).to_numpy()
+    close = np.r_[eur[:40], eur[40:] * 1000]                   # vendor switches to mEUR
+    raw = tmp_path / "EURUSD.csv"
+    pd.DataFrame({'Date': idx, 'Open': close, 'High': close * 1.001, 'Low': close * 0.999, 'Close': close,
+                  'Volume': 1}).to_csv(raw, index=False)
+    start_run(journal, "r1", {})
+    record_stage(journal, "r1", "EURUSD=X", "ingest", artifact=str(raw))
+
+    selected = select_universe(make_universe(), ["EURUSD=X"])
+    assert run_validate(journal, "r1", window_params(), selected) == 0
+    assert np.allclose(pd.read_parquet(tmp_path / "clean" / "EURUSD=X.parquet")['Close'], eur)
+
+    pd.DataFrame({'Date': idx, 'Open': 60000.0, 'High': 60100.0, 'Low': 59900.0, 'Close': 60000.0,
+                  'Volume': 1}).to_csv(raw, index=False)
+    record_stage(journal, "r1", "EURUSD=X", "ingest", artifact=str(raw))
+    assert run_validate(journal, "r1", window_params(), selected) == 1
+
+# Test 4 A clean history no unit fix can explain is skipped and counted, not a crash of the whole stage
+def test_forecast_skips_unusable_history(stores):
+    tmp_path, journal = stores
+    idx = pd.bdate_range("2025-06-02", periods=60, name="Date")
+    (tmp_path / "clean").mkdir()
+    pd.DataFrame({'Close': 60000.0, 'High': 60100.0, 'Low': 59900.0}, index=idx).to_parquet(tmp_path / "clean" / "EURUSD=X.parquet")
+    start_run(journal, "r1", {})
+    selected = select_universe(make_universe(), ["EURUSD=X"])
+    assert run_forecast(journal, "r1", window_params(), selected) == 1
+
+# Test 5 validate runs the pipeline's stages: revisions before the checks, snapshot, profiles, and a window keeps the rest
+def test_validate_shares_pipeline_stages(stores):
+    tmp_path, journal = stores
+    idx = pd.bdate_range("2026-01-05", periods=30)
+    close = 100 + np.arange(30) * 0.1
+    raw = tmp_path / "AAPL.csv"
+    frame = lambda c: pd.DataFrame({'Date': idx, 'Open': c, 'High': c + 1, 'Low': c - 1, 'Close': c, 'Volume': 100})
+    frame(close).to_csv(raw, index=False)
+    start_run(journal, "r1", {})
+    record_stage(journal, "r1", "AAPL", "ingest", artifact=str(raw))
+    selected = select_universe(make_universe(), ["AAPL"])
+    assert run_validate(journal, "r1", window_params(), selected) == 0
+    assert (tmp_path / "profiles").exists() and (tmp_path / "snapshots").exists()
+
+    # Vendor restates a bar into a High < Low: both the revision and the logic failure are reported
+    restated = close.copy()
+    restated[20] = 150.0
+    bad = frame(restated)
+    bad.loc[20, 'High'] = 140.0
+    bad.to_csv(raw, index=False)
+    params = window_params("2026-01-26", "2026-02-13")
+    start_run(journal, "r2", params)
+    assert run_validate(journal, "r2", params, selected, "2026-01-26", "2026-02-13") == 0
+    n, out = run_report(window_params("2026-01-01", "2026-02-28"), selected, run_id="r2", out=str(tmp_path / "r2.csv"))
+    reasons = pd.read_csv(out)['qa_reason']
+    assert reasons.str.startswith("Vendor Revision").sum() == 1 and reasons.str.contains("High < Low").sum() == 1
+
+    # Bars before the window stay in the clean store, the failing bar is dropped
+    stored = pd.read_parquet(tmp_path / "clean" / "AAPL.parquet")
+    assert len(stored) == 29 and stored.index.min() == idx[0]
@@ -0,0 +1,93 @@
+import pytest
+import os
+import sys
+import json
+import threading
+import http.client
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from quality_service import QualityService, build_index, make_server, parse_window
+from quarantine_store import build_quarantine_batch, append_quarantine_batch
+from analyst_views import write_clean
+from dashboard_data import publish_run
+
+def make_run(tmp_path, run_id, flags):
+    """Clean store for AAA/BBB over 6 business days and one quarantine batch per ticker"""
+    idx = pd.bdate_range("2025-03-03", periods=6, name="Date")
+    clean_root, store = str(tmp_path / "clean"), str(tmp_path / "quarantine")
+    for ticker in ["AAA", "BBB"]:
+        write_clean(clean_root, ticker, pd.DataFrame({'Close': 100.0}, index=idx))
+    for ticker, rows in flags.items():
+        q = pd.DataFrame({'Close': 100.0, 'qa_reason': [r for _, r in rows]},
+                         index=pd.DatetimeIndex([d for d, _ in rows], name="Date"))
+        append_quarantine_batch(build_quarantine_batch(q, run_id, ticker), store, "2025-03-10", part_key=f"{run_id}_{ticker}")
+    publish_run(str(tmp_path), run_id)
+    return store, clean_root
+
+# Test 1 Bar status, tickers failing a rule in a window and clean ranges from the bitmaps
+def test_index_queries(tmp_path):
+    store, clean_root = make_run(tmp_path, "run1", {
+        "AAA": [("2025-03-05", "ML Anomaly: z=4.1"), ("2025-03-05", "Logic Error: Volume <= 0")],
+        "BBB": [("2025-03-06", "ML Anomaly: z=3.2"), ("2025-03-11", "Missing Bar: no 1d bar on the XNYS calendar")],
+    })
+    index = build_index(store, clean_root, "run1")
+
+    bar = index.bar_status("AAA", *parse_window(date="2025-03-05"))
+    assert bar['clean'] is False and sorted(bar['rules']) == ["Logic Error: Volume <= 0", "ML Anomaly"] and bar['severity'] == "ERROR"
+    assert index.bar_status("AAA", *parse_window(date="2025-03-04"))['clean'] is True
+    assert index.bar_status("BBB", *parse_window(date="2025-03-11"))['known'] is False
+
+    assert index.failing(16, *parse_window("2025-03-01", "2025-03-31")) == {"AAA": 1, "BBB": 1}
+    assert index.failing(16, *parse_window("2025-03-06", "2025-03-06")) == {"BBB": 1}
+
+    assert index.clean_ranges("AAA", *parse_window()) == [
+        ["2025-03-03T00:00:00", "2025-03-04T00:00:00"], ["2025-03-06T00:00:00", "2025-03-10T00:00:00"],
+    ]
+    assert index.clean_ranges("BBB", *parse_window("2025-03-07", "2025-03-31")) == [
+        ["2025-03-07T00:00:00", "2025-03-10T00:00:00"],
+    ]
+
+# Test 2 HTTP endpoints and atomic hot reload after a new run is published
+def test_http_reload(tmp_path):
+    store, clean_root = make_run(tmp_path, "run1", {"AAA": [("2025-03-05", "ML Anomaly: z=4.1")]})
+    service = QualityService(str(tmp_path), store, clean_root)
+    service.reload(force=True)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def get(path):
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        assert get("/bar?ticker=AAA&date=2025-03-05")[1]['clean'] is False
+        assert get("/failing?rule=ML%20Anomaly&start=2025-03-01")[1]['tickers'] == {"AAA": 1}
+        assert get("/failing?rule=Nope")[0] == 400
+
+        make_run(tmp_path, "run2", {"BBB": [("2025-03-04", "Logic Error: High < Low")]})
+        assert service.reload() is True and service.reload() is False
+        status, body = get("/bar?ticker=AAA&date=2025-03-05")
+        assert body['run_id'] == "run2" and body['clean'] is True
+        assert get("/failing?rule=1")[1]['tickers'] == {"BBB": 1}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+# Test 3 Event flags (peer, revision) from an earlier run stay flagged, other rules follow the latest run
+def test_event_flags_carry_over(tmp_path):
+    make_run(tmp_path, "run1", {
+        "AAA": [("2025-03-05", "Peer Decoupling: corr 0.10 vs usual 0.90 with BBB over 60 bars"),
+                ("2025-03-05", "Logic Error: Volume <= 0")],
+        "BBB": [("2025-03-04", "Vendor Revision: bar restated (Close 99 -> 100)")],
+    })
+    store, clean_root = make_run(tmp_path, "run2", {"BBB": [("2025-03-06", "ML Anomaly: z=3.2")]})
+    index = build_index(store, clean_root, "run2")
+
+    assert index.bar_status("AAA", *parse_window(date="2025-03-05"))['rules'] == ["Peer Decoupling"]
+    assert index.bar_status("BBB", *parse_window(date="2025-03-04"))['rules'] == ["Vendor Revision"]
+    assert index.failing(512, *parse_window()) == {"AAA": 1} and index.failing(2, *parse_window()) == {}
+    assert index.failing(16, *parse_window()) == {"BBB": 1}
+    # Indexing the earlier run does not see the later one
+    assert build_index(store, clean_root, "run1").failing(16, *parse_window()) == {}
@@ -0,0 +1,61 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from quarantine_store import (
+    build_quarantine_batch, append_quarantine_batch, query_quarantine, export_run_report,
+    RULE_HIGH_LT_LOW, RULE_VOLUME_NON_POSITIVE, RULE_BENCHMARK_MISMATCH
+)
+
+def _validator_output():
+    # Same shape as run_quality_checks: one row per (bar, rule)
+    return pd.DataFrame({
+        'Close': [92.0, 92.0, 100.0],
+        'qa_reason': ['Logic Error: High < Low', 'Logic Error: Volume <= 0', 'Benchmark Mismatch > 1.0%'],
+        'Benchmark': [np.nan, np.nan, 105.0],
+    }, index=pd.to_datetime(['2026-01-02', '2026-01-02', '2026-01-03']))
+
+# Test 1 Typed batch with combined rule mask
+def test_build_batch_collapses_rules_per_bar():
+    """Two failed rules on the same bar become one row with both bits set"""
+    observed = pd.DataFrame({'Open': [91.0, 99.0], 'High': [50.0, 110.0], 'Low': [95.0, 90.0], 'Volume': [-5, 1000]},
+                            index=pd.to_datetime(['2026-01-02', '2026-01-03']))
+    batch = build_quarantine_batch(_validator_output(), "run1", "TEST", observed=observed).to_pandas()
+
+    assert len(batch) == 2
+    first = batch.iloc[0]
+    assert first['rule_mask'] == RULE_HIGH_LT_LOW | RULE_VOLUME_NON_POSITIVE
+    assert first['severity'] == "ERROR"
+    assert first['high'] == 50.0
+    assert batch.iloc[1]['rule_mask'] == RULE_BENCHMARK_MISMATCH
+    assert batch.iloc[1]['benchmark'] == 105.0
+    assert batch['close'].dtype == np.float64
+
+# Test 2 Append + query across runs
+def test_append_and_query_across_runs(tmp_path):
+    """Each append is its own partition file and DuckDB sees all runs"""
+    root = str(tmp_path / "quarantine")
+    append_quarantine_batch(build_quarantine_batch(_validator_output(), "run1", "AAA"), root, "2026-01-02")
+    append_quarantine_batch(build_quarantine_batch(_validator_output(), "run2", "BBB"), root, "2026-01-03")
+
+    df = query_quarantine(root, "SELECT run_id, run_date, COUNT(*) AS n FROM quarantine GROUP BY ALL ORDER BY run_id")
+    assert list(df['run_id']) == ["run1", "run2"]
+    assert list(df['n']) == [2, 2]
+
+    report = str(tmp_path / "report.csv")
+    assert export_run_report(root, "run2", report) == 2
+    assert set(pd.read_csv(report)['Ticker']) == {"BBB"}
+
+# Test 3 Resumed run: a re-processed ticker replaces its records, and removes them once it is clean
+def test_resumed_ticker_replaces_its_part(tmp_path):
+    root = str(tmp_path / "quarantine")
+    batch = build_quarantine_batch(_validator_output(), "run1", "AAA")
+    first = append_quarantine_batch(batch, root, "2026-01-02", part_key="AAA")
+    assert append_quarantine_batch(batch, root, "2026-01-02", part_key="AAA") == first
+    assert len(query_quarantine(root)) == 2
+
+    empty = build_quarantine_batch(pd.DataFrame(), "run1", "AAA")
+    assert append_quarantine_batch(empty, root, "2026-01-02", part_key="AAA", run_id="run1") is None
+    assert not os.path.exists(first) and query_quarantine(root).empty
@@ -0,0 +1,51 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from residual_scoring import score_bars, update_scores, open_flags, load_scores
+
+def make_case(n=100):
+    idx = pd.date_range("2025-01-01", periods=n, freq="D")
+    close = pd.Series(100.0, index=idx)
+    forecast = pd.DataFrame({'ds': idx, 'yhat': 100.0, 'yhat_lower': 98.04, 'yhat_upper': 101.96})
+    return close, forecast
+
+# Test 1 Every bar is scored, flags match the band
+def test_score_bars_vectorized():
+    close, forecast = make_case()
+    close.iloc[10] = 103.92   # 2 band half-widths above -> z ~ +3.92
+    close.iloc[20] = 99.0
+    scores = score_bars(close, forecast)
+    assert len(scores) == 100
+    assert scores['flag'].sum() == 1 and bool(scores.loc[close.index[10], 'flag'])
+    assert scores.loc[close.index[10], 'z'] == pytest.approx(3.92, abs=0.01)
+    assert abs(scores.loc[close.index[20], 'z']) < 1.96
+
+# Test 2 Incremental: only new or revised bars are scored again
+def test_incremental_scoring(tmp_path):
+    store = str(tmp_path)
+    close, forecast = make_case(100)
+    close.iloc[5] = 110.0
+    assert update_scores(store, "X", close.iloc[:90], forecast, "run1") == 90
+    assert len(open_flags(store, "X")) == 1
+
+    # Next run: 10 new bars + one revised historical bar. The run1 flag is still open
+    close.iloc[50] = 95.0
+    assert update_scores(store, "X", close, forecast, "run2") == 11
+    flagged = open_flags(store, "X")
+    assert list(flagged.index) == [close.index[5], close.index[50]]
+    assert flagged['Close'].iloc[1] == 95.0 and flagged['qa_reason'].iloc[1].startswith("ML Anomaly")
+    assert flagged['qa_reason'].iloc[0].endswith("scored in run run1")
+
+    # Revised back inside the band: the flag is resolved
+    close.iloc[5] = 100.0
+    assert update_scores(store, "X", close, forecast, "run2b") == 1
+    assert list(open_flags(store, "X").index) == [close.index[50]]
+    assert open_flags(store, "X", index=close.index[:40]).empty
+
+    # Nothing new: no work, earlier run's records are still readable
+    assert update_scores(store, "X", close, forecast, "run3") == 0
+    assert len(load_scores(store, "X")) == 100
+    assert update_scores(store, "X", close, forecast, "bf", backfill=True) == 100
@@ -0,0 +1,57 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from revision_tracker import track_revisions, revision_report, revised_index, load_events, load_state
+from quarantine_store import build_quarantine_batch, RULE_VENDOR_REVISION
+from data_profiles import update_profiles, partition_keys
+
+def make_bars(idx, seed=0):
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.01, len(idx))))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Adj Close': close * 0.98, 'Volume': np.arange(len(idx)) + 1000}, index=pd.Index(idx, name='Date'))
+
+# Test 1 Restated, inserted and deleted bars are found; new bars and bars outside the window are not revisions
+def test_track_revisions(tmp_path):
+    idx = pd.bdate_range("2025-01-01", periods=300)
+    first = make_bars(idx).drop(idx[150])                     # the vendor was missing a bar
+    assert track_revisions(str(tmp_path), "AAPL", first, "r1", "2026-01-01").empty
+
+    later = pd.bdate_range("2025-01-01", periods=310)
+    second = make_bars(later).iloc[20:]                       # the window slid forward by 20 bars
+    second.loc[later[100], 'Close'] *= 1.05                   # restated close
+    second.loc[later[101], 'Volume'] += 1                     # restated volume
+    second.loc[later[102], 'Adj Close'] *= 0.9                # dividend adjustment only: not a revision
+    second = second.drop(later[200])                          # bar withdrawn
+    events = track_revisions(str(tmp_path), "AAPL", second, "r2", "2026-01-02")
+
+    assert events['kind'].tolist() == ['changed', 'changed', 'inserted', 'deleted']
+    assert list(events['ts']) == [later[100], later[101], later[150], later[200]]
+    assert events['new_close'].iloc[0] == pytest.approx(events['old_close'].iloc[0] * 1.05)
+    assert len(load_state(str(tmp_path), "AAPL")[0]) == 309   # the 20 bars that slid out keep their hash
+    # A resumed run returns the same events instead of an empty diff against its own state
+    assert track_revisions(str(tmp_path), "AAPL", second, "r2", "2026-01-02").equals(events)
+
+    batch = build_quarantine_batch(revision_report(events), "r2", "AAPL", observed=second).to_pandas()
+    assert (batch['rule_mask'] == RULE_VENDOR_REVISION).all() and (batch['severity'] == "WARNING").all()
+    assert "Close 1" in batch['qa_reason'].iloc[0] and batch['qa_reason'].iloc[3] == "Vendor Revision: bar deleted"
+    assert list(revised_index(events)) == [later[100], later[101], later[150]]
+    assert load_events(str(tmp_path), ticker="AAPL")['run_id'].unique().tolist() == ["r2"]
+
+# Test 2 The same bars downloaded again are no revision (int or float Volume),
+# and only the profile partitions holding revised bars are recomputed
+def test_unchanged_download_and_stale_partitions(tmp_path):
+    idx = pd.bdate_range("2025-01-01", periods=250)
+    make_bars(idx).to_csv(tmp_path / "raw.csv")
+    bars = pd.read_csv(tmp_path / "raw.csv", index_col='Date', parse_dates=True)
+    track_revisions(str(tmp_path / "rev"), "MSFT", bars, "r1", "2026-01-01")
+    reread = bars.astype({'Volume': float})
+    assert track_revisions(str(tmp_path / "rev"), "MSFT", reread, "r2", "2026-01-02").empty
+
+    update_profiles(str(tmp_path / "profiles"), "MSFT", bars, 'M')
+    reread.loc[idx[30], 'Close'] *= 1.1
+    revised = revised_index(track_revisions(str(tmp_path / "rev"), "MSFT", reread, "r3", "2026-01-03"))
+    _, recomputed = update_profiles(str(tmp_path / "profiles"), "MSFT", reread, 'M', stale=set(partition_keys(revised, 'M')))
+    assert sorted(recomputed) == ["2025-02", "2025-12"]       # the revised month and the latest one
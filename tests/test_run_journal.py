@@ -0,0 +1,42 @@
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from run_journal import open_journal, start_run, resume_run, finish_run, record_stage, clear_stages, completed_stage
+
+# Test 1 Checkpoint survives reopen and resume returns original params
+def test_checkpoint_and_resume(tmp_path):
+    """A finished stage is visible after reopening the journal (new process after a crash)"""
+    db = str(tmp_path / "journal.db")
+    artifact = tmp_path / "AAPL.csv"
+    artifact.write_text("Date,Close\n2026-01-01,100\n")
+
+    con = open_journal(db)
+    start_run(con, "run1", {"run_date": "2026-01-01"})
+    record_stage(con, "run1", "AAPL", "forecast", artifact=str(artifact), has_issue=True)
+    finish_run(con, "run1", "tripped")
+    con.close()
+
+    con = open_journal(db)
+    assert resume_run(con, "run1") == {"run_date": "2026-01-01"}
+    checkpoint = completed_stage(con, "run1", "AAPL", "forecast")
+    assert checkpoint == {"artifact": str(artifact), "has_issue": True}
+    assert completed_stage(con, "run1", "MSFT", "forecast") is None
+
+    # Invalidation
+    clear_stages(con, "run1", "AAPL")
+    assert completed_stage(con, "run1", "AAPL", "forecast") is None
+
+    with pytest.raises(ValueError):
+        resume_run(con, "does-not-exist")
+
+# Test 2 Fingerprint mismatch forces a re-run
+def test_changed_artifact_invalidates_stage(tmp_path):
+    """If the artifact was modified or deleted after the checkpoint, the stage is not trusted"""
+    con = open_journal(str(tmp_path / "journal.db"))
+    artifact = tmp_path / "plot.png"
+    artifact.write_bytes(b"v1")
+    record_stage(con, "run1", "EURUSD=X", "forecast", artifact=str(artifact))
+
+    artifact.write_bytes(b"v2")
+    assert completed_stage(con, "run1", "EURUSD=X", "forecast") is None
@@ -0,0 +1,46 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from scale_breaks import detect_scale_breaks, apply_scale, expected_band
+from run_pipeline3 import sanitize_index
+
+def random_walk(start, n=500, vol=0.01, seed=0):
+    return start * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, vol, n)))
+
+# Test 1 One stacked pass finds mid-series unit switches and short glitches, and only rescales those bars
+def test_segment_breaks_across_universe():
+    idx = pd.bdate_range("2024-01-01", periods=500, name="Date")
+    fx, stock, crypto = random_walk(1.1, vol=0.005), random_walk(50, vol=0.02, seed=1), random_walk(40000, vol=0.04, seed=2)
+    switched = fx.copy()
+    switched[300:] *= 1000            # vendor starts quoting in mEUR
+    glitch = stock.copy()
+    glitch[100:110] /= 100            # ten bars in cents... of a cent
+    series = {'FX': pd.Series(switched, index=idx), 'STOCK': pd.Series(glitch, index=idx),
+              'COIN': pd.Series(crypto, index=idx)}
+    bands = {'FX': expected_band('FX', 'fx', overrides={'FX': (0.5, 2.5)}), 'STOCK': expected_band('STOCK', 'equity'),
+             'COIN': expected_band('COIN', 'crypto')}
+
+    shifts, segments, unfixable = detect_scale_breaks(series, bands)
+    assert unfixable == [] and set(shifts) == {'FX', 'STOCK'}    # a 4% daily crypto vol is not a break
+    assert segments.set_index('ticker').loc['FX', 'start'] == idx[300]
+    assert segments.set_index('ticker').loc['STOCK', 'bars'] == 10
+    fixed = apply_scale(pd.DataFrame({'Close': switched, 'Volume': 1.0}, index=idx), shifts['FX'])
+    assert np.allclose(fixed['Close'], fx) and (fixed['Volume'] == 1.0).all()
+    assert np.allclose(apply_scale(pd.DataFrame({'Close': glitch}), shifts['STOCK'])['Close'], stock)
+
+# Test 2 sanitize_index fixes a series in the wrong units and rejects one that is not the instrument at all
+def test_sanitize_index_units():
+    idx = pd.bdate_range("2025-01-01", periods=200, name="Date")
+    eur = random_walk(1.1, n=200, vol=0.005)
+    in_milli = sanitize_index(pd.DataFrame({'Close': eur * 1000, 'High': eur * 1001}, index=idx), "EURUSD=X")
+    assert np.allclose(in_milli['Close'], eur) and np.allclose(in_milli['High'], eur * 1.001)
+
+    bitcoin = pd.DataFrame({'Close': random_walk(60000, n=200, vol=0.03)}, index=idx)
+    assert sanitize_index(bitcoin, "EURUSD=X").empty
+    # Other tickers are protected too, against their asset class band
+    broken = pd.DataFrame({'Close': np.r_[eur[:150], eur[150:] * 100]}, index=idx)
+    assert np.allclose(sanitize_index(broken, "GBPUSD=X")['Close'], eur)
+    assert np.allclose(sanitize_index(pd.DataFrame({'Close': eur}, index=idx), "GBPUSD=X")['Close'], eur)
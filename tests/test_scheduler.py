@@ -0,0 +1,58 @@
+import pytest
+import sqlite3
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from scheduler import ensure_schema, record_task, update_estimates, estimate_costs, lpt_order, simulate_makespan
+
+def _universe():
+    return pd.DataFrame({
+        'ticker': ["AAPL", "EURUSD=X", "SPY"],
+        'interval': ["1d", "1h", "1d"],
+        'ml': [False, True, False],
+    })
+
+# Test 1 LPT order and makespan
+def test_lpt_makespan():
+    """Longest-first on 2 workers: [5] vs [3, 2] -> makespan 5"""
+    costs = pd.Series({"a": 2.0, "b": 5.0, "c": 3.0})
+    assert lpt_order(costs) == ["b", "c", "a"]
+    assert simulate_makespan(costs, 2) == 5.0
+    assert simulate_makespan(costs, 1) == 10.0
+
+# Test 2 Estimates learn from telemetry
+def test_estimates_follow_telemetry():
+    """Cold start ranks the Prophet hourly series first, then history takes over"""
+    con = sqlite3.connect(":memory:")
+    ensure_schema(con)
+
+    cold = estimate_costs(con, _universe(), history_days=730)
+    assert lpt_order(cold)[0] == "EURUSD=X"
+
+    record_task(con, "run1", "AAPL", "1d", False, 500, 2.0)
+    record_task(con, "run1", "EURUSD=X", "1h", True, 7500, 40.0)
+    update_estimates(con, "run1")
+    record_task(con, "run2", "AAPL", "1d", False, 500, 4.0)
+    update_estimates(con, "run2")
+
+    costs = estimate_costs(con, _universe(), history_days=730)
+    assert costs["AAPL"] == pytest.approx(0.3 * 4.0 + 0.7 * 2.0)
+    assert costs["EURUSD=X"] == pytest.approx(40.0)
+    # SPY has no history: rows x seconds/row learned from the (1d, no ML) class
+    assert costs["SPY"] == pytest.approx(730 * 0.7 * (costs["AAPL"] / 500))
+
+# Test 3 Download pools are fed longest-first, tickers without an estimate last
+def test_dispatch_order(monkeypatch):
+    import run_pipeline3
+    costs = pd.Series({"a": 2.0, "b": 5.0, "c": 3.0})
+    assert run_pipeline3.dispatch_order(["a", "d", "b", "c"], costs) == ["b", "c", "a", "d"]
+    assert run_pipeline3.dispatch_order(["a", "d"]) == ["a", "d"]
+
+    # One download thread: submission order is the order the downloads run in
+    started = []
+    monkeypatch.setitem(run_pipeline3.config['pipeline']['settings'], 'max_workers', 1)
+    monkeypatch.setattr(run_pipeline3, "process_yahoo_download", lambda t, *args: started.append(t) or (t, None))
+    journal = run_pipeline3.open_journal(":memory:")
+    run_pipeline3.ingest_yahoo(["a", "b", "c"], journal, "r1", {'start_date': "2026-01-01", 'end_date': "2026-01-31"}, costs=costs)
+    assert started == ["b", "c", "a"]
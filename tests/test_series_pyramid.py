@@ -0,0 +1,39 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from series_pyramid import OHLC_AGG, FORECAST_AGG, downsample, publish_pyramid, load_window
+
+# Test 1 Extremes survive downsampling
+def test_downsample_keeps_spikes():
+    """A one-bar spike must still be the High of its coarse bucket"""
+    idx = pd.date_range("2024-01-01", periods=1000, freq="h")
+    close = np.linspace(100, 110, 1000)
+    df = pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 10.0}, index=idx)
+    df.iloc[437, df.columns.get_loc('High')] = 999.0
+
+    coarse = downsample(df, 64 * 3600 * 10**9, OHLC_AGG)
+    assert len(coarse) == 16
+    assert coarse['High'].max() == 999.0
+    assert coarse['Low'].min() == df['Low'].min()
+    assert coarse['Volume'].sum() == df['Volume'].sum()
+    assert coarse['Open'].iloc[0] == df['Open'].iloc[0] and coarse['Close'].iloc[-1] == df['Close'].iloc[-1]
+
+# Test 2 Window reads stay within the point budget
+def test_load_window_respects_budget(tmp_path):
+    """A full-history view comes from a coarse level, a narrow zoom from full resolution"""
+    idx = pd.date_range("2020-01-01", periods=20000, freq="h")
+    yhat = np.sin(np.arange(20000) / 50.0)
+    df = pd.DataFrame({'yhat': yhat, 'yhat_lower': yhat - 1, 'yhat_upper': yhat + 1}, index=idx)
+    out = str(tmp_path / "forecast")
+    manifest = publish_pyramid(df, out, FORECAST_AGG)
+    assert len(manifest['levels']) > 2
+
+    level, frame = load_window(out, idx[0], idx[-1], 2000)
+    assert level > 0 and 0 < len(frame) <= 2000
+    assert frame['yhat_upper'].max() == pytest.approx(df['yhat_upper'].max())
+
+    level, frame = load_window(out, idx[100], idx[600], 2000)
+    assert level == 0 and len(frame) == 501
@@ -0,0 +1,52 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from snapshot_store import snapshot_ticker, load_snapshot, list_snapshots, collect_garbage
+
+def make_history(end="2026-01-15"):
+    idx = pd.bdate_range("2023-01-02", end, name="Date")
+    return pd.DataFrame({'Close': 100.0 + np.arange(len(idx)), 'Volume': 1000.0}, index=idx)
+
+def at(ts):
+    return pd.Timestamp(ts).timestamp()
+
+def chunk_count(root):
+    return sum(len(files) for _, _, files in os.walk(os.path.join(root, "chunks")))
+
+# Test 1 Unchanged years are shared between runs and every run reads back exactly as it was
+def test_dedup_and_time_travel(tmp_path):
+    root = str(tmp_path)
+    day1 = make_history()
+    assert snapshot_ticker(root, "run1", "AAA", {'raw': day1, 'clean': day1}, created_at=at("2026-01-15 18:00")) == (4, 8)
+
+    # Next day: one new bar and a vendor revision in 2024 -> only the 2024 and 2026 chunks change
+    day2 = make_history("2026-01-16")
+    day2.loc["2024-06-03", 'Close'] = 1.0
+    written, referenced = snapshot_ticker(root, "run2", "AAA", {'raw': day2, 'clean': day2.drop(pd.Timestamp("2024-06-03"))},
+                                          created_at=at("2026-01-16 18:00"))
+    assert (written, referenced) == (3, 8)
+    assert chunk_count(root) == 7
+
+    pd.testing.assert_frame_equal(load_snapshot(root, "AAA", run_id="run1", kind="raw"), day1, check_freq=False)
+    as_of = load_snapshot(root, "AAA", as_of="2026-01-15", kind="raw")
+    assert as_of.index[-1] == pd.Timestamp("2026-01-15") and as_of.loc["2024-06-03", 'Close'] != 1.0
+    window = load_snapshot(root, "AAA", as_of="2026-01-16", start="2024-06-01", end="2024-06-05")
+    assert list(window.index.strftime("%m-%d")) == ["06-04", "06-05"]
+    with pytest.raises(LookupError):
+        load_snapshot(root, "AAA", as_of="2026-01-14")
+
+# Test 2 GC drops runs outside the retention policy and only the chunks nobody references any more
+def test_gc_retention(tmp_path):
+    root = str(tmp_path)
+    for i, day in enumerate(["2025-10-01", "2025-11-01", "2026-01-14", "2026-01-15", "2026-01-15 20:00"]):
+        snapshot_ticker(root, f"run{i}", "AAA", {'clean': make_history(day[:10]) * (1 + i)}, created_at=at(day))
+
+    stats = collect_garbage(root, keep_last=1, keep_daily=2, keep_monthly=0, keep=["run0"], grace_seconds=0)
+    assert stats['runs_deleted'] == 2
+    assert sorted(list_snapshots(root)['run_id']) == ["run0", "run2", "run4"]
+    assert chunk_count(root) == 3 + 4 + 4
+    for run_id in ["run0", "run2", "run4"]:
+        assert not load_snapshot(root, "AAA", run_id=run_id).empty
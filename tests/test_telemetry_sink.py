@@ -0,0 +1,80 @@
+import pytest
+import os
+import sys
+import threading
+from types import SimpleNamespace
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from telemetry_sink import TelemetrySink
+
+class FakeClient:
+    """Records MLflow client calls; optionally blocks to simulate a slow tracking store"""
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+
+    def get_experiment_by_name(self, name):
+        return SimpleNamespace(experiment_id="1")
+
+    def create_run(self, experiment_id, run_name=None):
+        self.calls.append(('create_run', run_name))
+        return SimpleNamespace(info=SimpleNamespace(run_id=f"id-{run_name}"))
+
+    def log_batch(self, run_id, metrics, params, tags):
+        if self.gate:
+            self.gate.wait()
+        self.calls.append(('log_batch', run_id, len(metrics), len(params), len(tags)))
+
+    def log_artifact(self, run_id, path):
+        self.calls.append(('log_artifact', run_id, path))
+
+    def set_terminated(self, run_id, status):
+        self.calls.append(('set_terminated', run_id, status))
+
+# Test 1 Batched writes off the caller's thread
+def test_sink_batches_and_does_not_block():
+    """Producer returns while the store is stalled; each run is one create + one log_batch"""
+    gate = threading.Event()
+    client = FakeClient(gate)
+    sink = TelemetrySink("unused", "exp", client=client)
+
+    for i in range(3):
+        sink.log_run(f"k{i}", params={'a': 1, 'b': 2}, metrics={'mae': 0.5}, tags={'t': 'x'}, run_name=f"Forecast_{i}")
+        sink.log_artifact(f"k{i}", f"/tmp/plot{i}.png")
+        sink.end_run(f"k{i}")
+    assert not sink.flush(timeout=0.2)  # still blocked on the store, the caller is not
+
+    gate.set()
+    assert sink.flush(timeout=5)
+    sink.close()
+
+    batches = [c for c in client.calls if c[0] == 'log_batch']
+    assert batches == [('log_batch', f"id-Forecast_{i}", 1, 2, 1) for i in range(3)]
+    assert ('log_artifact', "id-Forecast_1", "/tmp/plot1.png") in client.calls
+    assert sum(c[0] == 'create_run' for c in client.calls) == 3
+
+# Test 2 Telemetry failures are contained
+def test_sink_survives_store_errors():
+    client = FakeClient()
+    client.log_batch = lambda *a, **k: (_ for _ in ()).throw(RuntimeError("database is locked"))
+    sink = TelemetrySink("unused", "exp", client=client)
+    sink.log_run("k", metrics={'mae': 1.0})
+    sink.log_artifact("k", "/tmp/p.png")
+    assert sink.flush(timeout=5)
+    assert sink.errors == 1 and ('log_artifact', "id-k", "/tmp/p.png") in client.calls
+    sink.close()
+
+# Test 3 A full queue drops and counts records instead of blocking the caller
+def test_sink_drops_when_full():
+    gate = threading.Event()
+    client = FakeClient(gate)
+    sink = TelemetrySink("unused", "exp", client=client, max_queue=2)
+    sink.log_run("k0", metrics={'mae': 1.0})
+    assert sink.flush(timeout=0.2) is False     # the writer is stuck on k0's log_batch
+    for i in range(1, 6):
+        sink.log_run(f"k{i}", metrics={'mae': 1.0})   # would block forever with put()
+    assert sink.dropped >= 3
+
+    gate.set()
+    assert sink.flush(timeout=5)
+    sink.close()
+    assert sum(c[0] == 'log_batch' for c in client.calls) == 6 - sink.dropped
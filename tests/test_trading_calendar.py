@@ -0,0 +1,66 @@
+import pytest
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from trading_calendar import session_days, expected_bars, gap_report
+from interval_reconcile import load_intraday
+from validate_quality2 import load_data
+
+DATA = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data'))
+
+# Test 1 Holiday rules: Easter, nth weekday, observed weekend holidays
+def test_session_days_holidays():
+    nyse, _ = session_days("XNYS", 2025)
+    for holiday in ["2025-04-18", "2025-11-27", "2025-01-09", "2025-07-04"]:
+        assert np.datetime64(holiday) not in nyse
+    assert len(nyse) == 250
+
+    # Boxing Day 2026 is a Saturday -> Monday 28th in London, Euronext does not move it
+    assert np.datetime64("2026-12-28") not in session_days("XLON", 2026)[0]
+    assert np.datetime64("2026-12-28") in session_days("XAMS", 2026)[0]
+
+    # Crypto trades every day
+    assert len(session_days("CRYPTO", 2024)[0]) == 366
+
+# Test 2 Hourly grid in UTC, shortened on early-close days
+def test_expected_hourly_bars():
+    day = expected_bars("XNYS", "1h", "2024-11-27", "2024-11-30")
+    stamps = pd.DatetimeIndex(day.astype('datetime64[ns]'), tz="UTC").tz_convert("America/New_York")
+    per_day = pd.Series(1, index=stamps).groupby(stamps.date).sum()
+    # Wednesday full session with the partial 15:30 bar, Thanksgiving closed, Black Friday closes
+    # at 13:00 and Yahoo leaves out the partial 12:30 bar
+    assert per_day.to_dict() == {pd.Timestamp("2024-11-27").date(): 7, pd.Timestamp("2024-11-29").date(): 3}
+    assert stamps[0].strftime("%H:%M") == "09:30"
+
+# Test 3 Missing and off-calendar bars from one set difference
+def test_gap_report():
+    idx = pd.bdate_range("2025-04-14", "2025-04-25")
+    df = pd.DataFrame({'Close': 100.0}, index=idx)
+    df = df.drop(pd.Timestamp("2025-04-22"))
+
+    report = gap_report(df, "XNYS", "1d")
+
+    # Good Friday traded (off-calendar), the 22nd is missing
+    assert list(report.index) == [pd.Timestamp("2025-04-18"), pd.Timestamp("2025-04-22")]
+    assert report['qa_reason'].iloc[0].startswith("Off-Calendar Bar")
+    assert report['Close'].iloc[0] == 100.0
+    assert report['qa_reason'].iloc[1].startswith("Missing Bar")
+    assert np.isnan(report['Close'].iloc[1])
+
+# Test 4 The checked-in Yahoo downloads match their calendars: the FX week (Monday 00:00 London to
+# Friday 18:00 New York), thin Christmas / New Year bars and early closes without the partial bar.
+# What is left are bars Yahoo really lacks or sent once against its own schedule.
+@pytest.mark.parametrize("file, name, interval, gaps", [
+    ("EURUSD_2024-01-01_to_2026-01-28_1d.csv", "FX", "1d", ["2025-04-18", "2025-04-21"]),
+    ("EURUSD=X_2024-11-01_to_2026-01-21_1h.csv", "FX", "1h", ["2024-11-01 22:00", "2024-12-31 23:00"]),
+    ("AAPL_2024-11-01_to_2026-01-21_1h.csv", "XNYS", "1h", []),
+    ("SPY_2024-11-01_to_2026-01-21_1h.csv", "XNYS", "1h", []),
+    ("BTC-USD_2024-01-01_to_2026-01-28_1d.csv", "CRYPTO", "1d", []),
+])
+def test_checked_in_data_matches_calendar(file, name, interval, gaps):
+    path = os.path.join(DATA, file)
+    df = load_intraday(path) if interval != "1d" else load_data(path)
+    report = gap_report(df, name, interval)
+    assert list(report.index) == [pd.Timestamp(g) for g in gaps]
@@ -0,0 +1,56 @@
+import pytest
+import pandas as pd
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from universe import load_universe, benchmark_keys, iter_chunks
+
+# Test 1 Inline config lists still work
+def test_universe_from_inline_config():
+    cfg = {
+        'yahoo_tickers': ["AAPL", "EURUSD=X", "BTC-USD", "ASML.AS"],
+        'ml_tickers': ["EURUSD=X"],
+        'ecb_tickers': ["EXR.D.USD.EUR.SP00.A"],
+        'benchmark_mapping': {"EURUSD=X": "EXR.D.USD.EUR.SP00.A"},
+    }
+    u = load_universe(cfg).set_index('ticker')
+
+    assert u.loc["EURUSD=X", 'asset_class'] == "fx"
+    assert u.loc["EURUSD=X", 'benchmark_key'] == "EXR.D.USD.EUR.SP00.A"
+    assert bool(u.loc["EURUSD=X", 'ml']) and not bool(u.loc["AAPL", 'ml'])
+    assert u.loc["ASML.AS", 'exchange'] == "XAMS"
+    assert u.loc["BTC-USD", 'asset_class'] == "crypto"
+    assert (u['interval'] == "1d").all()
+
+# Test 2 Manifest with partial attributes
+def test_universe_from_manifest(tmp_path):
+    manifest = tmp_path / "universe.csv"
+    manifest.write_text(
+        "ticker,asset_class,interval,benchmark_key,ml\n"
+        "SPY,etf,1h,,\n"
+        "GBPUSD=X,,,EXR.D.GBP.EUR.SP00.A,true\n"
+    )
+    cfg = {'universe_file': str(manifest), 'ecb_tickers': ["EXR.D.USD.EUR.SP00.A"]}
+    u = load_universe(cfg)
+
+    assert list(u['ticker']) == ["SPY", "GBPUSD=X"]
+    assert list(u['interval']) == ["1h", "1d"]
+    assert list(u['asset_class']) == ["etf", "fx"]
+    assert list(u['ml']) == [False, True]
+    assert benchmark_keys(u, cfg) == ["EXR.D.USD.EUR.SP00.A", "EXR.D.GBP.EUR.SP00.A"]
+    assert [len(c) for c in iter_chunks(u, 1)] == [1, 1]
+
+# Test 3 Forecast engine per ticker
+def test_universe_forecast_engines():
+    cfg = {
+        'yahoo_tickers': ["AAPL", "EURUSD=X", "BTC-USD"],
+        'ml_tickers': ["EURUSD=X"],
+        'ml_engines': {"BTC-USD": "ets"},
+    }
+    u = load_universe(cfg).set_index('ticker')
+    assert u.loc["EURUSD=X", 'engine'] == "prophet"
+    assert bool(u.loc["BTC-USD", 'ml']) and u.loc["BTC-USD", 'engine'] == "ets"
+    assert u.loc["AAPL", 'engine'] is None
+
+    with pytest.raises(ValueError):
+        load_universe({**cfg, 'ml_engines': {"BTC-USD": "arima"}})
@@ -0,0 +1,62 @@
+import pytest
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from watch_service import WatchService, SimulatedFeed, to_bars, STATUS_FILE
+from quarantine_store import query_quarantine
+
+def make_case(folder):
+    idx = pd.date_range("2025-03-03 14:30", periods=6, freq="h", tz="UTC")
+    hist = pd.DataFrame({'Open': 100.0, 'High': 101.0, 'Low': 99.0, 'Close': 100.0, 'Volume': 10.0}, index=idx)
+    band = pd.DataFrame({'ds': idx.tz_localize(None), 'yhat': 100.0, 'yhat_lower': 98.0, 'yhat_upper': 102.0})
+    band.to_csv(os.path.join(folder, "AAA_forecast.csv"), index=False)
+    return {"AAA": hist.copy(), "BBB": hist.copy()}
+
+# Test 1 Only new bars are validated and scored, verdicts match the rules and the band
+def test_step_verdicts(tmp_path):
+    histories = make_case(str(tmp_path))
+    histories["AAA"].iloc[4, histories["AAA"].columns.get_loc('Close')] = 105.0   # outside the band
+    histories["BBB"].iloc[4, histories["BBB"].columns.get_loc('High')] = 90.0     # High < Low
+
+    service = WatchService(["AAA", "BBB"], str(tmp_path))
+    service.seed(to_bars({t: h.iloc[:3] for t, h in histories.items()}))
+    service.refresh_models()
+    feed = SimulatedFeed({t: h.iloc[3:] for t, h in histories.items()})
+
+    first = service.step(feed.poll())
+    assert list(first['verdict']) == ['ok', 'no_model']
+
+    second = service.step(feed.poll())
+    verdicts = dict(zip(second['ticker'], second['verdict']))
+    assert verdicts == {'AAA': 'outside_band', 'BBB': 'invalid'}
+    assert second['qa_reason'].iloc[0].startswith("ML Anomaly: z=")
+    assert (second['latency_ms'] < 1000).all()
+
+    # Re-sent bars are skipped unless the (forming) bar changed
+    again = to_bars({"AAA": histories["AAA"].iloc[4:5]})
+    assert service.step(again).empty
+    again.loc[0, 'Close'] = 100.5
+    assert list(service.step(again)['verdict']) == ['ok']
+    history = service.history("AAA")
+    assert len(history) == 5 and history['Close'].iloc[-1] == 100.5   # the update replaced bar 4
+
+# Test 2 Flagged bars are published to the quarantine store with a status file per poll
+def test_run_publishes(tmp_path):
+    histories = make_case(str(tmp_path))
+    histories["AAA"].iloc[5, histories["AAA"].columns.get_loc('Close')] = 95.0
+    store = str(tmp_path / "quarantine")
+
+    service = WatchService(["AAA", "BBB"], str(tmp_path), quarantine_root=store, run_id="watch-test")
+    service.refresh_models()
+    polls = service.run(SimulatedFeed(histories), poll_seconds=0)
+
+    assert polls == 6
+    records = query_quarantine(store)
+    assert list(records['ticker']) == ["AAA"]
+    assert records['rule_mask'].iloc[0] == 16
+    status = json.load(open(tmp_path / STATUS_FILE))
+    assert status['bars'] == 12 and status['flagged'] == 1
+    assert status['tickers']['AAA']['verdict'] == 'outside_band'
@@ -0,0 +1,70 @@
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+from work_queue import open_queue, enqueue_run, run_payload, claim_shard, heartbeat, complete_shard, queue_status, claimable_shards, shard_costs
+
+# Test 1 Exclusive claims and reduce counts
+def test_shards_are_claimed_once(tmp_path):
+    """Two workers never get the same shard and finished counts are summed"""
+    q = open_queue(str(tmp_path / "queue.db"))
+    assert enqueue_run(q, "run1", ["A", "B", "C"], 2, {"run_date": "2026-01-01"}) == 2
+    assert enqueue_run(q, "run1", ["A", "B", "C"], 2, {}) == 0  # idempotent
+    assert run_payload(q, "run1") == {"run_date": "2026-01-01"}
+
+    first = claim_shard(q, "run1", "w1", lease_seconds=60)
+    second = claim_shard(q, "run1", "w2", lease_seconds=60)
+    assert first == (0, ["A", "B"])
+    assert second == (1, ["C"])
+    assert claim_shard(q, "run1", "w3", lease_seconds=60) is None
+
+    assert complete_shard(q, "run1", 0, "w1", processed=2, failures=1)
+    assert not complete_shard(q, "run1", 1, "w1", processed=1, failures=0)  # not the lease holder
+    status = queue_status(q, "run1")
+    assert status['done'] == 1 and status['leased'] == 1
+    assert status['processed'] == 2 and status['failures'] == 1
+
+# Test 2 Dead worker's shard is reclaimed after lease expiry
+def test_expired_lease_is_reclaimed(tmp_path):
+    """A worker that stops heartbeating loses its shard, and can no longer complete it"""
+    q = open_queue(str(tmp_path / "queue.db"))
+    enqueue_run(q, "run1", ["A"], 1, {})
+
+    assert claim_shard(q, "run1", "dead", lease_seconds=-1) == (0, ["A"])  # lease already expired
+    assert claim_shard(q, "run1", "alive", lease_seconds=60) == (0, ["A"])
+
+    assert not heartbeat(q, "run1", 0, "dead", 60)
+    assert heartbeat(q, "run1", 0, "alive", 60)
+    assert not complete_shard(q, "run1", 0, "dead", 1, 0)
+    assert complete_shard(q, "run1", 0, "alive", 1, 0)
+
+# Test 3 Poison shard parked after max attempts
+def test_poison_shard_marked_failed(tmp_path):
+    q = open_queue(str(tmp_path / "queue.db"))
+    enqueue_run(q, "run1", ["A"], 1, {})
+    for i in range(2):
+        assert claim_shard(q, "run1", f"w{i}", lease_seconds=-1, max_attempts=2) is not None
+    assert claim_shard(q, "run1", "w9", lease_seconds=60, max_attempts=2) is None
+    assert queue_status(q, "run1")['failed'] == 1
+
+# Test 4 A shard held by a dead worker is not claimable until its lease expires
+def test_claimable_shards(tmp_path):
+    """The coordinator only starts a replacement worker when claim_shard would succeed"""
+    q = open_queue(str(tmp_path / "queue.db"))
+    enqueue_run(q, "run1", ["A", "B"], 1, {})
+    assert claimable_shards(q, "run1") == (2, None)
+    claim_shard(q, "run1", "w1", lease_seconds=60)
+    claim_shard(q, "run1", "w2", lease_seconds=-1)       # died, lease already expired
+    claimable, next_expiry = claimable_shards(q, "run1")
+    assert claimable == 1 and next_expiry > 0
+    claim_shard(q, "run1", "w3", lease_seconds=60)
+    assert claimable_shards(q, "run1")[0] == 0           # nothing to do for a replacement, wait for expiry
+
+# Test 5 Heavy tickers are spread over the shards instead of filling the first one
+def test_cost_balanced_shards(tmp_path):
+    q = open_queue(str(tmp_path / "queue.db"))
+    costs = {**{f"P{i}": 100.0 for i in range(4)}, **{f"D{i}": 1.0 for i in range(16)}}
+    assert enqueue_run(q, "run1", list(costs), 5, {}, costs=costs) == 4
+    assert sorted(shard_costs(q, "run1").values()) == [104.0] * 4
+    shard_id, tickers = claim_shard(q, "run1", "w1", lease_seconds=60)
+    assert len(tickers) == 5 and sum(t.startswith("P") for t in tickers) == 1